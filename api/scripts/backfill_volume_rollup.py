@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Reconstruit les agrégats de volume (UserDailyVolume, UserWeeklyStats) depuis les séances.
+Usage: python scripts/backfill_volume_rollup.py [user_id]
+"""
+import os
+import sys
+
+# Ajouter le répertoire src au path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlmodel import Session
+from sqlmodel import func
+from sqlmodel import select
+
+from api.db import get_engine
+from api.db import init_db
+from api.models import UserDailyVolume
+from api.services.volume_rollup import rebuild_volume_rollup
+
+
+def backfill(user_id: str | None = None) -> None:
+    init_db()
+    with Session(get_engine()) as session:
+        rebuild_volume_rollup(session, user_id=user_id)
+        session.commit()
+        rows = session.exec(select(func.count()).select_from(UserDailyVolume)).one()
+    print(f"✅ Agrégat de volume reconstruit ({rows} jours)")
+
+
+if __name__ == "__main__":
+    backfill(sys.argv[1] if len(sys.argv) > 1 else None)
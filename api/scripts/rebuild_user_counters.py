@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Recalcule les compteurs de profil (UserCounters) depuis les tables sources.
+Usage: python scripts/rebuild_user_counters.py [user_id]
+"""
+import os
+import sys
+
+# Ajouter le répertoire src au path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.db import init_db
+from api.services.counters import reconcile_user_counters
+
+
+def rebuild(user_id: str | None = None) -> None:
+    init_db()
+    with Session(get_engine()) as session:
+        repaired = reconcile_user_counters(session, user_id=user_id)
+        session.commit()
+    print(f"✅ Compteurs de profil recalculés ({repaired} corrigés)")
+
+
+if __name__ == "__main__":
+    rebuild(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -7,6 +7,10 @@ from sqlalchemy import text
 from sqlmodel import Session, select
 from src.api.db import get_engine
 from src.api.models import User, Share, Follower, Workout, WorkoutExercise, Set, Exercise, Like, Notification, Comment
+from src.api.services.counters import reconcile_counters, reconcile_user_counters
+from src.api.services.personal_records import rebuild_personal_records
+from src.api.services.timeline import rebuild_all_timelines
+from src.api.services.volume_rollup import rebuild_volume_rollup
 
 
 def get_exercises_by_muscle(session: Session) -> dict:
@@ -699,6 +703,15 @@ def seed_demo_data():
         
         session.commit()
         
+        # Les likes/commentaires/follows/séances ont été insérés directement : recaler
+        # les compteurs, les timelines matérialisées et l'agrégat de volume
+        reconcile_counters(session)
+        reconcile_user_counters(session)
+        rebuild_all_timelines(session)
+        rebuild_volume_rollup(session)
+        rebuild_personal_records(session)
+        session.commit()
+        
         print(f"\n✅ {created_shares} séances de démo créées avec de vrais exercices!")
         print(f"✅ {created_follows} relations de follow créées!")
         print(f"✅ {created_likes} likes créés!")
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import math
 import os
 from collections.abc import Iterator
 from pathlib import Path
 from typing import Optional
 
-from sqlalchemy import text
+from sqlalchemy import event, text, update
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DatabaseError
 from sqlalchemy.engine.url import make_url
 from sqlmodel import Session, select, SQLModel, create_engine
 
@@ -34,9 +36,27 @@ def get_engine() -> Engine:
             else {}
         )
         _ENGINE = create_engine(url, echo=False, connect_args=connect_args)
+        if parsed_url.get_backend_name() == "sqlite":
+            event.listen(_ENGINE, "connect", _register_sqlite_functions)
     return _ENGINE
 
 
+def _sqlite_ln(value: Optional[float]) -> Optional[float]:
+    # Comme ln() de SQLite : NULL hors du domaine
+    return math.log(value) if value is not None and value > 0 else None
+
+
+def _sqlite_exp(value: Optional[float]) -> Optional[float]:
+    return math.exp(value) if value is not None else None
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    # ln/exp (score de tendance) ne sont fournis que par les builds SQLite
+    # compilés avec SQLITE_ENABLE_MATH_FUNCTIONS
+    dbapi_connection.create_function("ln", 1, _sqlite_ln, deterministic=True)
+    dbapi_connection.create_function("exp", 1, _sqlite_exp, deterministic=True)
+
+
 def reset_engine() -> None:
     global _ENGINE
     _ENGINE = None
@@ -47,7 +67,9 @@ def init_db() -> None:
     from .models import (
         User, Workout, Exercise, WorkoutExercise, Set, Program, ProgramSession,
         ProgramSet, Share, Follower, Like, Comment, Notification, Story,
-        RefreshToken, SyncEvent
+        RefreshToken, SyncEvent, TimelineEntry, NotificationOutbox, LeaderboardSnapshot,
+        UserDailyVolume, UserWeeklyStats, PersonalRecord, ExerciseProgress, FollowSuggestion,
+        FollowSuggestionState, UserCounters, NotificationActor
     )
     
     url = _database_url()
@@ -58,6 +80,18 @@ def init_db() -> None:
     SQLModel.metadata.create_all(engine)
     _ensure_slug_column(engine)
     _ensure_workout_exercise_columns(engine)
+    _ensure_counter_columns(engine)
+    _ensure_trending_column(engine)
+    _ensure_notification_group_columns(engine)
+    _ensure_timelines(engine)
+    _ensure_volume_rollup(engine)
+    _ensure_weekly_stats(engine)
+    _ensure_personal_records(engine)
+    _ensure_user_counters(engine)
+    _extract_avatar_data_uris(engine)
+    _dedupe_unique_relations(engine)
+    _ensure_composite_indexes(engine)
+    _ensure_search_index(engine)
 
 
 def _ensure_slug_column(engine: Engine) -> None:
@@ -129,6 +163,294 @@ def _ensure_workout_exercise_columns(engine: Engine) -> None:
         connection.commit()
 
 
+def _ensure_counter_columns(engine: Engine) -> None:
+    from .services.counters import reconcile_counters
+
+    added = False
+    with engine.connect() as connection:
+        for table, column in (
+            ("share", "like_count"),
+            ("share", "comment_count"),
+            ("comment", "like_count"),
+        ):
+            result = connection.execute(text(f"PRAGMA table_info({table})"))
+            columns = {row[1] for row in result}
+            if column not in columns:
+                connection.execute(
+                    text(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+                )
+                added = True
+        connection.commit()
+
+    # Première initialisation des compteurs à partir des likes/commentaires existants
+    if added:
+        with Session(engine) as session:
+            reconcile_counters(session)
+
+
+def _ensure_trending_column(engine: Engine) -> None:
+    from .services.trending import refresh_trending_scores
+
+    with engine.connect() as connection:
+        result = connection.execute(text("PRAGMA table_info(share)"))
+        columns = {row[1] for row in result}
+        if "trending_score" in columns:
+            return
+        connection.execute(
+            text("ALTER TABLE share ADD COLUMN trending_score FLOAT NOT NULL DEFAULT 0")
+        )
+        connection.commit()
+
+    # Scores initiaux à partir des likes/commentaires existants
+    with Session(engine) as session:
+        refresh_trending_scores(session)
+        session.commit()
+
+
+def _ensure_notification_group_columns(engine: Engine) -> None:
+    with engine.connect() as connection:
+        result = connection.execute(text("PRAGMA table_info(notification)"))
+        columns = {row[1] for row in result}
+        if "actor_count" not in columns:
+            connection.execute(
+                text("ALTER TABLE notification ADD COLUMN actor_count INTEGER NOT NULL DEFAULT 1")
+            )
+        if "latest_actors" not in columns:
+            connection.execute(text("ALTER TABLE notification ADD COLUMN latest_actors JSON"))
+            # Les notifications existantes ont un seul acteur
+            connection.execute(
+                text(
+                    "UPDATE notification SET latest_actors = "
+                    "json_array(json_object('id', actor_id, 'username', actor_username))"
+                )
+            )
+        if "first_at" not in columns:
+            connection.execute(text("ALTER TABLE notification ADD COLUMN first_at DATETIME"))
+            connection.execute(text("UPDATE notification SET first_at = created_at"))
+            # Le regroupement cherche désormais sur `first_at`
+            connection.execute(text("DROP INDEX IF EXISTS ix_notification_group"))
+            # Acteurs distincts connus : au mieux les derniers acteurs de chaque groupe
+            connection.execute(
+                text(
+                    "INSERT OR IGNORE INTO notificationactor (notification_id, actor_id) "
+                    "SELECT notification.id, json_extract(actor.value, '$.id') "
+                    "FROM notification, json_each(notification.latest_actors) AS actor"
+                )
+            )
+        connection.commit()
+
+
+def _ensure_timelines(engine: Engine) -> None:
+    from .models import TimelineEntry
+    from .services.timeline import rebuild_all_timelines
+
+    # Table nouvellement créée : matérialiser les timelines à partir des follows existants
+    with Session(engine) as session:
+        if session.exec(select(TimelineEntry.user_id).limit(1)).first() is None:
+            rebuild_all_timelines(session)
+            session.commit()
+
+
+def _ensure_volume_rollup(engine: Engine) -> None:
+    from .models import UserDailyVolume, Workout
+    from .services.volume_rollup import rebuild_volume_rollup
+
+    # Table nouvellement créée : agréger les séances déjà terminées
+    with Session(engine) as session:
+        empty = session.exec(select(UserDailyVolume.user_id).limit(1)).first() is None
+        if empty and session.exec(select(Workout.id).where(Workout.status == "completed").limit(1)).first():
+            rebuild_volume_rollup(session)
+            session.commit()
+
+
+def _ensure_weekly_stats(engine: Engine) -> None:
+    from .models import UserDailyVolume, UserWeeklyStats
+    from .services.volume_rollup import rebuild_weekly_stats
+
+    # Table nouvellement créée : regrouper par semaine l'agrégat quotidien existant
+    with Session(engine) as session:
+        empty = session.exec(select(UserWeeklyStats.user_id).limit(1)).first() is None
+        if empty and session.exec(select(UserDailyVolume.user_id).limit(1)).first() is not None:
+            rebuild_weekly_stats(session)
+            session.commit()
+
+
+def _ensure_personal_records(engine: Engine) -> None:
+    from .models import PersonalRecord, Workout
+    from .services.personal_records import rebuild_personal_records
+
+    # Table nouvellement créée : records et historique depuis les séances terminées
+    with Session(engine) as session:
+        empty = session.exec(select(PersonalRecord.user_id).limit(1)).first() is None
+        if empty and session.exec(select(Workout.id).where(Workout.status == "completed").limit(1)).first():
+            rebuild_personal_records(session)
+            session.commit()
+
+
+def _ensure_user_counters(engine: Engine) -> None:
+    from .models import User, UserCounters
+    from .services.counters import reconcile_user_counters
+
+    # Table nouvellement créée : compter les partages, follows et likes existants
+    with Session(engine) as session:
+        empty = session.exec(select(UserCounters.user_id).limit(1)).first() is None
+        if empty and session.exec(select(User.id).limit(1)).first() is not None:
+            reconcile_user_counters(session)
+            session.commit()
+
+
+def _extract_avatar_data_uris(engine: Engine) -> None:
+    from .models import LeaderboardSnapshot, User
+    from .services.avatar_store import InvalidAvatar, store_avatar_url
+
+    # Anciens avatars stockés en data URI dans la colonne : extraits un par un
+    # vers le stockage sur disque, la colonne ne garde que l'URL courte
+    with Session(engine) as session:
+        user_ids = session.exec(select(User.id).where(User.avatar_url.like("data:%"))).all()
+        for user_id in user_ids:
+            data_uri = session.exec(select(User.avatar_url).where(User.id == user_id)).one()
+            try:
+                avatar_url = store_avatar_url(data_uri)
+            except InvalidAvatar as exc:
+                print(f"⚠️  Avatar de {user_id} non migré ({exc.detail})")
+                continue
+            session.exec(update(User).where(User.id == user_id).values(avatar_url=avatar_url))
+            session.commit()
+        if user_ids:
+            session.exec(
+                update(LeaderboardSnapshot)
+                .where(LeaderboardSnapshot.avatar_url.like("data:%"))
+                .values(
+                    avatar_url=select(User.avatar_url)
+                    .where(User.id == LeaderboardSnapshot.user_id)
+                    .scalar_subquery()
+                )
+            )
+            session.commit()
+
+
+def _dedupe_unique_relations(engine: Engine) -> None:
+    from .services.counters import reconcile_counters, reconcile_user_counters
+
+    # Avant de poser les index uniques, supprimer les doublons existants
+    # (on garde la première ligne insérée de chaque paire)
+    relations = (
+        ("like", "uq_like_share_user", ("share_id", "user_id")),
+        ("commentlike", "uq_commentlike_comment_user", ("comment_id", "user_id")),
+        ("follower", "uq_follower_follower_followed", ("follower_id", "followed_id")),
+    )
+    removed = 0
+    with engine.connect() as connection:
+        for table, index_name, columns in relations:
+            result = connection.execute(text(f'PRAGMA index_list("{table}")'))
+            if index_name in {row[1] for row in result}:
+                continue
+            keys = ", ".join(columns)
+            result = connection.execute(
+                text(
+                    f'DELETE FROM "{table}" WHERE rowid NOT IN '
+                    f'(SELECT MIN(rowid) FROM "{table}" GROUP BY {keys})'
+                )
+            )
+            removed += result.rowcount
+        connection.commit()
+
+    if removed:
+        with Session(engine) as session:
+            reconcile_counters(session)
+            reconcile_user_counters(session)
+            session.commit()
+
+
+def _ensure_composite_indexes(engine: Engine) -> None:
+    # create_all ne crée pas les index des tables déjà existantes : on rattrape
+    # les index composites déclarés dans les modèles (__table_args__)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            if len(index.expressions) > 1:
+                index.create(engine, checkfirst=True)
+
+
+# Index plein texte (FTS5, contenu externe) de la recherche Explore, tenu à jour
+# par triggers. Les triggers de mise à jour ne portent que sur les colonnes
+# indexées : un like (compteurs du partage) ne réécrit pas l'index.
+_SEARCH_INDEX_DDL = {
+    "user_fts": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5("
+        "username, bio, content='user', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON user BEGIN "
+        "INSERT INTO user_fts(rowid, username, bio) VALUES (new.rowid, new.username, new.bio); END",
+        "CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON user BEGIN "
+        "INSERT INTO user_fts(user_fts, rowid, username, bio) "
+        "VALUES ('delete', old.rowid, old.username, old.bio); END",
+        "CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF username, bio ON user BEGIN "
+        "INSERT INTO user_fts(user_fts, rowid, username, bio) "
+        "VALUES ('delete', old.rowid, old.username, old.bio); "
+        "INSERT INTO user_fts(rowid, username, bio) VALUES (new.rowid, new.username, new.bio); END",
+    ),
+    "share_fts": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS share_fts USING fts5("
+        "workout_title, owner_username, content='share', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS share_fts_ai AFTER INSERT ON share BEGIN "
+        "INSERT INTO share_fts(rowid, workout_title, owner_username) "
+        "VALUES (new.rowid, new.workout_title, new.owner_username); END",
+        "CREATE TRIGGER IF NOT EXISTS share_fts_ad AFTER DELETE ON share BEGIN "
+        "INSERT INTO share_fts(share_fts, rowid, workout_title, owner_username) "
+        "VALUES ('delete', old.rowid, old.workout_title, old.owner_username); END",
+        "CREATE TRIGGER IF NOT EXISTS share_fts_au AFTER UPDATE OF workout_title, owner_username ON share BEGIN "
+        "INSERT INTO share_fts(share_fts, rowid, workout_title, owner_username) "
+        "VALUES ('delete', old.rowid, old.workout_title, old.owner_username); "
+        "INSERT INTO share_fts(rowid, workout_title, owner_username) "
+        "VALUES (new.rowid, new.workout_title, new.owner_username); END",
+    ),
+}
+
+
+def _ensure_search_index(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as connection:
+        existing = {
+            row[0]
+            for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        }
+        stale = [
+            table for table in _SEARCH_INDEX_DDL
+            if table in existing and not _search_index_is_consistent(connection, table)
+        ]
+        for table, statements in _SEARCH_INDEX_DDL.items():
+            if table in existing:
+                continue
+            for statement in statements:
+                connection.execute(text(statement))
+            # Indexer les lignes déjà présentes
+            connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+        connection.commit()
+    if stale:
+        rebuild_search_index(engine, stale)
+
+
+def _search_index_is_consistent(connection, table: str) -> bool:
+    # rank = 1 : compare aussi l'index au contenu de la table (rowid renumérotés
+    # par un VACUUM, écritures faites sans les triggers)
+    try:
+        connection.execute(text(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)"))
+    except DatabaseError:
+        connection.rollback()
+        return False
+    return True
+
+
+def rebuild_search_index(engine: Engine, tables: Optional[list[str]] = None) -> None:
+    """Reconstruit l'index plein texte depuis les tables (toutes si `tables` est None)."""
+    with engine.connect() as connection:
+        for table in tables or _SEARCH_INDEX_DDL:
+            connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+        connection.commit()
+
+
 def get_session() -> Iterator[Session]:
     engine = get_engine()
     with Session(engine) as session:
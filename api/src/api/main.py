@@ -17,13 +17,26 @@ from .routes import profile
 from .routes import explore
 from .routes import notifications
 from .routes import leaderboard
+from .routes import search
 from .routes import auth
+from .routes import avatars
 from .routes import shared_workouts
 from .routes import sync
 from .routes import users
 from .routes import seed
 from .seeds import seed_exercises
 from .services.exercise_loader import import_exercises_from_url
+from .services.background import PeriodicTask, interval_from_env
+from .services.counters import run_counter_reconciliation
+from .services.follow_graph import run_follow_graph_refresh
+from .services.follow_suggestions import run_follow_suggestions
+from .services.leaderboard import run_leaderboard_snapshots
+from .services.like_buffer import like_buffer, run_like_flush
+from .services.notification_outbox import run_outbox_worker
+from .services.ranked_index import run_ranked_index_refresh
+from .services.suggest_index import run_suggest_index_refresh
+from .services.timeline import run_timeline_trim
+from .services.trending import run_trending_refresh, trending_refresher
 from sqlmodel import Session, select, func
 from .db import get_engine
 from .models import Exercise
@@ -55,9 +68,71 @@ async def lifespan(app: FastAPI):
                 inserted = seed_exercises(force=False)
                 if inserted > 0:
                     print(f"📦 {inserted} exercices par défaut chargés")
-    
+
+    # Index tenus en mémoire (classements, autocomplétion, graphe des follows),
+    # alimentés ensuite par les écritures
+    run_ranked_index_refresh()
+    run_suggest_index_refresh()
+    run_follow_graph_refresh()
+
+    # Tâches de fond (intervalle en secondes, 0 pour désactiver)
+    background_tasks = [
+        PeriodicTask(
+            "counter-reconciliation",
+            interval_from_env("COUNTER_RECONCILE_INTERVAL", 600),
+            run_counter_reconciliation,
+        ),
+        PeriodicTask(
+            "timeline-trim",
+            interval_from_env("TIMELINE_TRIM_INTERVAL", 900),
+            run_timeline_trim,
+        ),
+        # Désactivé par défaut (LIKE_BUFFER_FLUSH_MS=0)
+        PeriodicTask("like-flush", like_buffer.flush_interval, run_like_flush),
+        PeriodicTask(
+            "notification-outbox",
+            interval_from_env("NOTIFICATION_OUTBOX_INTERVAL", 2),
+            run_outbox_worker,
+        ),
+        PeriodicTask(
+            "leaderboard-snapshots",
+            interval_from_env("LEADERBOARD_SNAPSHOT_INTERVAL", 300),
+            run_leaderboard_snapshots,
+        ),
+        # Rattrape les écritures des autres process (index propre au process)
+        PeriodicTask(
+            "ranked-index-refresh",
+            interval_from_env("RANKED_INDEX_REFRESH_INTERVAL", 300),
+            run_ranked_index_refresh,
+        ),
+        PeriodicTask("trending-refresh", trending_refresher.interval, run_trending_refresh),
+        PeriodicTask(
+            "follow-suggestions",
+            interval_from_env("FOLLOW_SUGGESTIONS_INTERVAL", 120),
+            run_follow_suggestions,
+        ),
+        PeriodicTask(
+            "follow-graph-refresh",
+            interval_from_env("FOLLOW_GRAPH_REFRESH_INTERVAL", 600),
+            run_follow_graph_refresh,
+        ),
+        PeriodicTask(
+            "suggest-index-refresh",
+            interval_from_env("SUGGEST_INDEX_REFRESH_INTERVAL", 600),
+            run_suggest_index_refresh,
+        ),
+    ]
+    for task in background_tasks:
+        task.start()
+
     yield
 
+    for task in background_tasks:
+        await task.stop()
+    # Ne pas perdre les likes encore en mémoire ni les notifications en attente
+    like_buffer.flush()
+    run_outbox_worker()
+
 
 app = FastAPI(title="Gorillax API", version="0.1.0", lifespan=lifespan)
 
@@ -83,9 +158,11 @@ app.include_router(users_stats.router)
 app.include_router(auth.router)
 app.include_router(likes.router)
 app.include_router(profile.router)
+app.include_router(avatars.router)
 app.include_router(explore.router)
 app.include_router(notifications.router)
 app.include_router(leaderboard.router)
+app.include_router(search.router)
 app.include_router(seed.router)
 
 
@@ -1,8 +1,9 @@
 """Database models for the Fitness App."""
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, SQLModel
 
 
@@ -109,6 +110,12 @@ class ProgramSet(SQLModel, table=True):
 
 class Share(SQLModel, table=True):
     """Partage d'une séance."""
+    __table_args__ = (
+        Index("ix_share_created_id", "created_at", "share_id"),
+        Index("ix_share_owner_created_id", "owner_id", "created_at", "share_id"),
+        Index("ix_share_trending", "trending_score", "share_id"),
+    )
+
     share_id: str = Field(default_factory=generate_uuid, primary_key=True)
     owner_id: str = Field(index=True)
     owner_username: str
@@ -116,11 +123,20 @@ class Share(SQLModel, table=True):
     workout_title: str
     exercise_count: int = Field(default=0)
     set_count: int = Field(default=0)
+    # Compteurs dénormalisés (maintenus par routes/likes.py, réconciliés en tâche de fond)
+    like_count: int = Field(default=0)
+    comment_count: int = Field(default=0)
+    # Score de tendance (services/trending.py), recalculé en tâche de fond
+    trending_score: float = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class Like(SQLModel, table=True):
     """Like sur un partage."""
+    __table_args__ = (
+        Index("uq_like_share_user", "share_id", "user_id", unique=True),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     share_id: str = Field(index=True)
     user_id: str = Field(index=True)
@@ -129,16 +145,25 @@ class Like(SQLModel, table=True):
 
 class Comment(SQLModel, table=True):
     """Commentaire sur un partage."""
+    __table_args__ = (
+        Index("ix_comment_share_created_id", "share_id", "created_at", "id"),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     share_id: str = Field(index=True)
     user_id: str = Field(index=True)
     username: str
     content: str
+    like_count: int = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class CommentLike(SQLModel, table=True):
     """Like sur un commentaire."""
+    __table_args__ = (
+        Index("uq_commentlike_comment_user", "comment_id", "user_id", unique=True),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     comment_id: str = Field(index=True)
     user_id: str = Field(index=True)
@@ -147,25 +172,195 @@ class CommentLike(SQLModel, table=True):
 
 class Follower(SQLModel, table=True):
     """Relation de suivi entre utilisateurs."""
+    __table_args__ = (
+        Index("ix_follower_followed_created_id", "followed_id", "created_at", "id"),
+        Index("ix_follower_follower_created_id", "follower_id", "created_at", "id"),
+        Index("uq_follower_follower_followed", "follower_id", "followed_id", unique=True),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     follower_id: str = Field(index=True)
     followed_id: str = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class TimelineEntry(SQLModel, table=True):
+    """Entrée de la timeline matérialisée d'un utilisateur (fan-out à l'écriture)."""
+    __table_args__ = (
+        Index("ix_timelineentry_user_created", "user_id", "created_at", "share_id"),
+    )
+
+    user_id: str = Field(primary_key=True)
+    share_id: str = Field(primary_key=True)
+    owner_id: str = Field(index=True)
+    created_at: datetime
+
+
 class Notification(SQLModel, table=True):
     """Notification utilisateur."""
+    __table_args__ = (
+        Index("ix_notification_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_notification_group_first", "user_id", "type", "reference_id", "first_at"),
+        Index("ix_notification_user_read_created", "user_id", "read", "created_at"),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     user_id: str = Field(index=True)
     type: str  # 'like', 'comment', 'follow', 'mention'
-    actor_id: str  # Utilisateur qui a déclenché la notification
+    actor_id: str  # Dernier utilisateur qui a déclenché la notification
     actor_username: str
     reference_id: Optional[str] = None  # ID du share/comment concerné
     message: str
+    # Notifications regroupées par (user_id, type, reference_id) sur une fenêtre de temps
+    actor_count: int = Field(default=1)
+    latest_actors: list[dict] = Field(default_factory=list, sa_column=Column(JSON))  # [{id, username}]
     read: bool = Field(default=False)
+    # Premier évènement du groupe (ancre la fenêtre de regroupement) ; `created_at`
+    # avance avec le dernier évènement et ne sert qu'au tri
+    first_at: datetime = Field(default_factory=datetime.utcnow)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class NotificationActor(SQLModel, table=True):
+    """Acteur distinct d'une notification regroupée (base de `actor_count`)."""
+    notification_id: str = Field(primary_key=True)
+    actor_id: str = Field(primary_key=True)
+
+
+class NotificationOutbox(SQLModel, table=True):
+    """Notification à créer, écrite dans la même transaction que l'action.
+
+    Un worker de fond transforme ces lignes en `Notification` par lots.
+    """
+    id: str = Field(default_factory=generate_uuid, primary_key=True)
+    user_id: str
+    type: str
+    actor_id: str
+    actor_username: str
+    reference_id: Optional[str] = None
+    message: str
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class LeaderboardSnapshot(SQLModel, table=True):
+    """Classement matérialisé d'un `(type, period)` à un instant (`computed_at`).
+
+    `change` est l'écart de rang avec le snapshot de référence d'une semaine
+    plus tôt (positif = places gagnées).
+    """
+    __table_args__ = (
+        Index("ix_leaderboardsnapshot_board_position", "type", "period", "computed_at", "position"),
+    )
+
+    type: str = Field(primary_key=True)
+    period: str = Field(primary_key=True)
+    computed_at: datetime = Field(primary_key=True)
+    user_id: str = Field(primary_key=True)
+    username: str
+    avatar_url: Optional[str] = None
+    score: int
+    rank: int
+    position: int
+    change: int = Field(default=0)
+
+
+class UserDailyVolume(SQLModel, table=True):
+    """Agrégat quotidien des séances terminées d'un utilisateur (reps × poids)."""
+    __table_args__ = (
+        Index("ix_userdailyvolume_day_user", "day", "user_id"),
+    )
+
+    user_id: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    volume: float = Field(default=0)
+    set_count: int = Field(default=0)
+    session_count: int = Field(default=0)
+    best_lift: float = Field(default=0)
+
+
+class UserWeeklyStats(SQLModel, table=True):
+    """Agrégat hebdomadaire (semaine du lundi) tiré de `UserDailyVolume`.
+
+    Les colonnes `total_*` et `best_lift_to_date` cumulent toutes les semaines
+    jusqu'à celle-ci : la dernière ligne d'un utilisateur donne ses totaux.
+    """
+    user_id: str = Field(primary_key=True)
+    week_start: date = Field(primary_key=True)
+    session_count: int = Field(default=0)
+    volume: float = Field(default=0)
+    set_count: int = Field(default=0)
+    best_lift: float = Field(default=0)
+    training_days: int = Field(default=0)
+    total_sessions: int = Field(default=0)
+    total_volume: float = Field(default=0)
+    best_lift_to_date: float = Field(default=0)
+
+
+class PersonalRecord(SQLModel, table=True):
+    """Records d'un utilisateur sur un exercice (séances terminées, `services.personal_records`)."""
+    user_id: str = Field(primary_key=True)
+    exercise_id: str = Field(primary_key=True)
+    best_weight: float = Field(default=0)
+    best_weight_day: Optional[date] = None
+    best_e1rm: float = Field(default=0)  # 1RM estimé (Epley)
+    best_e1rm_day: Optional[date] = None
+    # Set au plus gros volume (reps × charge)
+    best_set_reps: int = Field(default=0)
+    best_set_weight: float = Field(default=0)
+    best_set_day: Optional[date] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ExerciseProgress(SQLModel, table=True):
+    """Historique par jour d'un exercice : meilleur 1RM estimé, charge max et volume."""
+    user_id: str = Field(primary_key=True)
+    exercise_id: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    best_e1rm: float = Field(default=0)
+    best_weight: float = Field(default=0)
+    volume: float = Field(default=0)
+    set_count: int = Field(default=0)
+
+
+class UserCounters(SQLModel, table=True):
+    """Compteurs dénormalisés d'un profil (maintenus par les routes, réconciliés en tâche de fond)."""
+    user_id: str = Field(primary_key=True)
+    posts_count: int = Field(default=0)
+    followers_count: int = Field(default=0)
+    following_count: int = Field(default=0)
+    total_likes: int = Field(default=0)  # likes reçus sur ses partages
+
+
+class FollowSuggestion(SQLModel, table=True):
+    """Suggestion de compte à suivre, précalculée par `services.follow_suggestions`.
+
+    `mutual_count` : nombre de comptes suivis par `user_id` qui suivent déjà
+    `candidate_id` (amis d'amis).
+    """
+    __table_args__ = (
+        Index("ix_followsuggestion_user_position", "user_id", "position"),
+    )
+
+    user_id: str = Field(primary_key=True)
+    candidate_id: str = Field(primary_key=True)
+    position: int
+    mutual_count: int = Field(default=0)
+    followers_count: int = Field(default=0)
+
+
+class FollowSuggestionState(SQLModel, table=True):
+    """Date de calcul des suggestions d'un utilisateur ; `stale` après un follow/unfollow."""
+    __table_args__ = (
+        Index("ix_followsuggestionstate_stale_computed", "stale", "computed_at"),
+    )
+
+    user_id: str = Field(primary_key=True)
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
+    stale: bool = Field(default=False)
+
+
 class Story(SQLModel, table=True):
     """Story (conseils, recettes, etc.)."""
     id: str = Field(default_factory=generate_uuid, primary_key=True)
@@ -0,0 +1,34 @@
+"""Service des avatars stockés sur disque (URLs immuables, cache long)."""
+
+from fastapi import APIRouter
+from fastapi import HTTPException
+from fastapi.responses import FileResponse
+
+from ..services.avatar_store import AVATAR_CACHE_CONTROL
+from ..services.avatar_store import MEDIA_TYPES
+from ..services.avatar_store import avatar_file
+
+router = APIRouter(prefix="/avatars", tags=["avatars"])
+
+
+def _serve(digest: str, size: str | None = None) -> FileResponse:
+    path = avatar_file(digest, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="avatar_not_found")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[path.suffix.lstrip(".")],
+        headers={"Cache-Control": AVATAR_CACHE_CONTROL, "ETag": f'"{digest}-{path.stem}"'},
+    )
+
+
+@router.get("/{digest}")
+def get_avatar(digest: str) -> FileResponse:
+    """Image d'origine."""
+    return _serve(digest)
+
+
+@router.get("/{digest}/{size}")
+def get_avatar_thumbnail(digest: str, size: str) -> FileResponse:
+    """Miniature `sm` ou `md` (l'original si l'avatar a été stocké sans miniatures)."""
+    return _serve(digest, size)
@@ -1,11 +1,13 @@
 """API endpoints pour la découverte (Explore)."""
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from typing import Optional
 
 from ..db import get_session
-from ..models import User, Share, Like, Follower
+from ..models import User, Share
+from ..services.follow_suggestions import popular_users, read_suggestions
+from ..services.search import search_shares, search_users, user_counts
 
 router = APIRouter(prefix="/explore", tags=["explore"])
 
@@ -29,6 +31,8 @@ class SuggestedUser(BaseModel):
     objective: Optional[str]
     followers_count: int
     posts_count: int
+    # Comptes suivis par l'utilisateur courant qui suivent déjà ce compte
+    mutual_count: int = 0
 
 
 class ExploreResponse(BaseModel):
@@ -39,6 +43,8 @@ class ExploreResponse(BaseModel):
 class SearchResult(BaseModel):
     users: list[SuggestedUser]
     posts: list[TrendingPost]
+    # Offset de la page suivante (utilisateurs et posts), None si tout est lu
+    next_offset: Optional[int] = None
 
 
 @router.get("/trending", response_model=list[TrendingPost])
@@ -46,36 +52,29 @@ def get_trending_posts(
     limit: int = Query(20, ge=1, le=50),
     session: Session = Depends(get_session)
 ) -> list[TrendingPost]:
-    """Récupérer les posts les plus populaires (par likes)."""
-    
-    # Récupérer tous les shares avec leur nombre de likes
-    shares = session.exec(select(Share).order_by(Share.created_at.desc()).limit(100)).all()
-    
-    posts_with_likes = []
-    for share in shares:
-        like_count = session.exec(
-            select(func.count()).select_from(Like).where(Like.share_id == share.share_id)
-        ).one()
-        posts_with_likes.append({
-            "share": share,
-            "like_count": like_count,
-        })
+    """Récupérer les posts en tendance (engagement récent pondéré par l'âge).
+
+    Top-K sur l'index du score de tendance (voir services.trending).
+    """
     
-    # Trier par likes (décroissant) puis par date
-    posts_with_likes.sort(key=lambda x: (-x["like_count"], -x["share"].created_at.timestamp()))
+    shares = session.exec(
+        select(Share)
+        .order_by(Share.trending_score.desc(), Share.share_id.desc())
+        .limit(limit)
+    ).all()
     
     return [
         TrendingPost(
-            share_id=p["share"].share_id,
-            owner_id=p["share"].owner_id,
-            owner_username=p["share"].owner_username,
-            workout_title=p["share"].workout_title,
-            exercise_count=p["share"].exercise_count,
-            set_count=p["share"].set_count,
-            like_count=p["like_count"],
-            created_at=p["share"].created_at.isoformat(),
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            owner_username=share.owner_username,
+            workout_title=share.workout_title,
+            exercise_count=share.exercise_count,
+            set_count=share.set_count,
+            like_count=share.like_count,
+            created_at=share.created_at.isoformat(),
         )
-        for p in posts_with_likes[:limit]
+        for share in shares
     ]
 
 
@@ -85,105 +84,88 @@ def get_suggested_users(
     limit: int = Query(10, ge=1, le=30),
     session: Session = Depends(get_session)
 ) -> list[SuggestedUser]:
-    """Récupérer des suggestions d'utilisateurs à suivre."""
-    
-    # Récupérer les utilisateurs que l'utilisateur courant ne suit pas déjà
-    all_users = session.exec(select(User)).all()
+    """Récupérer des suggestions d'utilisateurs à suivre.
+
+    Amis d'amis précalculés (voir services.follow_suggestions) ; sans
+    utilisateur courant, les comptes les plus suivis.
+    """
     
-    # Filtrer les utilisateurs déjà suivis
-    following_ids = set()
     if current_user_id:
-        following = session.exec(
-            select(Follower.followed_id).where(Follower.follower_id == current_user_id)
-        ).all()
-        following_ids = set(following)
-        following_ids.add(current_user_id)  # Exclure soi-même
-    
-    suggested = []
-    for user in all_users:
-        if user.id in following_ids:
-            continue
-        
-        # Compter les followers et posts
-        followers_count = session.exec(
-            select(func.count()).select_from(Follower).where(Follower.followed_id == user.id)
-        ).one()
-        
-        posts_count = session.exec(
-            select(func.count()).select_from(Share).where(Share.owner_id == user.id)
-        ).one()
-        
-        suggested.append(SuggestedUser(
-            id=user.id,
-            username=user.username,
-            avatar_url=user.avatar_url,
-            bio=user.bio,
-            objective=user.objective,
-            followers_count=followers_count,
-            posts_count=posts_count,
-        ))
+        suggestions = read_suggestions(session, current_user_id, limit)
+        ranked = [(s.candidate_id, s.mutual_count) for s in suggestions]
+    else:
+        ranked = [(user_id, 0) for user_id, _ in popular_users(session, limit)]
     
-    # Trier par nombre de followers (les plus populaires en premier)
-    suggested.sort(key=lambda x: -x.followers_count)
+    user_ids = [user_id for user_id, _ in ranked]
+    users = {
+        user.id: user for user in session.exec(select(User).where(User.id.in_(user_ids))).all()
+    } if user_ids else {}
+    counts = user_counts(session, users)
     
-    return suggested[:limit]
+    return [
+        SuggestedUser(
+            id=user_id,
+            username=users[user_id].username,
+            avatar_url=users[user_id].avatar_url,
+            bio=users[user_id].bio,
+            objective=users[user_id].objective,
+            followers_count=counts[user_id][0],
+            posts_count=counts[user_id][1],
+            mutual_count=mutual_count,
+        )
+        for user_id, mutual_count in ranked
+        if user_id in users
+    ]
 
 
 @router.get("/search", response_model=SearchResult)
 def search(
     q: str = Query(..., min_length=1),
     limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0),
     session: Session = Depends(get_session)
 ) -> SearchResult:
-    """Rechercher des utilisateurs et des posts."""
+    """Rechercher des utilisateurs et des posts (index plein texte, classement BM25)."""
     
-    query = q.lower().strip()
+    # Une ligne de plus pour savoir s'il reste une page
+    users = search_users(session, q, limit + 1, offset)
+    shares = search_shares(session, q, limit + 1, offset)
+    has_more = len(users) > limit or len(shares) > limit
+    users = users[:limit]
     
-    # Rechercher des utilisateurs
-    users = session.exec(select(User)).all()
-    matching_users = []
-    for user in users:
-        if query in user.username.lower() or (user.bio and query in user.bio.lower()):
-            followers_count = session.exec(
-                select(func.count()).select_from(Follower).where(Follower.followed_id == user.id)
-            ).one()
-            posts_count = session.exec(
-                select(func.count()).select_from(Share).where(Share.owner_id == user.id)
-            ).one()
-            
-            matching_users.append(SuggestedUser(
-                id=user.id,
-                username=user.username,
-                avatar_url=user.avatar_url,
-                bio=user.bio,
-                objective=user.objective,
-                followers_count=followers_count,
-                posts_count=posts_count,
-            ))
+    # Compteurs de la page uniquement, en requêtes groupées
+    counts = user_counts(session, [user.id for user in users])
+    matching_users = [
+        SuggestedUser(
+            id=user.id,
+            username=user.username,
+            avatar_url=user.avatar_url,
+            bio=user.bio,
+            objective=user.objective,
+            followers_count=counts[user.id][0],
+            posts_count=counts[user.id][1],
+        )
+        for user in users
+    ]
     
-    # Rechercher des posts
-    shares = session.exec(select(Share)).all()
-    matching_posts = []
-    for share in shares:
-        if query in share.workout_title.lower() or query in share.owner_username.lower():
-            like_count = session.exec(
-                select(func.count()).select_from(Like).where(Like.share_id == share.share_id)
-            ).one()
-            
-            matching_posts.append(TrendingPost(
-                share_id=share.share_id,
-                owner_id=share.owner_id,
-                owner_username=share.owner_username,
-                workout_title=share.workout_title,
-                exercise_count=share.exercise_count,
-                set_count=share.set_count,
-                like_count=like_count,
-                created_at=share.created_at.isoformat(),
-            ))
+    matching_posts = [
+        TrendingPost(
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            owner_username=share.owner_username,
+            workout_title=share.workout_title,
+            exercise_count=share.exercise_count,
+            set_count=share.set_count,
+            like_count=share.like_count,
+            created_at=share.created_at.isoformat(),
+        )
+        for share in shares[:limit]
+    ]
     
     return SearchResult(
-        users=matching_users[:limit],
-        posts=matching_posts[:limit],
+        users=matching_users,
+        posts=matching_posts,
+        next_offset=offset + limit if has_more else None,
     )
 
 
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -8,8 +7,16 @@ from fastapi.responses import Response
 from sqlmodel import Session, select
 
 from ..db import get_session
-from ..models import Follower, Share, User, Comment, Like
+from ..models import Follower, Share, TimelineEntry, User
 from ..schemas import FeedResponse, FeedItem, FollowRequest
+from ..services.counters import bump_user_counters
+from ..services.feed_hydration import hydrate_feed_items
+from ..services.follow_graph import follow_graph
+from ..services.follow_suggestions import mark_suggestions_stale
+from ..services.ranked_index import ranked_boards
+from ..services.relations import delete_relation, insert_relation
+from ..services.timeline import backfill_follow, prune_unfollow, timeline_statement
+from ..utils.pagination import keyset_page
 
 router = APIRouter(prefix="/feed", tags=["feed"])
 
@@ -24,28 +31,27 @@ def follow_user(followed_id: str, payload: FollowRequest, session: Session = Dep
     if follower is None or followed is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user_not_found")
 
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == payload.follower_id)
-        .where(Follower.followed_id == followed_id)
-    ).first()
-    if existing is None:
-        session.add(Follower(follower_id=payload.follower_id, followed_id=followed_id))
+    if insert_relation(session, Follower, follower_id=payload.follower_id, followed_id=followed_id):
+        backfill_follow(session, payload.follower_id, followed_id)
+        mark_suggestions_stale(session, payload.follower_id)
+        bump_user_counters(session, payload.follower_id, following_count=1)
+        bump_user_counters(session, followed_id, followers_count=1)
         session.commit()
+        follow_graph.add(payload.follower_id, followed_id)
+        ranked_boards.adjust("followers", followed_id, 1)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.delete("/follow/{followed_id}", status_code=status.HTTP_204_NO_CONTENT)
 def unfollow_user(followed_id: str, payload: FollowRequest, session: Session = Depends(get_session)) -> Response:
-    statement = (
-        select(Follower)
-        .where(Follower.follower_id == payload.follower_id)
-        .where(Follower.followed_id == followed_id)
-    )
-    existing = session.exec(statement).first()
-    if existing is not None:
-        session.delete(existing)
+    if delete_relation(session, Follower, follower_id=payload.follower_id, followed_id=followed_id):
+        prune_unfollow(session, payload.follower_id, followed_id)
+        mark_suggestions_stale(session, payload.follower_id)
+        bump_user_counters(session, payload.follower_id, following_count=-1)
+        bump_user_counters(session, followed_id, followers_count=-1)
         session.commit()
+        follow_graph.remove(payload.follower_id, followed_id)
+        ranked_boards.adjust("followers", followed_id, -1)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -71,52 +77,33 @@ def get_feed(
         session.commit()
 
     # Affiche les partages publics de tous les utilisateurs (simplifié pour le mode démo)
-    statement = select(Share)
-    parsed_cursor: Optional[datetime] = None
-    if cursor:
-        parsed_cursor = datetime.fromisoformat(cursor)
-        statement = statement.where(Share.created_at <= parsed_cursor)
-    statement = statement.order_by(Share.created_at.desc()).limit(limit + 1)
-
-    shares = session.exec(statement).all()
-    next_cursor = None
-    if len(shares) > limit:
-        next_cursor = shares[-1].created_at
-        shares = shares[:limit]
-
-    items = []
-    for share in shares:
-        # Récupérer les commentaires (limité à 2 pour l'aperçu)
-        comments_stmt = select(Comment).where(Comment.share_id == share.share_id).order_by(Comment.created_at.desc()).limit(2)
-        comments = session.exec(comments_stmt).all()
-        
-        # Compter le total des commentaires
-        comment_count_stmt = select(Comment).where(Comment.share_id == share.share_id)
-        comment_count = len(session.exec(comment_count_stmt).all())
-        
-        # Compter les likes
-        like_count_stmt = select(Like).where(Like.share_id == share.share_id)
-        like_count = len(session.exec(like_count_stmt).all())
-        
-        items.append({
-            'share_id': share.share_id,
-            'owner_id': share.owner_id,
-            'owner_username': share.owner_username,
-            'workout_title': share.workout_title,
-            'exercise_count': share.exercise_count,
-            'set_count': share.set_count,
-            'created_at': share.created_at,
-            'like_count': like_count,
-            'comment_count': comment_count,
-            'comments': [
-                {
-                    'id': c.id,
-                    'username': c.username,
-                    'content': c.content,
-                }
-                for c in reversed(comments)  # Ordre chronologique pour l'affichage
-            ],
-        })
-
-    cursor_value = next_cursor.isoformat() if next_cursor else None
-    return FeedResponse(items=items, next_cursor=cursor_value)
+    shares, next_cursor = keyset_page(
+        session, select(Share), Share.created_at, Share.share_id, limit, cursor
+    )
+
+    items = hydrate_feed_items(session, shares)
+
+    return FeedResponse(items=items, next_cursor=next_cursor)
+
+
+@router.get("/home", response_model=FeedResponse)
+def get_home_feed(
+    user_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    session: Session = Depends(get_session),
+) -> FeedResponse:
+    """Feed personnalisé (ses partages + ceux des comptes suivis), lu depuis la timeline matérialisée."""
+    shares, next_cursor = keyset_page(
+        session,
+        timeline_statement(user_id),
+        TimelineEntry.created_at,
+        TimelineEntry.share_id,
+        limit,
+        cursor,
+        key=lambda share: (share.created_at, share.share_id),
+    )
+
+    items = hydrate_feed_items(session, shares)
+
+    return FeedResponse(items=items, next_cursor=next_cursor)
@@ -1,12 +1,12 @@
 """API endpoints pour les classements."""
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from sqlmodel import Session
 from typing import Optional
-from datetime import datetime, timezone, timedelta
 
 from ..db import get_session
-from ..models import User, Share, Like, Follower, Workout, Set
+from ..services.leaderboard import read_leaderboard
+from ..services.ranked_index import ranked_boards
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
@@ -25,6 +25,45 @@ class LeaderboardResponse(BaseModel):
     period: str  # 'week', 'month', 'all'
     entries: list[LeaderboardEntry]
     my_rank: Optional[int]
+    # Rangs autour de l'utilisateur courant (vide s'il n'est pas classé)
+    around_me: list[LeaderboardEntry] = []
+
+
+def _leaderboard_response(
+    session: Session,
+    type: str,
+    period: str,
+    current_user_id: Optional[str],
+    limit: int,
+    around: int,
+) -> LeaderboardResponse:
+    """Classement en mémoire s'il est tenu par ce process, sinon dernier snapshot."""
+    if ranked_boards.serves(type, period):
+        top, around_me, my_rank = ranked_boards.read(
+            session, type, period, current_user_id, limit, around
+        )
+    else:
+        top, around_me, my_rank = read_leaderboard(
+            session, type, period, current_user_id, limit, around
+        )
+
+    def to_entry(row) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            rank=row.rank,
+            user_id=row.user_id,
+            username=row.username,
+            avatar_url=row.avatar_url,
+            score=row.score,
+            change=row.change,
+        )
+
+    return LeaderboardResponse(
+        type=type,
+        period=period,
+        entries=[to_entry(row) for row in top],
+        my_rank=my_rank,
+        around_me=[to_entry(row) for row in around_me],
+    )
 
 
 @router.get("/volume", response_model=LeaderboardResponse)
@@ -32,67 +71,12 @@ def get_volume_leaderboard(
     period: str = Query("week", regex="^(week|month|all)$"),
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
+    around: int = Query(2, ge=0, le=10),
     session: Session = Depends(get_session)
 ) -> LeaderboardResponse:
     """Classement par volume total (kg × reps)."""
     
-    # Calculer la date de début selon la période
-    now = datetime.now(timezone.utc)
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:
-        start_date = None
-    
-    # Pour l'instant, on utilise les données de Share comme proxy
-    # (le volume réel nécessiterait de joindre les sets)
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        # Compter le nombre de sets partagés comme proxy du volume
-        shares_query = select(Share).where(Share.owner_id == user.id)
-        if start_date:
-            shares_query = shares_query.where(Share.created_at >= start_date)
-        shares = session.exec(shares_query).all()
-        
-        # Calculer un score basé sur les séances partagées
-        score = sum(s.set_count * 50 for s in shares)  # Approximation: 50kg moyenne par set
-        
-        if score > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": score,
-            })
-    
-    # Trier par score décroissant
-    entries.sort(key=lambda x: -x["score"])
-    
-    # Ajouter les rangs
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,  # TODO: calculer le changement
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="volume",
-        period=period,
-        entries=result_entries,
-        my_rank=my_rank,
-    )
+    return _leaderboard_response(session, "volume", period, current_user_id, limit, around)
 
 
 @router.get("/sessions", response_model=LeaderboardResponse)
@@ -100,162 +84,33 @@ def get_sessions_leaderboard(
     period: str = Query("week", regex="^(week|month|all)$"),
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
+    around: int = Query(2, ge=0, le=10),
     session: Session = Depends(get_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de séances."""
     
-    now = datetime.now(timezone.utc)
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:
-        start_date = None
-    
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        shares_query = select(func.count()).select_from(Share).where(Share.owner_id == user.id)
-        if start_date:
-            shares_query = shares_query.where(Share.created_at >= start_date)
-        count = session.exec(shares_query).one()
-        
-        if count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="sessions",
-        period=period,
-        entries=result_entries,
-        my_rank=my_rank,
-    )
+    return _leaderboard_response(session, "sessions", period, current_user_id, limit, around)
 
 
 @router.get("/likes", response_model=LeaderboardResponse)
 def get_likes_leaderboard(
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
+    around: int = Query(2, ge=0, le=10),
     session: Session = Depends(get_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de likes reçus."""
     
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        # Compter les likes sur les posts de l'utilisateur
-        shares = session.exec(select(Share.share_id).where(Share.owner_id == user.id)).all()
-        if shares:
-            likes_count = session.exec(
-                select(func.count()).select_from(Like).where(Like.share_id.in_(shares))
-            ).one()
-        else:
-            likes_count = 0
-        
-        if likes_count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": likes_count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="likes",
-        period="all",
-        entries=result_entries,
-        my_rank=my_rank,
-    )
+    return _leaderboard_response(session, "likes", "all", current_user_id, limit, around)
 
 
 @router.get("/followers", response_model=LeaderboardResponse)
 def get_followers_leaderboard(
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
+    around: int = Query(2, ge=0, le=10),
     session: Session = Depends(get_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de followers."""
     
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        followers_count = session.exec(
-            select(func.count()).select_from(Follower).where(Follower.followed_id == user.id)
-        ).one()
-        
-        if followers_count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": followers_count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="followers",
-        period="all",
-        entries=result_entries,
-        my_rank=my_rank,
-    )
-
-
-
-
+    return _leaderboard_response(session, "followers", "all", current_user_id, limit, around)
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response
-from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from pydantic import BaseModel, Field
+from sqlalchemy import and_
+from sqlmodel import Session, select
 from typing import Optional
 
 from ..db import get_session
-from ..models import Like, Share, User, Comment, Notification, CommentLike
+from ..models import Like, Share, User, Comment, CommentLike
+from ..services.counters import bump_comment_likes, bump_share_counter, bump_user_counters
+from ..services.like_buffer import like_buffer
+from ..services.notification_outbox import enqueue_notification
+from ..services.ranked_index import ranked_boards
+from ..services.relations import toggle_relation
+from ..utils.pagination import keyset_page
 
 router = APIRouter(prefix="/likes", tags=["likes"])
 
@@ -32,13 +39,80 @@ class CommentResponse(BaseModel):
     created_at: str
 
 
+class BatchLikeStatusRequest(BaseModel):
+    user_id: str
+    share_ids: list[str] = Field(default_factory=list, max_length=100)
+    comment_ids: list[str] = Field(default_factory=list, max_length=100)
+
+
+class ShareLikeStatus(BaseModel):
+    liked: bool
+    like_count: int
+    comment_count: int
+
+
+class BatchLikeStatusResponse(BaseModel):
+    shares: dict[str, ShareLikeStatus]
+    comments: dict[str, LikeResponse]
+
+
 class CommentsListResponse(BaseModel):
     comments: list[CommentResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 
 # ==================== LIKES ====================
 
+# Déclarée avant POST /{share_id} pour ne pas être capturée par la route paramétrée
+@router.post("/batch-status", response_model=BatchLikeStatusResponse)
+def get_batch_like_status(
+    payload: BatchLikeStatusRequest,
+    session: Session = Depends(get_session),
+) -> BatchLikeStatusResponse:
+    """Statut "liké par moi" + compteurs pour une page de partages/commentaires.
+
+    Deux requêtes au total (une pour les partages, une pour les commentaires),
+    quelle que soit la taille de la page. Les ids inconnus sont ignorés.
+    """
+    shares: dict[str, ShareLikeStatus] = {}
+    if payload.share_ids:
+        rows = session.exec(
+            select(Share.share_id, Share.like_count, Share.comment_count, Like.id)
+            .outerjoin(
+                Like,
+                and_(Like.share_id == Share.share_id, Like.user_id == payload.user_id),
+            )
+            .where(Share.share_id.in_(payload.share_ids))
+        ).all()
+        deltas = like_buffer.pending_deltas(payload.share_ids)
+        for share_id, like_count, comment_count, like_id in rows:
+            pending = like_buffer.pending_state(share_id, payload.user_id)
+            shares[share_id] = ShareLikeStatus(
+                liked=like_id is not None if pending is None else pending,
+                like_count=like_count + deltas[share_id],
+                comment_count=comment_count,
+            )
+
+    comments: dict[str, LikeResponse] = {}
+    if payload.comment_ids:
+        rows = session.exec(
+            select(Comment.id, Comment.like_count, CommentLike.id)
+            .outerjoin(
+                CommentLike,
+                and_(
+                    CommentLike.comment_id == Comment.id,
+                    CommentLike.user_id == payload.user_id,
+                ),
+            )
+            .where(Comment.id.in_(payload.comment_ids))
+        ).all()
+        for comment_id, like_count, like_id in rows:
+            comments[comment_id] = LikeResponse(liked=like_id is not None, like_count=like_count)
+
+    return BatchLikeStatusResponse(shares=shares, comments=comments)
+
+
 @router.post("/{share_id}", response_model=LikeResponse)
 def toggle_like(share_id: str, payload: LikeRequest, session: Session = Depends(get_session)) -> LikeResponse:
     """Toggle like sur un partage (like si pas liké, unlike si déjà liké)"""
@@ -53,42 +127,36 @@ def toggle_like(share_id: str, payload: LikeRequest, session: Session = Depends(
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
     
-    # Chercher si déjà liké
-    existing_like = session.exec(
-        select(Like)
-        .where(Like.share_id == share_id)
-        .where(Like.user_id == payload.user_id)
-    ).first()
+    # Tampon activé : le toggle reste en mémoire jusqu'au prochain flush
+    if like_buffer.enabled:
+        liked = like_buffer.toggle(session, share_id, payload.user_id)
+        return LikeResponse(
+            liked=liked, like_count=share.like_count + like_buffer.pending_delta(share_id)
+        )
     
-    if existing_like:
-        # Unlike
-        session.delete(existing_like)
-        session.commit()
-        liked = False
+    # Unlike si le like existe, like sinon (index unique : pas de doublon possible)
+    liked, changed = toggle_relation(session, Like, share_id=share_id, user_id=payload.user_id)
+    if changed:
+        like_count = bump_share_counter(session, share_id, "like_count", 1 if liked else -1)
+        bump_user_counters(session, share.owner_id, total_likes=1 if liked else -1)
     else:
-        # Like
-        new_like = Like(user_id=payload.user_id, share_id=share_id)
-        session.add(new_like)
-        session.commit()
-        liked = True
-        
-        # Créer une notification si ce n'est pas son propre post
-        if share.owner_id != payload.user_id:
-            notification = Notification(
-                user_id=share.owner_id,
-                type="like",
-                actor_id=payload.user_id,
-                actor_username=user.username,
-                reference_id=share_id,
-                message=f"{user.username} a aimé ta séance",
-            )
-            session.add(notification)
-            session.commit()
+        like_count = share.like_count
     
-    # Compter le nombre total de likes
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
+    # Notifier l'auteur (outbox, même transaction) si ce n'est pas son propre post
+    if liked and changed and share.owner_id != payload.user_id:
+        enqueue_notification(
+            session,
+            user_id=share.owner_id,
+            type="like",
+            actor_id=payload.user_id,
+            actor_username=user.username,
+            reference_id=share_id,
+            message=f"{user.username} a aimé ta séance",
+        )
+    
+    session.commit()
+    if changed:
+        ranked_boards.adjust("likes", share.owner_id, 1 if liked else -1)
     
     return LikeResponse(liked=liked, like_count=like_count)
 
@@ -103,20 +171,22 @@ def get_like_status(share_id: str, user_id: str, session: Session = Depends(get_
         .where(Like.user_id == user_id)
     ).first()
     
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
+    like_count = session.exec(select(Share.like_count).where(Share.share_id == share_id)).first()
     
-    return LikeResponse(liked=existing_like is not None, like_count=like_count)
+    # Toggles pas encore écrits par le tampon
+    pending = like_buffer.pending_state(share_id, user_id)
+    liked = existing_like is not None if pending is None else pending
+    like_count = (like_count or 0) + like_buffer.pending_delta(share_id)
+    
+    return LikeResponse(liked=liked, like_count=like_count)
 
 
 @router.get("/{share_id}/count")
 def get_like_count(share_id: str, session: Session = Depends(get_session)) -> dict:
     """Récupère le nombre de likes d'un partage"""
     
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
+    like_count = session.exec(select(Share.like_count).where(Share.share_id == share_id)).first()
+    like_count = (like_count or 0) + like_buffer.pending_delta(share_id)
     
     return {"share_id": share_id, "like_count": like_count}
 
@@ -152,12 +222,12 @@ def add_comment(share_id: str, payload: CommentRequest, session: Session = Depen
         content=content,
     )
     session.add(comment)
-    session.commit()
-    session.refresh(comment)
+    bump_share_counter(session, share_id, "comment_count", 1)
     
-    # Créer une notification si ce n'est pas son propre post
+    # Notifier l'auteur (outbox, même transaction) si ce n'est pas son propre post
     if share.owner_id != payload.user_id:
-        notification = Notification(
+        enqueue_notification(
+            session,
             user_id=share.owner_id,
             type="comment",
             actor_id=payload.user_id,
@@ -165,8 +235,9 @@ def add_comment(share_id: str, payload: CommentRequest, session: Session = Depen
             reference_id=share_id,
             message=f"{user.username} a commenté ta séance: \"{content[:50]}{'...' if len(content) > 50 else ''}\"",
         )
-        session.add(notification)
-        session.commit()
+    
+    session.commit()
+    session.refresh(comment)
     
     return CommentResponse(
         id=comment.id,
@@ -178,19 +249,24 @@ def add_comment(share_id: str, payload: CommentRequest, session: Session = Depen
 
 
 @router.get("/{share_id}/comments", response_model=CommentsListResponse)
-def get_comments(share_id: str, limit: int = 20, session: Session = Depends(get_session)) -> CommentsListResponse:
+def get_comments(
+    share_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> CommentsListResponse:
     """Récupérer les commentaires d'un partage"""
     
-    comments = session.exec(
-        select(Comment)
-        .where(Comment.share_id == share_id)
-        .order_by(Comment.created_at.desc())
-        .limit(limit)
-    ).all()
+    comments, next_cursor = keyset_page(
+        session,
+        select(Comment).where(Comment.share_id == share_id),
+        Comment.created_at,
+        Comment.id,
+        limit,
+        cursor,
+    )
     
-    total = session.exec(
-        select(func.count()).select_from(Comment).where(Comment.share_id == share_id)
-    ).one()
+    total = session.exec(select(Share.comment_count).where(Share.share_id == share_id)).first() or 0
     
     return CommentsListResponse(
         comments=[
@@ -204,6 +280,7 @@ def get_comments(share_id: str, limit: int = 20, session: Session = Depends(get_
             for c in comments
         ],
         total=total,
+        next_cursor=next_cursor,
     )
 
 
@@ -219,6 +296,7 @@ def delete_comment(share_id: str, comment_id: str, user_id: str, session: Sessio
         raise HTTPException(status_code=403, detail="not_authorized")
     
     session.delete(comment)
+    bump_share_counter(session, comment.share_id, "comment_count", -1)
     session.commit()
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -240,29 +318,15 @@ def toggle_comment_like(comment_id: str, payload: LikeRequest, session: Session
     if not comment:
         raise HTTPException(status_code=404, detail="comment_not_found")
     
-    # Chercher un like existant
-    existing_like = session.exec(
-        select(CommentLike)
-        .where(CommentLike.comment_id == comment_id)
-        .where(CommentLike.user_id == payload.user_id)
-    ).first()
-    
-    if existing_like:
-        # Unlike
-        session.delete(existing_like)
-        session.commit()
-        liked = False
+    # Unlike si le like existe, like sinon (index unique : pas de doublon possible)
+    liked, changed = toggle_relation(
+        session, CommentLike, comment_id=comment_id, user_id=payload.user_id
+    )
+    if changed:
+        like_count = bump_comment_likes(session, comment_id, 1 if liked else -1)
     else:
-        # Like
-        new_like = CommentLike(comment_id=comment_id, user_id=payload.user_id)
-        session.add(new_like)
-        session.commit()
-        liked = True
-    
-    # Compter les likes
-    like_count = session.exec(
-        select(func.count()).select_from(CommentLike).where(CommentLike.comment_id == comment_id)
-    ).one()
+        like_count = comment.like_count
+    session.commit()
     
     return CommentLikeResponse(liked=liked, like_count=like_count)
 
@@ -277,9 +341,7 @@ def get_comment_like_status(comment_id: str, user_id: str, session: Session = De
         .where(CommentLike.user_id == user_id)
     ).first()
     
-    like_count = session.exec(
-        select(func.count()).select_from(CommentLike).where(CommentLike.comment_id == comment_id)
-    ).one()
+    like_count = session.exec(select(Comment.like_count).where(Comment.id == comment_id)).first()
     
-    return CommentLikeResponse(liked=existing_like is not None, like_count=like_count)
+    return CommentLikeResponse(liked=existing_like is not None, like_count=like_count or 0)
 
@@ -1,11 +1,18 @@
 """API endpoints pour les notifications."""
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import delete, func, tuple_, update
 from sqlmodel import Session, select
 from typing import Optional
 
-from ..db import get_session
-from ..models import Notification, User, Share, Like, Comment, Follower
+from ..db import get_engine, get_session
+from ..models import Notification, NotificationActor
+from ..services.notification_bus import notification_bus, notification_cursor, notification_event
+from ..utils.pagination import decode_cursor, keyset_page
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -19,73 +26,155 @@ class NotificationResponse(BaseModel):
     message: str
     read: bool
     created_at: str
+    actor_count: int = 1
+    latest_actors: list[dict] = []
+
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
 
 
 class NotificationListResponse(BaseModel):
     notifications: list[NotificationResponse]
     unread_count: int
+    next_cursor: Optional[str] = None
+    # Curseur de la notification la plus récente renvoyée, à repasser en `since`
+    latest_cursor: Optional[str] = None
 
 
-def create_notification(
-    session: Session,
-    user_id: str,
-    type: str,
-    actor_id: str,
-    actor_username: str,
-    message: str,
-    reference_id: Optional[str] = None
-) -> Notification:
-    """Créer une nouvelle notification."""
-    notification = Notification(
-        user_id=user_id,
-        type=type,
-        actor_id=actor_id,
-        actor_username=actor_username,
-        reference_id=reference_id,
-        message=message,
-        read=False,
-    )
-    session.add(notification)
-    session.commit()
-    session.refresh(notification)
-    return notification
+def count_unread(session: Session, user_id: str) -> int:
+    """Nombre de notifications non lues (COUNT couvert par l'index (user_id, read, created_at))."""
+    return session.exec(
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.user_id == user_id)
+        .where(Notification.read.is_(False))
+    ).one()
+
+
+def notifications_since(session: Session, user_id: str, since: str, limit: int) -> list[Notification]:
+    """Notifications plus récentes que le curseur `since`, les plus anciennes d'abord."""
+    return session.exec(
+        select(Notification)
+        .where(Notification.user_id == user_id)
+        .where(tuple_(Notification.created_at, Notification.id) > decode_cursor(since))
+        .order_by(Notification.created_at.asc(), Notification.id.asc())
+        .limit(limit)
+    ).all()
 
 
 @router.get("/{user_id}", response_model=NotificationListResponse)
 def get_notifications(
     user_id: str,
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
     session: Session = Depends(get_session)
 ) -> NotificationListResponse:
-    """Récupérer les notifications d'un utilisateur."""
+    """Récupérer les notifications d'un utilisateur.
+
+    `cursor` pagine vers les plus anciennes. `since` (le `latest_cursor` d'une
+    réponse précédente) ne renvoie que les notifications plus récentes ; si la
+    page est pleine, rappeler avec le nouveau `latest_cursor`.
+    """
     
-    notifications = session.exec(
-        select(Notification)
-        .where(Notification.user_id == user_id)
-        .order_by(Notification.created_at.desc())
-        .limit(limit)
-    ).all()
+    if cursor and since:
+        raise HTTPException(status_code=400, detail="cursor_and_since")
     
-    unread_count = len([n for n in notifications if not n.read])
+    if since:
+        newer = notifications_since(session, user_id, since, limit)
+        latest_cursor = notification_cursor(newer[-1]) if newer else since
+        notifications, next_cursor = list(reversed(newer)), None
+    else:
+        notifications, next_cursor = keyset_page(
+            session,
+            select(Notification).where(Notification.user_id == user_id),
+            Notification.created_at,
+            Notification.id,
+            limit,
+            cursor,
+        )
+        latest_cursor = notification_cursor(notifications[0]) if notifications and not cursor else None
+    
+    unread_count = count_unread(session, user_id)
     
     return NotificationListResponse(
-        notifications=[
-            NotificationResponse(
-                id=n.id,
-                type=n.type,
-                actor_id=n.actor_id,
-                actor_username=n.actor_username,
-                reference_id=n.reference_id,
-                message=n.message,
-                read=n.read,
-                created_at=n.created_at.isoformat(),
-            )
-            for n in notifications
-        ],
+        notifications=[NotificationResponse(**notification_event(n)) for n in notifications],
         unread_count=unread_count,
+        next_cursor=next_cursor,
+        latest_cursor=latest_cursor,
+    )
+
+
+# Intervalle des commentaires SSE qui gardent la connexion ouverte (proxies)
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _sse(event: dict) -> str:
+    data = json.dumps(event["notification"], ensure_ascii=False)
+    return f"id: {event['cursor']}\nevent: notification\ndata: {data}\n\n"
+
+
+@router.get("/{user_id}/stream")
+async def stream_notifications(
+    user_id: str,
+    request: Request,
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """Flux SSE des nouvelles notifications (remplace le polling).
+
+    À la (re)connexion, les notifications manquées depuis `since` ou
+    l'en-tête `Last-Event-ID` sont d'abord relues en base.
+    """
+    since = since or last_event_id
+    if since:
+        decode_cursor(since)
+    # Abonnement avant la relecture : aucun évènement perdu entre les deux
+    queue = notification_bus.subscribe(user_id)
+
+    def load_missed() -> list[dict]:
+        with Session(get_engine()) as session:
+            return [
+                {"cursor": notification_cursor(n), "notification": notification_event(n)}
+                for n in notifications_since(session, user_id, since, 100)
+            ]
+
+    async def events():
+        try:
+            sent: set[str] = set()
+            if since:
+                for event in await asyncio.to_thread(load_missed):
+                    sent.add(event["cursor"])
+                    yield _sse(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event["cursor"] not in sent:
+                    yield _sse(event)
+        finally:
+            notification_bus.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/{user_id}/unread-count", response_model=UnreadCountResponse)
+def get_unread_count(
+    user_id: str,
+    session: Session = Depends(get_session)
+) -> UnreadCountResponse:
+    """Nombre de notifications non lues (badge, interrogé fréquemment)."""
+    
+    return UnreadCountResponse(unread_count=count_unread(session, user_id))
+
+
 @router.post("/{user_id}/read-all")
 def mark_all_read(
     user_id: str,
@@ -93,19 +182,16 @@ def mark_all_read(
 ) -> dict:
     """Marquer toutes les notifications comme lues."""
     
-    notifications = session.exec(
-        select(Notification)
+    result = session.exec(
+        update(Notification)
         .where(Notification.user_id == user_id)
-        .where(Notification.read == False)
-    ).all()
-    
-    for n in notifications:
-        n.read = True
-        session.add(n)
-    
+        .where(Notification.read.is_(False))
+        .values(read=True)
+        .execution_options(synchronize_session=False)
+    )
     session.commit()
     
-    return {"marked_read": len(notifications)}
+    return {"marked_read": result.rowcount}
 
 
 @router.post("/{notification_id}/read")
@@ -135,6 +221,9 @@ def delete_notification(
     notification = session.get(Notification, notification_id)
     if notification:
         session.delete(notification)
+        session.exec(
+            delete(NotificationActor).where(NotificationActor.notification_id == notification_id)
+        )
         session.commit()
         return {"success": True}
     
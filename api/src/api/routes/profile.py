@@ -1,16 +1,26 @@
 """API endpoints pour les profils utilisateurs."""
-import base64
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from typing import Optional
 
 from ..db import get_session
-from ..models import User, Share, Follower, Like, Notification
+from ..models import User, Share, Follower, UserCounters
+from ..services.avatar_store import InvalidAvatar, decode_avatar, store_avatar, store_avatar_url
+from ..services.counters import bump_user_counters
+from ..services.follow_graph import follow_graph
+from ..services.follow_suggestions import mark_suggestions_stale
+from ..services.notification_outbox import enqueue_notification
+from ..services.ranked_index import ranked_boards
+from ..services.relations import delete_relation, insert_relation
+from ..services.timeline import backfill_follow, prune_unfollow
+from ..utils.pagination import keyset_page
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 
+RELATIONSHIPS_MAX_IDS = 200
+
 
 class ProfileResponse(BaseModel):
     id: str
@@ -38,6 +48,42 @@ class ProfileUpdateRequest(BaseModel):
 class UserPostsResponse(BaseModel):
     posts: list[dict]
     total: int
+    next_cursor: Optional[str] = None
+
+
+class Relationship(BaseModel):
+    following: bool  # l'utilisateur courant suit ce compte
+    followed_by: bool  # ce compte suit l'utilisateur courant
+    followers_count: int
+
+
+class RelationshipsResponse(BaseModel):
+    relationships: dict[str, Relationship]
+
+
+# Déclarée avant /{user_id} pour ne pas être prise pour un profil
+@router.get("/relationships", response_model=RelationshipsResponse)
+def get_relationships(
+    current_user_id: str,
+    user_ids: str = Query(..., description="Identifiants séparés par des virgules"),
+) -> RelationshipsResponse:
+    """Relations de l'utilisateur courant avec une liste de comptes (écrans de liste)."""
+    
+    ids = list(dict.fromkeys(user_id for user_id in user_ids.split(",") if user_id))[:RELATIONSHIPS_MAX_IDS]
+    following = follow_graph.which_followed(current_user_id, ids)
+    followed_by = follow_graph.which_follow(current_user_id, ids)
+    counts = follow_graph.follower_counts(ids)
+    
+    return RelationshipsResponse(
+        relationships={
+            user_id: Relationship(
+                following=user_id in following,
+                followed_by=user_id in followed_by,
+                followers_count=counts[user_id],
+            )
+            for user_id in ids
+        }
+    )
 
 
 @router.get("/{user_id}", response_model=ProfileResponse)
@@ -52,38 +98,13 @@ def get_profile(
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
     
-    # Compter les posts (shares)
-    posts_count = session.exec(
-        select(func.count()).select_from(Share).where(Share.owner_id == user_id)
-    ).one()
-    
-    # Compter les followers
-    followers_count = session.exec(
-        select(func.count()).select_from(Follower).where(Follower.followed_id == user_id)
-    ).one()
-    
-    # Compter les following
-    following_count = session.exec(
-        select(func.count()).select_from(Follower).where(Follower.follower_id == user_id)
-    ).one()
-    
-    # Compter les likes reçus sur tous ses posts
-    user_shares = session.exec(select(Share.share_id).where(Share.owner_id == user_id)).all()
-    total_likes = 0
-    if user_shares:
-        total_likes = session.exec(
-            select(func.count()).select_from(Like).where(Like.share_id.in_(user_shares))
-        ).one()
+    # Compteurs dénormalisés : une lecture par clé primaire
+    counters = session.get(UserCounters, user_id) or UserCounters(user_id=user_id)
     
     # Vérifier si l'utilisateur courant suit ce profil
     is_following = False
     if current_user_id and current_user_id != user_id:
-        follow = session.exec(
-            select(Follower)
-            .where(Follower.follower_id == current_user_id)
-            .where(Follower.followed_id == user_id)
-        ).first()
-        is_following = follow is not None
+        is_following = follow_graph.follows(current_user_id, user_id)
     
     return ProfileResponse(
         id=user.id,
@@ -91,10 +112,10 @@ def get_profile(
         avatar_url=user.avatar_url,
         bio=user.bio,
         objective=user.objective,
-        posts_count=posts_count,
-        followers_count=followers_count,
-        following_count=following_count,
-        total_likes=total_likes,
+        posts_count=counters.posts_count,
+        followers_count=counters.followers_count,
+        following_count=counters.following_count,
+        total_likes=counters.total_likes,
         is_following=is_following,
         is_own_profile=current_user_id == user_id,
         created_at=user.created_at.isoformat(),
@@ -115,7 +136,10 @@ def update_profile(
     
     # Mettre à jour les champs fournis
     if payload.avatar_url is not None:
-        user.avatar_url = payload.avatar_url
+        try:
+            user.avatar_url = store_avatar_url(payload.avatar_url)
+        except InvalidAvatar as exc:
+            raise HTTPException(status_code=400, detail=exc.detail) from exc
     if payload.bio is not None:
         # Limiter la bio à 150 caractères
         user.bio = payload.bio[:150] if payload.bio else None
@@ -134,6 +158,7 @@ def update_profile(
 def get_user_posts(
     user_id: str,
     limit: int = 20,
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session)
 ) -> UserPostsResponse:
     """Récupérer les posts d'un utilisateur."""
@@ -142,34 +167,30 @@ def get_user_posts(
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
     
-    shares = session.exec(
-        select(Share)
-        .where(Share.owner_id == user_id)
-        .order_by(Share.created_at.desc())
-        .limit(limit)
-    ).all()
+    shares, next_cursor = keyset_page(
+        session,
+        select(Share).where(Share.owner_id == user_id),
+        Share.created_at,
+        Share.share_id,
+        limit,
+        cursor,
+    )
     
-    total = session.exec(
-        select(func.count()).select_from(Share).where(Share.owner_id == user_id)
-    ).one()
+    counters = session.get(UserCounters, user_id)
+    total = counters.posts_count if counters else 0
     
     posts = []
     for share in shares:
-        # Compter les likes pour ce post
-        like_count = session.exec(
-            select(func.count()).select_from(Like).where(Like.share_id == share.share_id)
-        ).one()
-        
         posts.append({
             "share_id": share.share_id,
             "workout_title": share.workout_title,
             "exercise_count": share.exercise_count,
             "set_count": share.set_count,
-            "like_count": like_count,
+            "like_count": share.like_count,
             "created_at": share.created_at.isoformat(),
         })
     
-    return UserPostsResponse(posts=posts, total=total)
+    return UserPostsResponse(posts=posts, total=total, next_cursor=next_cursor)
 
 
 @router.post("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
@@ -189,29 +210,25 @@ def follow_user(
     if not user or not follower:
         raise HTTPException(status_code=404, detail="user_not_found")
     
-    # Vérifier si déjà suivi
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == follower_id)
-        .where(Follower.followed_id == user_id)
-    ).first()
-    
-    if not existing:
-        follow = Follower(follower_id=follower_id, followed_id=user_id)
-        session.add(follow)
-        session.commit()
+    # Insertion idempotente (index unique sur la paire follower/followed)
+    if insert_relation(session, Follower, follower_id=follower_id, followed_id=user_id):
+        backfill_follow(session, follower_id, user_id)
+        mark_suggestions_stale(session, follower_id)
+        bump_user_counters(session, follower_id, following_count=1)
+        bump_user_counters(session, user_id, followers_count=1)
         
-        # Créer une notification pour le suivi
-        notification = Notification(
+        # Notification de suivi (outbox, même transaction)
+        enqueue_notification(
+            session,
             user_id=user_id,
             type="follow",
             actor_id=follower_id,
             actor_username=follower.username,
-            reference_id=None,
             message=f"{follower.username} a commencé à te suivre",
         )
-        session.add(notification)
         session.commit()
+        follow_graph.add(follower_id, user_id)
+        ranked_boards.adjust("followers", user_id, 1)
 
 
 @router.delete("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
@@ -222,31 +239,43 @@ def unfollow_user(
 ):
     """Ne plus suivre un utilisateur."""
     
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == follower_id)
-        .where(Follower.followed_id == user_id)
-    ).first()
-    
-    if existing:
-        session.delete(existing)
+    if delete_relation(session, Follower, follower_id=follower_id, followed_id=user_id):
+        prune_unfollow(session, follower_id, user_id)
+        mark_suggestions_stale(session, follower_id)
+        bump_user_counters(session, follower_id, following_count=-1)
+        bump_user_counters(session, user_id, followers_count=-1)
         session.commit()
+        follow_graph.remove(follower_id, user_id)
+        ranked_boards.adjust("followers", user_id, -1)
 
 
 @router.get("/{user_id}/followers")
 def get_followers(
     user_id: str,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user_id: Optional[str] = None,
     session: Session = Depends(get_session)
 ) -> dict:
-    """Liste des followers d'un utilisateur."""
+    """Liste des followers d'un utilisateur (les plus récents d'abord)."""
     
-    followers = session.exec(
+    followers, next_cursor = keyset_page(
+        session,
         select(Follower, User)
         .join(User, User.id == Follower.follower_id)
-        .where(Follower.followed_id == user_id)
-        .limit(limit)
-    ).all()
+        .where(Follower.followed_id == user_id),
+        Follower.created_at,
+        Follower.id,
+        limit,
+        cursor,
+        key=lambda row: (row[0].created_at, row[0].id),
+    )
+    
+    # Relation de l'utilisateur courant avec chaque compte, en un appel au graphe
+    followed = (
+        follow_graph.which_followed(current_user_id, [user.id for _, user in followers])
+        if current_user_id else set()
+    )
     
     return {
         "followers": [
@@ -254,10 +283,12 @@ def get_followers(
                 "id": user.id,
                 "username": user.username,
                 "avatar_url": user.avatar_url,
+                "is_following": user.id in followed,
             }
             for _, user in followers
         ],
         "total": len(followers),
+        "next_cursor": next_cursor,
     }
 
 
@@ -265,16 +296,28 @@ def get_followers(
 def get_following(
     user_id: str,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user_id: Optional[str] = None,
     session: Session = Depends(get_session)
 ) -> dict:
-    """Liste des utilisateurs suivis."""
+    """Liste des utilisateurs suivis (les plus récents d'abord)."""
     
-    following = session.exec(
+    following, next_cursor = keyset_page(
+        session,
         select(Follower, User)
         .join(User, User.id == Follower.followed_id)
-        .where(Follower.follower_id == user_id)
-        .limit(limit)
-    ).all()
+        .where(Follower.follower_id == user_id),
+        Follower.created_at,
+        Follower.id,
+        limit,
+        cursor,
+        key=lambda row: (row[0].created_at, row[0].id),
+    )
+    
+    followed = (
+        follow_graph.which_followed(current_user_id, [user.id for _, user in following])
+        if current_user_id else set()
+    )
     
     return {
         "following": [
@@ -282,10 +325,12 @@ def get_following(
                 "id": user.id,
                 "username": user.username,
                 "avatar_url": user.avatar_url,
+                "is_following": user.id in followed,
             }
             for _, user in following
         ],
         "total": len(following),
+        "next_cursor": next_cursor,
     }
 
 
@@ -306,37 +351,17 @@ def upload_avatar(
     payload: AvatarUploadRequest,
     session: Session = Depends(get_session)
 ) -> AvatarUploadResponse:
-    """Upload un avatar pour un utilisateur (stocké en base64)."""
+    """Upload un avatar (base64 ou data URI), écrit dans le stockage des avatars."""
     
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
     
-    # Valider et nettoyer le base64
-    image_data = payload.image_base64
-    
-    # Si format data URI, extraire le base64
-    if image_data.startswith("data:"):
-        # Format: data:image/jpeg;base64,/9j/4AAQ...
-        parts = image_data.split(",", 1)
-        if len(parts) == 2:
-            image_data = parts[1]
-    
-    # Valider que c'est du base64 valide
+    # Seule l'URL courte (/avatars/<sha256>) est gardée en base
     try:
-        decoded = base64.b64decode(image_data)
-        if len(decoded) > 5 * 1024 * 1024:  # Max 5MB
-            raise HTTPException(status_code=400, detail="image_too_large")
-    except Exception:
-        raise HTTPException(status_code=400, detail="invalid_base64")
-    
-    # Stocker directement le data URI complet
-    # Format: data:image/jpeg;base64,{base64_data}
-    if not payload.image_base64.startswith("data:"):
-        # Assumer JPEG si pas de header
-        avatar_url = f"data:image/jpeg;base64,{image_data}"
-    else:
-        avatar_url = payload.image_base64
+        avatar_url = store_avatar(decode_avatar(payload.image_base64))
+    except InvalidAvatar as exc:
+        raise HTTPException(status_code=400, detail=exc.detail) from exc
     
     # Mettre à jour l'utilisateur
     user.avatar_url = avatar_url
@@ -0,0 +1,47 @@
+"""API endpoint d'autocomplétion (pseudos et exercices)."""
+
+from fastapi import APIRouter
+from fastapi import Query
+from pydantic import BaseModel
+
+from ..services.suggest_index import suggest_index
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+class UserSuggestion(BaseModel):
+    id: str
+    username: str
+
+
+class ExerciseSuggestion(BaseModel):
+    id: str
+    name: str
+    slug: str | None
+    muscle_group: str | None
+
+
+class SuggestResponse(BaseModel):
+    users: list[UserSuggestion]
+    exercises: list[ExerciseSuggestion]
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+def suggest(
+    q: str = Query(..., min_length=1),
+    types: str = Query("users,exercises", pattern="^(users|exercises)(,(users|exercises))?$"),
+    limit: int = Query(8, ge=1, le=20),
+) -> SuggestResponse:
+    """Suggestions à la frappe, servies depuis l'index de préfixes en mémoire."""
+    
+    requested = set(types.split(","))
+    users = suggest_index.suggest(q, {"user"}, limit) if "users" in requested else []
+    exercises = suggest_index.suggest(q, {"exercise"}, limit) if "exercises" in requested else []
+    
+    return SuggestResponse(
+        users=[UserSuggestion(id=s.id, username=s.label) for s in users],
+        exercises=[
+            ExerciseSuggestion(id=s.id, name=s.label, slug=s.slug, muscle_group=s.muscle_group)
+            for s in exercises
+        ],
+    )
@@ -11,6 +11,11 @@ from src.api.models import (
     User, Share, Follower, Workout, WorkoutExercise, 
     Set, Exercise, Like, Notification, Comment
 )
+from src.api.services.counters import reconcile_counters, reconcile_user_counters
+from src.api.services.personal_records import rebuild_personal_records
+from src.api.services.timeline import rebuild_all_timelines
+from src.api.services.timeseries import timeseries_cache
+from src.api.services.volume_rollup import rebuild_volume_rollup
 
 router = APIRouter(prefix="/seed", tags=["seed"])
 
@@ -383,6 +388,16 @@ def seed_demo_data():
         
         session.commit()
         
+        # Les likes/commentaires/follows/séances ont été insérés directement : recaler
+        # les compteurs, les timelines matérialisées et l'agrégat de volume
+        reconcile_counters(session)
+        reconcile_user_counters(session)
+        rebuild_all_timelines(session)
+        rebuild_volume_rollup(session)
+        rebuild_personal_records(session)
+        session.commit()
+        timeseries_cache.clear()
+        
         return {
             "status": "success",
             "message": "Données de démo créées avec succès !",
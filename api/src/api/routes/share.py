@@ -10,6 +10,11 @@ from ..db import get_session
 from ..models import Exercise, Share, User, Workout, WorkoutExercise, Set
 from ..utils.slug import make_exercise_slug
 from ..schemas import ShareRequest, ShareResponse
+from ..services.counters import bump_user_counters
+from ..services.personal_records import refresh_personal_records
+from ..services.ranked_index import ranked_boards
+from ..services.timeline import fan_out_share
+from ..services.trending import initial_trending_score
 
 router = APIRouter(prefix="/share", tags=["share"])
 
@@ -127,6 +132,7 @@ def share_workout(
         sets = session.exec(select(Set).where(Set.workout_exercise_id == we.id)).all()
         set_count += len(sets)
 
+    created_at = datetime.now(timezone.utc)
     share = Share(
         share_id=_generate_share_id(),
         owner_id=user.id,
@@ -135,10 +141,17 @@ def share_workout(
         workout_title=workout.title,
         exercise_count=exercise_count,
         set_count=set_count,
-        created_at=datetime.now(timezone.utc),
+        trending_score=initial_trending_score(created_at),
+        created_at=created_at,
     )
     session.add(share)
+    # Fan-out dans les timelines des followers (même transaction)
+    fan_out_share(session, share)
+    bump_user_counters(session, user.id, posts_count=1)
+    # Records des exercices partagés (séance terminée hors sync : seeds, imports)
+    refresh_personal_records(session, {(workout.user_id, we.exercise_id) for we in workout_exercises})
     session.commit()
+    ranked_boards.adjust("sessions", share.owner_id, 1)
 
     return ShareResponse(
         share_id=share.share_id,
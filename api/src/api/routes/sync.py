@@ -1,15 +1,21 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 
 from ..db import get_session
-from ..models import SyncEvent, Workout
+from ..models import SyncEvent, Workout, WorkoutExercise
 from ..schemas import SyncPullResponse, SyncPushRequest, SyncPushResponse
+from ..services.personal_records import refresh_personal_records, workout_record_keys
+from ..services.timeseries import timeseries_cache
+from ..services.volume_rollup import refresh_volume_days, workout_day
 
 router = APIRouter(prefix="/sync", tags=["sync"])
 
+# Mutations de sets stockées comme SyncEvent : elles touchent le volume de la séance
+SET_ACTIONS = {"add-set", "update-set", "remove-set"}
+
 
 def _ms_to_datetime(value: Optional[int], fallback: datetime) -> datetime:
     if value is None:
@@ -34,12 +40,26 @@ def _get_workout_for_payload(session: Session, payload: dict) -> Workout:
     raise HTTPException(status_code=404, detail="Workout not found for mutation")
 
 
+def _workout_for_set_payload(session: Session, payload: dict) -> Optional[Workout]:
+    workout_exercise_id = payload.get("workoutExerciseId") or payload.get("workout_exercise_id")
+    if workout_exercise_id is None:
+        return None
+    workout_exercise = session.get(WorkoutExercise, str(workout_exercise_id))
+    if workout_exercise is None:
+        return None
+    return session.get(Workout, workout_exercise.workout_id)
+
+
 @router.post("/push", response_model=SyncPushResponse, status_code=status.HTTP_200_OK)
 def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_session)) -> SyncPushResponse:
     if not payload.mutations:
         return SyncPushResponse(processed=0, server_time=datetime.now(timezone.utc), results=[])
 
     results = []
+    # Jours (user_id, day) dont l'agrégat de volume est à recalculer
+    volume_days: set[tuple[str, date]] = set()
+    # Séances dont les records par exercice sont à recalculer
+    record_workouts: set[str] = set()
 
     for mutation in payload.mutations:
         created_at = _ms_to_datetime(mutation.created_at, datetime.now(timezone.utc))
@@ -60,6 +80,9 @@ def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_sess
             )
             session.add(workout)
             session.flush()
+            if workout.status == "completed":
+                volume_days.add((workout.user_id, workout_day(workout)))
+                record_workouts.add(workout.id)
             if workout.id is not None:
                 results.append({"queue_id": mutation.queue_id, "server_id": workout.id})
         elif action == "update-title":
@@ -70,18 +93,30 @@ def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_sess
             workout = _get_workout_for_payload(session, payload_data)
             workout.status = "completed"
             workout.updated_at = _ms_to_datetime(payload_data.get("updated_at"), created_at)
+            volume_days.add((workout.user_id, workout_day(workout)))
+            record_workouts.add(workout.id)
         elif action == "delete-workout":
             workout = _get_workout_for_payload(session, payload_data)
             workout.deleted_at = _ms_to_datetime(payload_data.get("deleted_at"), created_at)
             workout.updated_at = _ms_to_datetime(payload_data.get("updated_at"), created_at)
+            volume_days.add((workout.user_id, workout_day(workout)))
+            record_workouts.add(workout.id)
         else:
             event = SyncEvent(action=mutation.action, payload=payload_data, created_at=created_at)
             session.add(event)
             session.flush()
             if event.id is not None:
                 results.append({"queue_id": mutation.queue_id, "server_id": event.id})
-
+            if action in SET_ACTIONS:
+                workout = _workout_for_set_payload(session, payload_data)
+                if workout is not None:
+                    volume_days.add((workout.user_id, workout_day(workout)))
+                    record_workouts.add(workout.id)
+
+    refresh_volume_days(session, volume_days)
+    refresh_personal_records(session, workout_record_keys(session, record_workouts))
     session.commit()
+    timeseries_cache.invalidate({user_id for user_id, _ in volume_days})
     server_time = datetime.now(timezone.utc)
     return SyncPushResponse(processed=len(payload.mutations), server_time=server_time, results=results)
 
@@ -7,6 +7,7 @@ from sqlmodel import select
 from ..db import get_session
 from ..models import User
 from ..schemas import UserProfileCreate, UserProfileRead
+from ..services.avatar_store import InvalidAvatar, store_avatar_url
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -75,7 +76,12 @@ def update_profile(user_id: str, payload: UpdateProfileRequest, session=Depends(
         user.bio = payload.bio
     
     if payload.avatar_url is not None:
-        user.avatar_url = payload.avatar_url
+        try:
+            user.avatar_url = store_avatar_url(payload.avatar_url)
+        except InvalidAvatar as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=exc.detail
+            ) from exc
     
     if payload.objective is not None:
         user.objective = payload.objective
@@ -1,11 +1,12 @@
-from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timezone, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlmodel import Session, select
 from typing import Optional
 
 from ..db import get_session
-from ..models import User, Share
+from ..models import ExerciseProgress, PersonalRecord, User, UserWeeklyStats
+from ..services.timeseries import user_timeseries
 
 
 router = APIRouter(prefix="/users", tags=["users-stats"])
@@ -40,31 +41,25 @@ class UserStatsResponse(BaseModel):
     goal_progress_percent: float  # % de l'objectif atteint
 
 
-def _calculate_volume_and_best(shares: list[Share]) -> tuple[float, float]:
-    """Calcule le volume total et la meilleure charge d'une liste de shares."""
-    volume = 0.0
-    best_lift = 0.0
-    
-    for share in shares:
-        for ex in share.snapshot.get("exercises", []):
-            for s in ex.get("sets", []):
-                reps = s.get("reps") or 0
-                weight = s.get("weight") or 0
-                
-                if isinstance(reps, str):
-                    try:
-                        reps = int(reps.split("x")[-1])
-                    except Exception:
-                        reps = 0
-                try:
-                    w = float(weight)
-                except Exception:
-                    w = 0
-                    
-                volume += reps * w
-                best_lift = max(best_lift, w)
-    
-    return volume, best_lift
+def _week_rows(
+    session: Session, user_id: str, *week_starts: date
+) -> tuple[Optional[UserWeeklyStats], list[Optional[UserWeeklyStats]]]:
+    """Dernière semaine agrégée (totaux cumulés) et les semaines demandées, par clé primaire."""
+    latest = session.exec(
+        select(UserWeeklyStats)
+        .where(UserWeeklyStats.user_id == user_id)
+        .order_by(UserWeeklyStats.week_start.desc())
+        .limit(1)
+    ).first()
+    weeks = {
+        week.week_start: week
+        for week in session.exec(
+            select(UserWeeklyStats)
+            .where(UserWeeklyStats.user_id == user_id)
+            .where(UserWeeklyStats.week_start.in_(week_starts))
+        ).all()
+    }
+    return latest, [weeks.get(start) for start in week_starts]
 
 
 def _get_week_bounds(offset_weeks: int = 0) -> tuple[datetime, datetime]:
@@ -89,26 +84,25 @@ def get_user_stats(user_id: str, session: Session = Depends(get_session)) -> Use
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
 
-    # Récupérer toutes les shares de l'utilisateur
-    all_shares = session.exec(
-        select(Share).where(Share.owner_id == user_id).order_by(Share.created_at.desc())
-    ).all()
+    # Au plus trois lignes de l'agrégat hebdomadaire, quel que soit l'historique
+    this_week_start, _ = _get_week_bounds(0)
+    last_week_start, _ = _get_week_bounds(1)
+    latest, (this_week, last_week) = _week_rows(
+        session, user_id, this_week_start.date(), last_week_start.date()
+    )
     
-    # Stats globales
-    total_sessions = len(all_shares)
-    total_volume, best_lift = _calculate_volume_and_best(all_shares)
+    # Stats globales (cumulées jusqu'à la dernière semaine)
+    total_sessions = latest.total_sessions if latest else 0
+    total_volume = latest.total_volume if latest else 0.0
+    best_lift = latest.best_lift_to_date if latest else 0.0
     
     # Cette semaine
-    this_week_start, this_week_end = _get_week_bounds(0)
-    this_week_shares = [s for s in all_shares if this_week_start <= s.created_at < this_week_end]
-    sessions_this_week = len(this_week_shares)
-    volume_this_week, _ = _calculate_volume_and_best(this_week_shares)
+    sessions_this_week = this_week.session_count if this_week else 0
+    volume_this_week = this_week.volume if this_week else 0.0
     
     # Semaine dernière
-    last_week_start, last_week_end = _get_week_bounds(1)
-    last_week_shares = [s for s in all_shares if last_week_start <= s.created_at < last_week_end]
-    sessions_last_week = len(last_week_shares)
-    volume_last_week, _ = _calculate_volume_and_best(last_week_shares)
+    sessions_last_week = last_week.session_count if last_week else 0
+    volume_last_week = last_week.volume if last_week else 0.0
     
     # Calcul de la progression
     volume_change_percent = None
@@ -121,10 +115,7 @@ def get_user_stats(user_id: str, session: Session = Depends(get_session)) -> Use
     
     # Calculer le streak (jours consécutifs avec séance cette semaine)
     # Simplifié : on compte juste les jours uniques d'entraînement cette semaine
-    workout_days = set()
-    for share in this_week_shares:
-        workout_days.add(share.created_at.date())
-    current_streak = len(workout_days)
+    current_streak = this_week.training_days if this_week else 0
     
     # Objectif par défaut : 3 séances/semaine
     weekly_goal = 3
@@ -156,19 +147,104 @@ def get_user_stats_summary(user_id: str, session: Session = Depends(get_session)
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
 
-    all_shares = session.exec(
-        select(Share).where(Share.owner_id == user_id)
-    ).all()
-    
     this_week_start, _ = _get_week_bounds(0)
-    this_week_shares = [s for s in all_shares if s.created_at >= this_week_start]
-    
-    volume_this_week, _ = _calculate_volume_and_best(this_week_shares)
+    latest, (this_week,) = _week_rows(session, user_id, this_week_start.date())
+    total_sessions = latest.total_sessions if latest else 0
+    sessions_this_week = this_week.session_count if this_week else 0
+    volume_this_week = this_week.volume if this_week else 0.0
     
     return {
-        "sessions_this_week": len(this_week_shares),
-        "total_sessions": len(all_shares),
+        "sessions_this_week": sessions_this_week,
+        "total_sessions": total_sessions,
         "volume_this_week": round(volume_this_week, 1),
         "weekly_goal": 3,
-        "goal_progress_percent": min(100, round((len(this_week_shares) / 3) * 100)),
+        "goal_progress_percent": min(100, round((sessions_this_week / 3) * 100)),
     }
+
+
+class MetricSeries(BaseModel):
+    values: list[float]
+    rolling_avg: list[float]  # moyenne des `window` dernières périodes
+    change_percent: list[Optional[float]]  # vs période précédente (None si elle valait 0)
+
+
+class TimeseriesResponse(BaseModel):
+    user_id: str
+    bucket: str
+    window: int
+    periods: list[date]  # début de chaque période (jour, lundi ou 1er du mois)
+    volume: MetricSeries  # reps × charge
+    reps: MetricSeries
+    sets: MetricSeries
+    sessions: MetricSeries
+
+
+@router.get("/{user_id}/timeseries", response_model=TimeseriesResponse)
+def get_user_timeseries(
+    user_id: str,
+    bucket: str = Query("week", pattern="^(day|week|month)$"),
+    window: int = Query(4, ge=1, le=52),
+    limit: int = Query(12, ge=1, le=366),
+    session: Session = Depends(get_session),
+) -> TimeseriesResponse:
+    """Séries de volume, reps, sets et séances par période (graphiques de progression)."""
+    user = session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="user_not_found")
+
+    series = user_timeseries(session, user_id, bucket, window, limit)
+    return TimeseriesResponse(user_id=user_id, bucket=bucket, window=window, **series)
+
+
+class PersonalRecordRead(BaseModel):
+    best_weight: float
+    best_weight_day: Optional[date]
+    best_e1rm: float  # 1RM estimé (Epley)
+    best_e1rm_day: Optional[date]
+    best_set_reps: int  # set au plus gros volume (reps × charge)
+    best_set_weight: float
+    best_set_day: Optional[date]
+
+
+class ProgressPoint(BaseModel):
+    day: date
+    best_e1rm: float
+    best_weight: float
+    volume: float
+    set_count: int
+
+
+class ExerciseProgressResponse(BaseModel):
+    user_id: str
+    exercise_id: str
+    record: Optional[PersonalRecordRead]
+    history: list[ProgressPoint]  # du plus ancien au plus récent
+
+
+@router.get("/{user_id}/exercises/{exercise_id}/progress", response_model=ExerciseProgressResponse)
+def get_exercise_progress(
+    user_id: str,
+    exercise_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    session: Session = Depends(get_session),
+) -> ExerciseProgressResponse:
+    """Record et historique du 1RM estimé sur un exercice (précalculés)."""
+    record = session.get(PersonalRecord, (user_id, exercise_id))
+    if record is None and not session.get(User, user_id):
+        raise HTTPException(status_code=404, detail="user_not_found")
+
+    # Les `limit` derniers jours, lus sur la clé primaire
+    history = session.exec(
+        select(ExerciseProgress)
+        .where(ExerciseProgress.user_id == user_id)
+        .where(ExerciseProgress.exercise_id == exercise_id)
+        .order_by(ExerciseProgress.day.desc())
+        .limit(limit)
+    ).all()
+
+    return ExerciseProgressResponse(
+        user_id=user_id,
+        exercise_id=exercise_id,
+        record=PersonalRecordRead.model_validate(record, from_attributes=True) if record else None,
+        history=[ProgressPoint.model_validate(point, from_attributes=True) for point in reversed(history)],
+    )
@@ -83,7 +83,7 @@ class FeedItem(BaseModel):
 
 class FeedResponse(BaseModel):
     items: list[FeedItem]
-    next_cursor: Optional[datetime]
+    next_cursor: Optional[str]
 
 
 class SyncMutation(BaseModel):
@@ -1 +1 @@
-"""Service helpers (currently unused)."""
+"""Service helpers."""
@@ -0,0 +1,166 @@
+"""Avatars stockés sur disque, adressés par leur contenu (SHA-256).
+
+`User.avatar_url` ne contient plus qu'une URL courte (`/avatars/<sha256>`) :
+les requêtes qui chargent des `User` (classements, recherche, listes de
+followers...) ne transportent plus l'image. Le même fichier envoyé deux fois
+n'est écrit qu'une fois, et son URL ne change jamais : elle est servie avec un
+cache long (`immutable`).
+
+Des miniatures carrées (`AVATAR_SIZES`) sont générées à l'envoi (Pillow) et
+servies par `/avatars/<sha256>/<taille>`. L'image est décodée entièrement : un
+fichier à la signature valide mais illisible est refusé.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+from PIL import ImageOps
+
+from ..db import BASE_DIR
+
+DEFAULT_AVATAR_DIR = BASE_DIR / "media" / "avatars"
+AVATAR_URL_PREFIX = "/avatars"
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+# Côté maximal (px) de l'image reçue : un PNG de quelques Ko peut décrire des
+# centaines de Mo une fois décodé
+AVATAR_MAX_SIDE = 4096
+# Côté (px) des miniatures générées à l'envoi
+AVATAR_SIZES = {"sm": 64, "md": 256}
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URI = re.compile(r"^data:[^,]*,")
+# Signatures des formats acceptés -> extension
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+
+class InvalidAvatar(ValueError):
+    """Contenu refusé ; `detail` est le code d'erreur renvoyé au client."""
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
+
+
+def avatar_dir() -> Path:
+    return Path(os.getenv("AVATAR_STORAGE_DIR") or DEFAULT_AVATAR_DIR)
+
+
+def decode_avatar(value: str) -> bytes:
+    """Décode un data URI ou du base64 brut."""
+    match = _DATA_URI.match(value)
+    if match:
+        value = value[match.end():]
+    try:
+        data = base64.b64decode("".join(value.split()), validate=True)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidAvatar("invalid_base64") from exc
+    if len(data) > AVATAR_MAX_BYTES:
+        raise InvalidAvatar("image_too_large")
+    return data
+
+
+def image_format(data: bytes) -> str | None:
+    """Extension du format d'image reconnu (signature), None si inconnu."""
+    for signature, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _write_once(path: Path, data: bytes) -> None:
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nom temporaire unique : deux envois simultanés de la même image dans le
+    # même process (threadpool des routes) n'écrivent pas le même fichier
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as tmp:
+        tmp.write(data)
+    try:
+        os.replace(tmp.name, path)
+    except FileNotFoundError:
+        if not path.exists():
+            raise
+    finally:
+        Path(tmp.name).unlink(missing_ok=True)
+
+
+_UNREADABLE = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def _thumbnails(data: bytes) -> dict[str, bytes]:
+    try:
+        image = Image.open(io.BytesIO(data))
+    except _UNREADABLE as exc:
+        raise InvalidAvatar("invalid_image") from exc
+    with image:
+        # Dimensions lues dans l'en-tête : refusé avant tout décodage
+        if max(image.size) > AVATAR_MAX_SIDE:
+            raise InvalidAvatar("image_too_large")
+        try:
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            thumbnails = {}
+            for size, side in AVATAR_SIZES.items():
+                buffer = io.BytesIO()
+                ImageOps.fit(image, (side, side)).save(buffer, "JPEG", quality=85, optimize=True)
+                thumbnails[size] = buffer.getvalue()
+            return thumbnails
+        except _UNREADABLE as exc:
+            raise InvalidAvatar("invalid_image") from exc
+
+
+def _digest_dir(digest: str) -> Path:
+    return avatar_dir() / digest[:2] / digest
+
+
+def store_avatar(data: bytes) -> str:
+    """Écrit l'image (et ses miniatures) si absente et retourne son URL courte."""
+    extension = image_format(data)
+    if extension is None:
+        raise InvalidAvatar("invalid_image")
+    digest = hashlib.sha256(data).hexdigest()
+    directory = _digest_dir(digest)
+    if not (directory / f"original.{extension}").exists():
+        for size, thumbnail in _thumbnails(data).items():
+            _write_once(directory / f"{size}.jpg", thumbnail)
+        _write_once(directory / f"original.{extension}", data)
+    return f"{AVATAR_URL_PREFIX}/{digest}"
+
+
+def store_avatar_url(value: str | None) -> str | None:
+    """URL à enregistrer dans `User.avatar_url` : les data URI sont extraits vers le stockage."""
+    if value and value.startswith("data:"):
+        return store_avatar(decode_avatar(value))
+    return value
+
+
+def avatar_file(digest: str, size: str | None = None) -> Path | None:
+    """Fichier à servir pour `digest` (miniature demandée, sinon l'original)."""
+    if not _DIGEST.match(digest) or (size is not None and size not in AVATAR_SIZES):
+        return None
+    directory = _digest_dir(digest)
+    if size is not None and (directory / f"{size}.jpg").exists():
+        return directory / f"{size}.jpg"
+    for extension in MEDIA_TYPES:
+        original = directory / f"original.{extension}"
+        if original.exists():
+            return original
+    return None
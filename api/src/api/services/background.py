@@ -0,0 +1,56 @@
+"""Tâches périodiques exécutées dans le process de l'API.
+
+Les fonctions planifiées sont synchrones (accès SQLModel) : elles tournent
+dans un thread pour ne pas bloquer la boucle asyncio.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def interval_from_env(name: str, default: float) -> float:
+    """Lit un intervalle (en secondes) depuis l'environnement. 0 désactive la tâche."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+class PeriodicTask:
+    """Exécute `func` toutes les `interval` secondes tant que l'app tourne."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]) -> None:
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: asyncio.Task | None = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.func)
+            except Exception:
+                logger.exception("Tâche périodique %s en échec", self.name)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,166 @@
+"""Compteurs dénormalisés de likes / commentaires et des profils (`UserCounters`).
+
+Les routes incrémentent les compteurs dans la même transaction que l'écriture
+(like, commentaire, partage, follow...). `reconcile_counters` et
+`reconcile_user_counters` recalculent les valeurs depuis les tables sources et
+corrigent les dérives éventuelles.
+"""
+from __future__ import annotations
+
+from sqlalchemy import exists
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import update
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Comment
+from ..models import CommentLike
+from ..models import Follower
+from ..models import Like
+from ..models import Share
+from ..models import User
+from ..models import UserCounters
+
+
+def bump_share_counter(session: Session, share_id: str, column: str, delta: int) -> int:
+    """Incrémente `share.<column>` de `delta` et retourne la nouvelle valeur (sans commit)."""
+    counter = getattr(Share, column)
+    result = session.exec(
+        update(Share)
+        .where(Share.share_id == share_id)
+        .values({column: counter + delta})
+        .returning(counter)
+    ).first()
+    return result[0] if result else 0
+
+
+def bump_comment_likes(session: Session, comment_id: str, delta: int) -> int:
+    """Incrémente `comment.like_count` de `delta` et retourne la nouvelle valeur (sans commit)."""
+    result = session.exec(
+        update(Comment)
+        .where(Comment.id == comment_id)
+        .values(like_count=Comment.like_count + delta)
+        .returning(Comment.like_count)
+    ).first()
+    return result[0] if result else 0
+
+
+def bump_user_counters(session: Session, user_id: str, **deltas: int) -> None:
+    """Ajoute `deltas` aux compteurs du profil `user_id`, ligne créée au besoin (sans commit)."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    statement = dialect_insert(UserCounters).values(user_id=user_id, **deltas)
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                column: getattr(UserCounters, column) + statement.excluded[column]
+                for column in deltas
+            },
+        )
+    )
+
+
+def _user_counter_sources() -> dict:
+    owner = Share.owner_id == UserCounters.user_id
+    return {
+        "posts_count": select(func.count()).select_from(Share).where(owner).scalar_subquery(),
+        "followers_count": (
+            select(func.count())
+            .select_from(Follower)
+            .where(Follower.followed_id == UserCounters.user_id)
+            .scalar_subquery()
+        ),
+        "following_count": (
+            select(func.count())
+            .select_from(Follower)
+            .where(Follower.follower_id == UserCounters.user_id)
+            .scalar_subquery()
+        ),
+        "total_likes": (
+            select(func.coalesce(func.sum(Share.like_count), 0)).where(owner).scalar_subquery()
+        ),
+    }
+
+
+def reconcile_user_counters(session: Session, user_id: str | None = None) -> int:
+    """Crée les lignes manquantes et corrige les compteurs de profil qui ont dérivé (sans commit).
+
+    Retourne le nombre de lignes corrigées.
+    """
+    missing = select(User.id).where(~exists().where(UserCounters.user_id == User.id))
+    if user_id is not None:
+        missing = missing.where(User.id == user_id)
+    session.exec(insert(UserCounters).from_select(["user_id"], missing))
+
+    repaired = 0
+    for column, source in _user_counter_sources().items():
+        statement = (
+            update(UserCounters)
+            .where(getattr(UserCounters, column) != source)
+            .values({column: source})
+            .execution_options(synchronize_session=False)
+        )
+        if user_id is not None:
+            statement = statement.where(UserCounters.user_id == user_id)
+        repaired += session.exec(statement).rowcount
+    return repaired
+
+
+def reconcile_counters(session: Session) -> int:
+    """Recalcule les compteurs qui ont dérivé. Retourne le nombre de lignes corrigées."""
+    share_likes = (
+        select(func.count())
+        .select_from(Like)
+        .where(Like.share_id == Share.share_id)
+        .scalar_subquery()
+    )
+    share_comments = (
+        select(func.count())
+        .select_from(Comment)
+        .where(Comment.share_id == Share.share_id)
+        .scalar_subquery()
+    )
+    comment_likes = (
+        select(func.count())
+        .select_from(CommentLike)
+        .where(CommentLike.comment_id == Comment.id)
+        .scalar_subquery()
+    )
+
+    repaired = 0
+    repaired += session.exec(
+        update(Share)
+        .where(Share.like_count != share_likes)
+        .values(like_count=share_likes)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    repaired += session.exec(
+        update(Share)
+        .where(Share.comment_count != share_comments)
+        .values(comment_count=share_comments)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    repaired += session.exec(
+        update(Comment)
+        .where(Comment.like_count != comment_likes)
+        .values(like_count=comment_likes)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    session.commit()
+    return repaired
+
+
+def run_counter_reconciliation() -> None:
+    """Point d'entrée de la tâche périodique."""
+    with Session(get_engine()) as session:
+        repaired = reconcile_counters(session)
+        # Après les compteurs des partages, dont dépend le total de likes reçus
+        repaired += reconcile_user_counters(session)
+        session.commit()
+    if repaired:
+        print(f"🔧 {repaired} compteurs réconciliés")
@@ -0,0 +1,80 @@
+"""Hydratation groupée des pages du feed.
+
+Construit les items d'une page de partages en un nombre fixe de requêtes,
+quel que soit le nombre de partages, de likes ou de commentaires. Les compteurs
+sont lus directement sur la ligne `Share` (compteurs dénormalisés), corrigés
+des likes encore dans le tampon d'écriture.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from sqlalchemy import func
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..models import Comment
+from ..models import Share
+from .like_buffer import like_buffer
+
+COMMENT_PREVIEW_SIZE = 2
+
+
+def _latest_comments(
+    session: Session, share_ids: list[str], per_share: int
+) -> dict[str, list[Comment]]:
+    """Les `per_share` derniers commentaires de chaque share (requête fenêtrée)."""
+    position = (
+        func.row_number()
+        .over(
+            partition_by=Comment.share_id,
+            order_by=(Comment.created_at.desc(), Comment.id.desc()),
+        )
+        .label("position")
+    )
+    ranked = (
+        select(Comment.id, position)
+        .where(Comment.share_id.in_(share_ids))
+        .subquery()
+    )
+    comments = session.exec(
+        select(Comment)
+        .join(ranked, ranked.c.id == Comment.id)
+        .where(ranked.c.position <= per_share)
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
+    ).all()
+
+    by_share: dict[str, list[Comment]] = {share_id: [] for share_id in share_ids}
+    for comment in comments:
+        by_share[comment.share_id].append(comment)
+    return by_share
+
+
+def hydrate_feed_items(session: Session, shares: Sequence[Share]) -> list[dict]:
+    """Construit les items du feed (compteurs + aperçu des commentaires)."""
+    if not shares:
+        return []
+
+    share_ids = [share.share_id for share in shares]
+    previews = _latest_comments(session, share_ids, COMMENT_PREVIEW_SIZE)
+    pending_likes = like_buffer.pending_deltas(share_ids)
+
+    return [
+        {
+            "share_id": share.share_id,
+            "owner_id": share.owner_id,
+            "owner_username": share.owner_username,
+            "workout_title": share.workout_title,
+            "exercise_count": share.exercise_count,
+            "set_count": share.set_count,
+            "created_at": share.created_at,
+            "like_count": share.like_count + pending_likes[share.share_id],
+            "comment_count": share.comment_count,
+            # Ordre chronologique pour l'affichage
+            "comments": [
+                {"id": c.id, "username": c.username, "content": c.content}
+                for c in previews[share.share_id]
+            ],
+        }
+        for share in shares
+    ]
@@ -0,0 +1,142 @@
+"""Graphe des follows tenu en mémoire (listes d'adjacence compactes).
+
+Chaque identifiant d'utilisateur est interné en entier ; les comptes suivis et
+les followers de chaque nœud sont des `array` d'entiers triés. Les questions
+de relation ("lesquels de ces N comptes est-ce que je suis ?", follows
+mutuels, nombre de followers) se résolvent par recherche dichotomique, sans
+requête `Follower` par vérification.
+
+Le graphe est chargé au démarrage puis alimenté après commit par les routes de
+follow/unfollow. Il est propre au process et rechargé périodiquement pour
+rattraper les écritures des autres process ou hors API (seeds).
+"""
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left
+from bisect import insort
+from collections.abc import Iterable
+
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Follower
+
+_EMPTY = array("l")
+
+
+def _contains(values: array, value: int) -> bool:
+    position = bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+class FollowGraph:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._following: list[array] = []
+        self._followers: list[array] = []
+
+    def _intern(self, user_id: str) -> int:
+        node = self._ids.get(user_id)
+        if node is None:
+            node = len(self._names)
+            self._ids[user_id] = node
+            self._names.append(user_id)
+            self._following.append(array("l"))
+            self._followers.append(array("l"))
+        return node
+
+    def _out(self, user_id: str) -> array:
+        node = self._ids.get(user_id)
+        return _EMPTY if node is None else self._following[node]
+
+    def _in(self, user_id: str) -> array:
+        node = self._ids.get(user_id)
+        return _EMPTY if node is None else self._followers[node]
+
+    def load(self, edges: Iterable[tuple[str, str]]) -> None:
+        """Remplace le graphe par les paires `(follower_id, followed_id)` données."""
+        ids: dict[str, int] = {}
+        following: list[set[int]] = []
+        followers: list[set[int]] = []
+        for follower_id, followed_id in edges:
+            for user_id in (follower_id, followed_id):
+                if user_id not in ids:
+                    ids[user_id] = len(ids)
+                    following.append(set())
+                    followers.append(set())
+            following[ids[follower_id]].add(ids[followed_id])
+            followers[ids[followed_id]].add(ids[follower_id])
+        with self._lock:
+            self._ids, self._names = ids, list(ids)
+            self._following = [array("l", sorted(nodes)) for nodes in following]
+            self._followers = [array("l", sorted(nodes)) for nodes in followers]
+
+    def add(self, follower_id: str, followed_id: str) -> None:
+        with self._lock:
+            source, target = self._intern(follower_id), self._intern(followed_id)
+            if not _contains(self._following[source], target):
+                insort(self._following[source], target)
+                insort(self._followers[target], source)
+
+    def remove(self, follower_id: str, followed_id: str) -> None:
+        with self._lock:
+            source, target = self._ids.get(follower_id), self._ids.get(followed_id)
+            if source is None or target is None or not _contains(self._following[source], target):
+                return
+            self._following[source].remove(target)
+            self._followers[target].remove(source)
+
+    def follows(self, follower_id: str, followed_id: str) -> bool:
+        with self._lock:
+            target = self._ids.get(followed_id)
+            return target is not None and _contains(self._out(follower_id), target)
+
+    def which_followed(self, user_id: str, candidates: Iterable[str]) -> set[str]:
+        """Parmi `candidates`, les comptes que `user_id` suit."""
+        with self._lock:
+            following = self._out(user_id)
+            return {
+                c for c in candidates
+                if c in self._ids and _contains(following, self._ids[c])
+            }
+
+    def which_follow(self, user_id: str, candidates: Iterable[str]) -> set[str]:
+        """Parmi `candidates`, les comptes qui suivent `user_id`."""
+        with self._lock:
+            followers = self._in(user_id)
+            return {
+                c for c in candidates
+                if c in self._ids and _contains(followers, self._ids[c])
+            }
+
+    def mutual_follows(self, user_id: str) -> list[str]:
+        """Comptes que `user_id` suit et qui le suivent en retour."""
+        with self._lock:
+            followers = self._in(user_id)
+            return [self._names[n] for n in self._out(user_id) if _contains(followers, n)]
+
+    def follower_counts(self, user_ids: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            return {user_id: len(self._in(user_id)) for user_id in user_ids}
+
+    def following_counts(self, user_ids: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            return {user_id: len(self._out(user_id)) for user_id in user_ids}
+
+
+follow_graph = FollowGraph()
+
+
+def warm_follow_graph(session: Session) -> None:
+    follow_graph.load(session.exec(select(Follower.follower_id, Follower.followed_id)).all())
+
+
+def run_follow_graph_refresh() -> None:
+    """Point d'entrée de la tâche périodique (et du démarrage)."""
+    with Session(get_engine()) as session:
+        warm_follow_graph(session)
@@ -0,0 +1,196 @@
+"""Suggestions de comptes à suivre (amis d'amis), précalculées.
+
+Pour chaque utilisateur, les candidats sont les comptes suivis par les comptes
+qu'il suit (parcours à 2 sauts de `Follower`), classés par nombre de ces
+relations communes puis par nombre de followers. La liste est complétée par
+les comptes les plus suivis et stockée dans `FollowSuggestion` (les
+`FOLLOW_SUGGESTION_SIZE` premiers) : l'endpoint lit une liste courte par index.
+
+Un follow/unfollow marque les suggestions du suiveur comme périmées
+(`mark_suggestions_stale`, même transaction) ; la tâche de fond recalcule
+d'abord les listes périmées, puis les plus anciennes. Un utilisateur jamais
+calculé l'est à sa première lecture.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy.orm import aliased
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Follower
+from ..models import FollowSuggestion
+from ..models import FollowSuggestionState
+from ..models import User
+from .follow_graph import follow_graph
+
+FOLLOW_SUGGESTION_SIZE = 20
+FOLLOW_SUGGESTION_BATCH = 200
+# Au-delà, une liste est recalculée même sans follow (graphe des autres comptes)
+FOLLOW_SUGGESTION_MAX_AGE = timedelta(days=1)
+
+
+def _upsert_state(session: Session, user_ids: list[str], **values) -> None:
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    statement = dialect_insert(FollowSuggestionState).values(
+        [{"user_id": user_id, **values} for user_id in user_ids]
+    )
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={column: statement.excluded[column] for column in values},
+        )
+    )
+
+
+def mark_suggestions_stale(session: Session, user_id: str) -> None:
+    """À appeler dans la transaction d'un follow/unfollow de `user_id` (sans commit)."""
+    _upsert_state(session, [user_id], computed_at=datetime.utcnow(), stale=True)
+
+
+def popular_users(session: Session, limit: int) -> list[tuple[str, int]]:
+    """Comptes les plus suivis : (user_id, followers)."""
+    followers = func.count(Follower.id)
+    return list(
+        session.exec(
+            select(Follower.followed_id, followers)
+            .join(User, User.id == Follower.followed_id)
+            .group_by(Follower.followed_id)
+            .order_by(followers.desc(), Follower.followed_id)
+            .limit(limit)
+        ).all()
+    )
+
+
+def compute_suggestions(session: Session, user_ids: list[str], now: datetime | None = None) -> None:
+    """Recalcule et stocke les suggestions de `user_ids` (sans commit)."""
+    if not user_ids:
+        return
+    now = now or datetime.utcnow()
+    mine = aliased(Follower)
+    theirs = aliased(Follower)
+    already = aliased(Follower)
+
+    # Parcours à 2 sauts, en une requête pour tout le lot
+    mutual = func.count()
+    rows = session.exec(
+        select(mine.follower_id, theirs.followed_id, mutual)
+        .join(theirs, theirs.follower_id == mine.followed_id)
+        .join(User, User.id == theirs.followed_id)
+        .outerjoin(
+            already,
+            (already.follower_id == mine.follower_id) & (already.followed_id == theirs.followed_id),
+        )
+        .where(mine.follower_id.in_(user_ids))
+        .where(theirs.followed_id != mine.follower_id)
+        .where(already.id.is_(None))
+        .group_by(mine.follower_id, theirs.followed_id)
+    ).all()
+    candidates: dict[str, dict[str, int]] = defaultdict(dict)
+    for user_id, candidate_id, count in rows:
+        candidates[user_id][candidate_id] = count
+
+    popular = popular_users(session, FOLLOW_SUGGESTION_SIZE * 2)
+    candidate_ids = {c for per_user in candidates.values() for c in per_user}
+    followers = dict(popular)
+    missing = candidate_ids - followers.keys()
+    if missing:
+        followers.update(
+            session.exec(
+                select(Follower.followed_id, func.count(Follower.id))
+                .where(Follower.followed_id.in_(missing))
+                .group_by(Follower.followed_id)
+            ).all()
+        )
+    following: dict[str, set[str]] = defaultdict(set)
+    for follower_id, followed_id in session.exec(
+        select(Follower.follower_id, Follower.followed_id)
+        .where(Follower.follower_id.in_(user_ids))
+        .where(Follower.followed_id.in_([user_id for user_id, _ in popular]))
+    ).all():
+        following[follower_id].add(followed_id)
+
+    suggestions = []
+    for user_id in user_ids:
+        per_user = candidates.get(user_id, {})
+        ranked = sorted(per_user, key=lambda c: (-per_user[c], -followers.get(c, 0), c))
+        # Compléter avec les comptes populaires pas encore suivis
+        for candidate_id, _ in popular:
+            if len(ranked) >= FOLLOW_SUGGESTION_SIZE:
+                break
+            if (
+                candidate_id != user_id
+                and candidate_id not in per_user
+                and candidate_id not in following[user_id]
+            ):
+                ranked.append(candidate_id)
+        for position, candidate_id in enumerate(ranked[:FOLLOW_SUGGESTION_SIZE], start=1):
+            suggestions.append({
+                "user_id": user_id,
+                "candidate_id": candidate_id,
+                "position": position,
+                "mutual_count": per_user.get(candidate_id, 0),
+                "followers_count": followers.get(candidate_id, 0),
+            })
+
+    session.exec(delete(FollowSuggestion).where(FollowSuggestion.user_id.in_(user_ids)))
+    if suggestions:
+        session.exec(insert(FollowSuggestion).values(suggestions))
+    _upsert_state(session, user_ids, computed_at=now, stale=False)
+
+
+def read_suggestions(session: Session, user_id: str, limit: int) -> list[FollowSuggestion]:
+    """Suggestions stockées (calculées à la première lecture), hors comptes déjà suivis."""
+    state = session.get(FollowSuggestionState, user_id)
+    if state is None:
+        compute_suggestions(session, [user_id])
+        session.commit()
+    suggestions = session.exec(
+        select(FollowSuggestion)
+        .where(FollowSuggestion.user_id == user_id)
+        .order_by(FollowSuggestion.position)
+    ).all()
+    # Les suivis faits depuis le dernier calcul sont filtrés à la lecture (graphe en mémoire)
+    followed = follow_graph.which_followed(user_id, [s.candidate_id for s in suggestions])
+    return [s for s in suggestions if s.candidate_id not in followed][:limit]
+
+
+def refresh_follow_suggestions(
+    session: Session, batch_size: int = FOLLOW_SUGGESTION_BATCH, now: datetime | None = None
+) -> int:
+    """Recalcule un lot : listes périmées d'abord, puis trop anciennes.
+
+    Retourne la taille du lot.
+    """
+    now = now or datetime.utcnow()
+    user_ids = list(
+        session.exec(
+            select(FollowSuggestionState.user_id)
+            .where(
+                FollowSuggestionState.stale
+                | (FollowSuggestionState.computed_at < now - FOLLOW_SUGGESTION_MAX_AGE)
+            )
+            .order_by(FollowSuggestionState.stale.desc(), FollowSuggestionState.computed_at)
+            .limit(batch_size)
+        ).all()
+    )
+    compute_suggestions(session, user_ids, now)
+    session.commit()
+    return len(user_ids)
+
+
+def run_follow_suggestions() -> None:
+    """Point d'entrée de la tâche périodique."""
+    with Session(get_engine()) as session:
+        while refresh_follow_suggestions(session) == FOLLOW_SUGGESTION_BATCH:
+            pass
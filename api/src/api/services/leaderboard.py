@@ -0,0 +1,269 @@
+"""Classements : calcul agrégé et snapshots matérialisés.
+
+Une tâche périodique écrit, pour chaque `(type, period)`, le classement
+complet dans `LeaderboardSnapshot`. Les lectures parcourent le dernier
+snapshot par l'index `(type, period, computed_at, position)` ; tant qu'aucun
+snapshot n'existe, le classement est calculé à la volée.
+
+Rétention : le dernier snapshot, le premier de chaque jour sur les 7 derniers
+jours, et le plus récent d'au moins 7 jours qui sert de référence pour
+`change`. Un snapshot de la semaine passée est donc toujours disponible.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timedelta
+
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import Subquery
+from sqlalchemy import cast
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import literal
+from sqlalchemy import or_
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Follower
+from ..models import LeaderboardSnapshot
+from ..models import Share
+from ..models import User
+from ..models import UserDailyVolume
+
+BOARDS = (
+    ("volume", "week"),
+    ("volume", "month"),
+    ("volume", "all"),
+    ("sessions", "week"),
+    ("sessions", "month"),
+    ("sessions", "all"),
+    ("likes", "all"),
+    ("followers", "all"),
+)
+
+CHANGE_REFERENCE_AGE = timedelta(days=7)
+
+_SNAPSHOT_COLUMNS = [
+    "type", "period", "computed_at", "user_id", "username", "avatar_url",
+    "score", "rank", "position", "change",
+]
+
+
+def _period_start(period: str, now: datetime) -> datetime | None:
+    if period == "week":
+        return now - timedelta(days=7)
+    if period == "month":
+        return now - timedelta(days=30)
+    return None
+
+
+def _score_source(type: str, period: str, now: datetime):
+    """Colonne utilisateur, agrégat de score et filtres de période d'un classement."""
+    start_date = _period_start(period, now)
+    period_filters = [Share.created_at >= start_date] if start_date else []
+    if type == "volume":
+        # Volume réel (reps × poids) lu dans l'agrégat quotidien. Jours entiers :
+        # les 7 (ou 30) derniers, aujourd'hui compris, sans le jour de `start_date`
+        day_filters = [UserDailyVolume.day > start_date.date()] if start_date else []
+        volume = cast(func.round(func.sum(UserDailyVolume.volume)), Integer)
+        return UserDailyVolume.user_id, volume, day_filters
+    if type == "sessions":
+        return Share.owner_id, func.count(Share.share_id), period_filters
+    if type == "likes":
+        # Compteurs dénormalisés des posts de l'utilisateur
+        return Share.owner_id, func.sum(Share.like_count), []
+    if type == "followers":
+        return Follower.followed_id, func.count(Follower.id), []
+    raise ValueError(f"unknown leaderboard type: {type}")
+
+
+def ranked_scores(type: str, period: str, now: datetime | None = None) -> Subquery:
+    """Scores agrégés (GROUP BY) classés par RANK() : user_id, score, rank, position."""
+    user_column, score, filters = _score_source(type, period, now or datetime.utcnow())
+    scores = (
+        select(user_column.label("user_id"), score.label("score"))
+        .join(User, User.id == user_column)
+        .where(*filters)
+        .group_by(user_column)
+        .having(score > 0)
+        .subquery()
+    )
+    return select(
+        scores.c.user_id,
+        scores.c.score,
+        func.rank().over(order_by=scores.c.score.desc()).label("rank"),
+        # Position unique (départage les ex aequo) pour la fenêtre "autour de moi"
+        func.row_number()
+        .over(order_by=(scores.c.score.desc(), scores.c.user_id))
+        .label("position"),
+    ).subquery()
+
+
+def latest_generation(session: Session, type: str, period: str) -> datetime | None:
+    return session.exec(
+        select(func.max(LeaderboardSnapshot.computed_at))
+        .where(LeaderboardSnapshot.type == type)
+        .where(LeaderboardSnapshot.period == period)
+    ).one()
+
+
+def _board(session: Session, type: str, period: str) -> Subquery:
+    """Classement courant : dernier snapshot, ou calcul à la volée sans snapshot."""
+    generation = latest_generation(session, type, period)
+    if generation is not None:
+        return (
+            select(
+                LeaderboardSnapshot.user_id,
+                LeaderboardSnapshot.username,
+                LeaderboardSnapshot.avatar_url,
+                LeaderboardSnapshot.score,
+                LeaderboardSnapshot.rank,
+                LeaderboardSnapshot.position,
+                LeaderboardSnapshot.change,
+            )
+            .where(LeaderboardSnapshot.type == type)
+            .where(LeaderboardSnapshot.period == period)
+            .where(LeaderboardSnapshot.computed_at == generation)
+            .subquery()
+        )
+    ranked = ranked_scores(type, period)
+    return (
+        select(
+            ranked.c.user_id,
+            User.username,
+            User.avatar_url,
+            ranked.c.score,
+            ranked.c.rank,
+            ranked.c.position,
+            literal(0).label("change"),
+        )
+        .join(User, User.id == ranked.c.user_id)
+        .subquery()
+    )
+
+
+def read_leaderboard(
+    session: Session,
+    type: str,
+    period: str,
+    current_user_id: str | None,
+    limit: int,
+    around: int,
+) -> tuple[list, list, int | None]:
+    """Top `limit`, fenêtre de ± `around` positions autour de l'utilisateur, et son rang.
+
+    Deux requêtes au plus : la position de l'utilisateur, puis les lignes à
+    afficher (top et fenêtre) en un seul parcours.
+    """
+    board = _board(session, type, period)
+
+    my_rank = None
+    my_position = None
+    window = board.c.position <= limit
+    if current_user_id:
+        me = session.exec(
+            select(board.c.rank, board.c.position).where(board.c.user_id == current_user_id)
+        ).first()
+        if me:
+            my_rank, my_position = me
+            window = or_(
+                window, board.c.position.between(my_position - around, my_position + around)
+            )
+
+    rows = session.exec(select(*board.c).where(window).order_by(board.c.position)).all()
+    top = [row for row in rows if row.position <= limit]
+    around_me = [
+        row for row in rows
+        if my_position is not None and abs(row.position - my_position) <= around
+    ]
+    return top, around_me, my_rank
+
+
+def reference_generation(
+    session: Session, type: str, period: str, now: datetime
+) -> datetime | None:
+    """Snapshot de comparaison : le plus récent d'au moins 7 jours.
+
+    None tant qu'aucun snapshot n'a cet âge : `change` vaut alors 0 plutôt
+    qu'une variation sur une durée quelconque.
+    """
+    return session.exec(
+        select(func.max(LeaderboardSnapshot.computed_at))
+        .where(LeaderboardSnapshot.type == type)
+        .where(LeaderboardSnapshot.period == period)
+        .where(LeaderboardSnapshot.computed_at <= now - CHANGE_REFERENCE_AGE)
+    ).one()
+
+
+def _prune_generations(session: Session, type: str, period: str, now: datetime) -> None:
+    generations = session.exec(
+        select(LeaderboardSnapshot.computed_at)
+        .where(LeaderboardSnapshot.type == type)
+        .where(LeaderboardSnapshot.period == period)
+        .distinct()
+        .order_by(LeaderboardSnapshot.computed_at.desc())
+    ).all()
+    if not generations:
+        return
+
+    keep = {generations[0]}
+    days_seen = set()
+    for generation in reversed(generations):
+        if generation > now - CHANGE_REFERENCE_AGE and generation.date() not in days_seen:
+            days_seen.add(generation.date())
+            keep.add(generation)
+    older = [g for g in generations if g <= now - CHANGE_REFERENCE_AGE]
+    if older:
+        keep.add(older[0])
+
+    session.exec(
+        delete(LeaderboardSnapshot)
+        .where(LeaderboardSnapshot.type == type)
+        .where(LeaderboardSnapshot.period == period)
+        .where(LeaderboardSnapshot.computed_at.not_in(keep))
+    )
+
+
+def write_snapshots(session: Session, now: datetime | None = None) -> None:
+    """Écrit un snapshot de chaque classement (INSERT ... SELECT) et purge les anciens."""
+    now = now or datetime.utcnow()
+    for type, period in BOARDS:
+        ranked = ranked_scores(type, period, now)
+        rows = select(
+            literal(type),
+            literal(period),
+            literal(now, DateTime),
+            ranked.c.user_id,
+            User.username,
+            User.avatar_url,
+            ranked.c.score,
+            ranked.c.rank,
+            ranked.c.position,
+        ).join(User, User.id == ranked.c.user_id)
+        reference = reference_generation(session, type, period, now)
+        if reference is None:
+            # Aucun snapshot d'une semaine : pas de variation
+            rows = rows.add_columns(literal(0))
+        else:
+            previous = (
+                select(LeaderboardSnapshot.user_id, LeaderboardSnapshot.rank)
+                .where(LeaderboardSnapshot.type == type)
+                .where(LeaderboardSnapshot.period == period)
+                .where(LeaderboardSnapshot.computed_at == reference)
+                .subquery()
+            )
+            rows = rows.add_columns(
+                func.coalesce(previous.c.rank - ranked.c.rank, 0)
+            ).outerjoin(previous, previous.c.user_id == ranked.c.user_id)
+        session.exec(insert(LeaderboardSnapshot).from_select(_SNAPSHOT_COLUMNS, rows))
+        _prune_generations(session, type, period, now)
+    session.commit()
+
+
+def run_leaderboard_snapshots() -> None:
+    """Point d'entrée de la tâche périodique."""
+    with Session(get_engine()) as session:
+        write_snapshots(session)
@@ -0,0 +1,215 @@
+"""Tampon d'écriture des likes de partages (optionnel).
+
+Sur un partage viral, chaque `POST /likes/{share_id}` prend le verrou
+d'écriture SQLite pour un seul like. Quand le tampon est activé
+(`LIKE_BUFFER_FLUSH_MS` > 0), les toggles sont gardés en mémoire par paire
+`(share_id, user_id)` : un like suivi d'un unlike s'annule sans toucher la
+base. Une tâche de fond vide le tampon toutes les N millisecondes en une seule
+transaction (relations, compteurs, outbox des notifications).
+
+Les lectures appliquent l'état en attente (`pending_state`, `pending_delta`),
+y compris pendant qu'un flush est en cours. Le tampon est propre au process :
+avec plusieurs workers, chacun vide le sien.
+"""
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Like
+from ..models import Share
+from ..models import User
+from .background import interval_from_env
+from .counters import bump_share_counter
+from .counters import bump_user_counters
+from .notification_outbox import enqueue_notification
+from .ranked_index import ranked_boards
+from .relations import delete_relation
+from .relations import insert_relation
+
+Key = tuple[str, str]
+
+
+class LikeBuffer:
+    """Toggles de likes en attente, indexés par `(share_id, user_id)`.
+
+    Chaque entrée garde l'état de départ (`base`) et l'état voulu : une entrée
+    revenue à son état de départ est retirée du tampon.
+    """
+
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # key -> (base, wanted) ; `inflight` contient le lot en cours d'écriture
+        self._pending: dict[Key, tuple[bool, bool]] = {}
+        self._inflight: dict[Key, tuple[bool, bool]] = {}
+        self._deltas: dict[str, int] = defaultdict(int)
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def _known_state(self, key: Key) -> bool | None:
+        for entries in (self._pending, self._inflight):
+            if key in entries:
+                return entries[key][1]
+        return None
+
+    def toggle(self, session: Session, share_id: str, user_id: str) -> bool:
+        """Inverse le like en mémoire et retourne le nouvel état."""
+        key = (share_id, user_id)
+        with self._lock:
+            known = self._known_state(key)
+        if known is None:
+            # Lecture hors verrou : la base ne change que via ce tampon pour cette paire
+            known = session.exec(
+                select(Like.id).where(Like.share_id == share_id).where(Like.user_id == user_id)
+            ).first() is not None
+
+        with self._lock:
+            current = self._known_state(key)
+            if current is None:
+                current = known
+            wanted = not current
+            base = self._pending[key][0] if key in self._pending else current
+            if wanted == base:
+                del self._pending[key]
+            else:
+                self._pending[key] = (base, wanted)
+            self._deltas[share_id] += 1 if wanted else -1
+            if not self._deltas[share_id]:
+                del self._deltas[share_id]
+        return wanted
+
+    def pending_state(self, share_id: str, user_id: str) -> bool | None:
+        """État en attente de la paire, ou None si elle n'est pas dans le tampon."""
+        with self._lock:
+            return self._known_state((share_id, user_id))
+
+    def pending_delta(self, share_id: str) -> int:
+        """Écart entre le compteur persisté et le compteur vu par les clients."""
+        with self._lock:
+            return self._deltas.get(share_id, 0)
+
+    def pending_deltas(self, share_ids: Iterable[str]) -> dict[str, int]:
+        """`pending_delta` pour plusieurs partages (une seule prise du verrou)."""
+        with self._lock:
+            return {share_id: self._deltas.get(share_id, 0) for share_id in share_ids}
+
+    def flush(self) -> int:
+        """Écrit les toggles en attente en une transaction. Retourne le nombre de paires écrites."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+            batch = self._inflight
+
+            try:
+                with Session(get_engine()) as session:
+                    applied, owner_deltas = _apply_batch(session, batch)
+                    session.commit()
+            except Exception:
+                # Le lot repasse en attente (sous les toggles arrivés entre-temps)
+                with self._lock:
+                    for key, (base, wanted) in batch.items():
+                        if key in self._pending:
+                            wanted = self._pending[key][1]
+                        if wanted == base:
+                            self._pending.pop(key, None)
+                        else:
+                            self._pending[key] = (base, wanted)
+                    self._inflight = {}
+                raise
+
+            with self._lock:
+                for share_id, delta in applied.items():
+                    self._deltas[share_id] -= delta
+                    if not self._deltas[share_id]:
+                        del self._deltas[share_id]
+                self._inflight = {}
+            for owner_id, delta in owner_deltas.items():
+                ranked_boards.adjust("likes", owner_id, delta)
+            return len(batch)
+
+
+def _apply_batch(
+    session: Session, batch: dict[Key, tuple[bool, bool]]
+) -> tuple[dict[str, int], dict[str, int]]:
+    """Applique un lot de toggles (sans commit).
+
+    Retourne, par partage, l'écart qui était affiché aux clients pour ce lot,
+    et par auteur l'écart de likes réellement écrits (classement en mémoire).
+    Le compteur persisté suit les lignes réellement insérées/supprimées.
+    """
+    shown: dict[str, int] = defaultdict(int)
+    written: dict[str, int] = defaultdict(int)
+    created: list[Key] = []
+    for (share_id, user_id), (_, wanted) in batch.items():
+        shown[share_id] += 1 if wanted else -1
+        if wanted:
+            if insert_relation(session, Like, share_id=share_id, user_id=user_id):
+                written[share_id] += 1
+                created.append((share_id, user_id))
+        elif delete_relation(session, Like, share_id=share_id, user_id=user_id):
+            written[share_id] -= 1
+
+    owner_deltas: dict[str, int] = defaultdict(int)
+    written = {share_id: delta for share_id, delta in written.items() if delta}
+    if written:
+        owners = session.exec(
+            select(Share.share_id, Share.owner_id).where(Share.share_id.in_(written))
+        ).all()
+        for share_id, owner_id in owners:
+            bump_share_counter(session, share_id, "like_count", written[share_id])
+            owner_deltas[owner_id] += written[share_id]
+    for owner_id, delta in owner_deltas.items():
+        if delta:
+            bump_user_counters(session, owner_id, total_likes=delta)
+    _notify(session, created)
+    return shown, dict(owner_deltas)
+
+
+def _notify(session: Session, created: list[Key]) -> None:
+    if not created:
+        return
+    owners = dict(
+        session.exec(
+            select(Share.share_id, Share.owner_id).where(
+                Share.share_id.in_({share_id for share_id, _ in created})
+            )
+        ).all()
+    )
+    usernames = dict(
+        session.exec(
+            select(User.id, User.username).where(User.id.in_({user_id for _, user_id in created}))
+        ).all()
+    )
+    for share_id, user_id in created:
+        owner_id = owners.get(share_id)
+        if owner_id is None or owner_id == user_id:
+            continue
+        username = usernames.get(user_id, "")
+        enqueue_notification(
+            session,
+            user_id=owner_id,
+            type="like",
+            actor_id=user_id,
+            actor_username=username,
+            reference_id=share_id,
+            message=f"{username} a aimé ta séance",
+        )
+
+
+like_buffer = LikeBuffer(interval_from_env("LIKE_BUFFER_FLUSH_MS", 0) / 1000)
+
+
+def run_like_flush() -> None:
+    """Point d'entrée de la tâche périodique."""
+    like_buffer.flush()
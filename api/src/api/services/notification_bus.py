@@ -0,0 +1,88 @@
+"""Pub/sub en mémoire des nouvelles notifications (flux SSE).
+
+Le worker de l'outbox publie chaque notification créée ou mise à jour, après
+commit. Les connexions SSE du même process reçoivent l'évènement sans
+interroger la base. Le bus est propre au process et ne garantit pas la
+livraison (file pleine, autre worker) : le client se resynchronise avec le
+curseur `since` / `Last-Event-ID` à la reconnexion.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from ..models import Notification
+from ..utils.pagination import encode_cursor
+
+# Évènements en attente par connexion avant d'en perdre
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def notification_event(notification: Notification) -> dict:
+    """Représentation JSON d'une notification (liste et flux SSE)."""
+    return {
+        "id": notification.id,
+        "type": notification.type,
+        "actor_id": notification.actor_id,
+        "actor_username": notification.actor_username,
+        "reference_id": notification.reference_id,
+        "message": notification.message,
+        "read": notification.read,
+        "created_at": notification.created_at.isoformat(),
+        "actor_count": notification.actor_count,
+        "latest_actors": notification.latest_actors or [],
+    }
+
+
+def notification_cursor(notification: Notification) -> str:
+    return encode_cursor(notification.created_at, notification.id)
+
+
+class NotificationBus:
+    """Abonnements par utilisateur ; `publish` peut être appelé depuis n'importe quel thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = (
+            defaultdict(set)
+        )
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """À appeler depuis la boucle asyncio qui consommera la file."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+    def publish(self, user_id: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Boucle déjà fermée : la connexion est en train de se terminer
+                pass
+
+
+def _offer(queue: asyncio.Queue, event: dict) -> None:
+    # Client trop lent : l'évènement est perdu, il sera relu via `since`
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+notification_bus = NotificationBus()
@@ -0,0 +1,230 @@
+"""Outbox des notifications.
+
+Les routes (like, commentaire, follow) ajoutent une ligne `NotificationOutbox`
+dans la transaction de l'action : une seule écriture par requête, et une
+erreur de notification ne peut plus faire échouer l'action. Un worker de fond
+transforme les lignes en `Notification` par lots, puis les publie sur le bus
+des flux SSE.
+
+Les likes, commentaires et follows sont regroupés à l'écriture par
+`(user_id, type, reference_id)` sur une fenêtre de temps comptée depuis le
+premier évènement du groupe (`first_at`) : une seule notification "Marie et 41
+autres ont aimé ta séance" au lieu de 42 lignes. Les acteurs distincts d'un
+groupe sont tenus dans `NotificationActor` : un acteur qui revient (like,
+unlike, like) n'est jamais recompté.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete
+from sqlalchemy import update
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Notification
+from ..models import NotificationActor
+from ..models import NotificationOutbox
+from .notification_bus import notification_bus
+from .notification_bus import notification_cursor
+from .notification_bus import notification_event
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 200
+# Au-delà, la ligne reste dans l'outbox pour analyse mais n'est plus retentée
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Types regroupés et fin du message au pluriel
+GROUPED_TYPES = {
+    "like": "ont aimé ta séance",
+    "comment": "ont commenté ta séance",
+    "follow": "ont commencé à te suivre",
+}
+NOTIFICATION_GROUP_WINDOW = timedelta(hours=24)
+LATEST_ACTORS_SIZE = 3
+
+GroupKey = tuple[str, str, str | None]
+
+
+def enqueue_notification(
+    session: Session,
+    user_id: str,
+    type: str,
+    actor_id: str,
+    actor_username: str,
+    message: str,
+    reference_id: str | None = None,
+) -> None:
+    """Ajoute une notification à l'outbox (sans commit)."""
+    session.add(
+        NotificationOutbox(
+            user_id=user_id,
+            type=type,
+            actor_id=actor_id,
+            actor_username=actor_username,
+            reference_id=reference_id,
+            message=message,
+        )
+    )
+
+
+def _group_message(notification: Notification) -> str:
+    verb = GROUPED_TYPES[notification.type]
+    actors = notification.latest_actors
+    first = actors[0]["username"]
+    if notification.actor_count == 2 and len(actors) == 2:
+        return f"{first} et {actors[1]['username']} {verb}"
+    others = notification.actor_count - 1
+    return f"{first} et {others} autre{'s' if others > 1 else ''} {verb}"
+
+
+def _find_group(session: Session, entry: NotificationOutbox) -> Notification | None:
+    """Notification de même clé `(user_id, type, reference_id)` ouverte dans la fenêtre."""
+    return session.exec(
+        select(Notification)
+        .where(Notification.user_id == entry.user_id)
+        .where(Notification.type == entry.type)
+        .where(Notification.reference_id == entry.reference_id)
+        .where(Notification.first_at >= entry.created_at - NOTIFICATION_GROUP_WINDOW)
+        .order_by(Notification.first_at.desc())
+        .limit(1)
+    ).first()
+
+
+def _add_actor(session: Session, notification_id: str, actor_id: str) -> bool:
+    """Enregistre l'acteur du groupe. Retourne True s'il n'y figurait pas encore."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    result = session.exec(
+        dialect_insert(NotificationActor)
+        .values(notification_id=notification_id, actor_id=actor_id)
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount > 0
+
+
+def _merge_into_group(
+    session: Session, notification: Notification, entry: NotificationOutbox
+) -> None:
+    actor = {"id": entry.actor_id, "username": entry.actor_username}
+    previous = notification.latest_actors or [
+        {"id": notification.actor_id, "username": notification.actor_username}
+    ]
+    if _add_actor(session, notification.id, entry.actor_id):
+        notification.actor_count += 1
+    others = [a for a in previous if a["id"] != entry.actor_id]
+    # Nouvelle liste (et non mutation) pour que la colonne JSON soit bien écrite
+    notification.latest_actors = [actor, *others][:LATEST_ACTORS_SIZE]
+    notification.actor_id = entry.actor_id
+    notification.actor_username = entry.actor_username
+    if notification.actor_count > 1:
+        notification.message = _group_message(notification)
+    else:
+        notification.message = entry.message
+    notification.read = False
+    notification.created_at = max(notification.created_at, entry.created_at)
+
+
+def _deliver(session: Session, entries: list[NotificationOutbox]) -> list[Notification]:
+    groups: dict[GroupKey, Notification] = {}
+    for entry in entries:
+        key = (entry.user_id, entry.type, entry.reference_id)
+        group = None
+        if entry.type in GROUPED_TYPES:
+            group = groups.get(key) or _find_group(session, entry)
+        if group is not None:
+            _merge_into_group(session, group, entry)
+            session.add(group)
+        else:
+            group = Notification(
+                user_id=entry.user_id,
+                type=entry.type,
+                actor_id=entry.actor_id,
+                actor_username=entry.actor_username,
+                reference_id=entry.reference_id,
+                message=entry.message,
+                latest_actors=[{"id": entry.actor_id, "username": entry.actor_username}],
+                first_at=entry.created_at,
+                created_at=entry.created_at,
+            )
+            session.add(group)
+            if entry.type in GROUPED_TYPES:
+                _add_actor(session, group.id, entry.actor_id)
+        groups[key] = group
+    session.exec(
+        delete(NotificationOutbox)
+        .where(NotificationOutbox.id.in_([entry.id for entry in entries]))
+        .execution_options(synchronize_session=False)
+    )
+    return list(groups.values())
+
+
+def _commit_and_publish(session: Session, notifications: list[Notification]) -> None:
+    # Évènements construits avant le commit (qui expire les objets), publiés après
+    events = [
+        (n.user_id, {"cursor": notification_cursor(n), "notification": notification_event(n)})
+        for n in notifications
+    ]
+    session.commit()
+    for user_id, event in events:
+        notification_bus.publish(user_id, event)
+
+
+def process_outbox(session: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Traite un lot de l'outbox. Retourne le nombre de lignes traitées.
+
+    Le lot est écrit en une transaction ; s'il échoue, les lignes sont
+    reprises une par une pour isoler celle qui pose problème.
+    """
+    entries = session.exec(
+        select(NotificationOutbox)
+        .where(NotificationOutbox.attempts < OUTBOX_MAX_ATTEMPTS)
+        .order_by(NotificationOutbox.created_at)
+        .limit(batch_size)
+    ).all()
+    if not entries:
+        return 0
+    session.expunge_all()
+
+    try:
+        _commit_and_publish(session, _deliver(session, entries))
+        return len(entries)
+    except Exception:
+        session.rollback()
+        logger.exception("Lot d'outbox en échec, reprise ligne par ligne")
+
+    delivered = 0
+    for entry in entries:
+        try:
+            _commit_and_publish(session, _deliver(session, [entry]))
+            delivered += 1
+        except Exception as exc:
+            session.rollback()
+            session.exec(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id == entry.id)
+                .values(attempts=NotificationOutbox.attempts + 1, last_error=str(exc)[:500])
+            )
+            session.commit()
+    return delivered
+
+
+def drain_outbox(session: Session) -> int:
+    """Traite l'outbox jusqu'à ce qu'elle soit vide (ou ne contienne que des échecs)."""
+    total = 0
+    while True:
+        delivered = process_outbox(session)
+        total += delivered
+        if delivered < OUTBOX_BATCH_SIZE:
+            return total
+
+
+def run_outbox_worker() -> None:
+    """Point d'entrée de la tâche périodique."""
+    with Session(get_engine()) as session:
+        drain_outbox(session)
@@ -0,0 +1,166 @@
+"""Records personnels et progression par exercice (`PersonalRecord`, `ExerciseProgress`).
+
+Pour chaque couple `(user_id, exercise_id)` : meilleure charge, meilleur 1RM
+estimé (formule d'Epley) et set au plus gros volume, plus l'historique par jour
+du 1RM estimé. Seules les séances terminées et non supprimées comptent ; le
+jour d'une séance est celui de `volume_rollup.workout_day`.
+
+Les couples touchés (sync d'une séance ou de ses sets, partage) sont recalculés
+depuis les tables sources (`refresh_personal_records`), ce qui reste
+idempotent ; `rebuild_personal_records` reconstruit tout.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date
+from datetime import datetime
+
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import or_
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..models import ExerciseProgress
+from ..models import PersonalRecord
+from ..models import Set
+from ..models import Workout
+from ..models import WorkoutExercise
+
+Key = tuple[str, str]  # (user_id, exercise_id)
+
+_INSERT_BATCH = 500
+
+
+def estimated_1rm(weight: float, reps: int) -> float:
+    """1RM estimé (Epley) ; un set d'une répétition vaut sa charge."""
+    if reps <= 0 or weight <= 0:
+        return 0.0
+    if reps == 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def _beats(value: float, day: date, best: float, best_day: date | None) -> bool:
+    """Nouveau record ; à égalité, le plus ancien est gardé."""
+    return value > 0 and (value > best or (value == best and (best_day is None or day < best_day)))
+
+
+def _aggregate(rows) -> tuple[dict[Key, dict], dict[tuple[str, str, date], dict]]:
+    records: dict[Key, dict] = {}
+    progress: dict[tuple[str, str, date], dict] = {}
+    for user_id, exercise_id, ended_at, started_at, created_at, reps, weight in rows:
+        reps, weight = reps or 0, weight or 0.0
+        day = (ended_at or started_at or created_at).date()
+        e1rm = round(estimated_1rm(weight, reps), 1)
+
+        point = progress.setdefault((user_id, exercise_id, day), {
+            "best_e1rm": 0.0, "best_weight": 0.0, "volume": 0.0, "set_count": 0,
+        })
+        point["best_e1rm"] = max(point["best_e1rm"], e1rm)
+        point["best_weight"] = max(point["best_weight"], weight)
+        point["volume"] += reps * weight
+        point["set_count"] += 1
+
+        record = records.setdefault((user_id, exercise_id), {
+            "best_weight": 0.0, "best_weight_day": None,
+            "best_e1rm": 0.0, "best_e1rm_day": None,
+            "best_set_reps": 0, "best_set_weight": 0.0, "best_set_day": None,
+        })
+        if _beats(weight, day, record["best_weight"], record["best_weight_day"]):
+            record.update(best_weight=weight, best_weight_day=day)
+        if _beats(e1rm, day, record["best_e1rm"], record["best_e1rm_day"]):
+            record.update(best_e1rm=e1rm, best_e1rm_day=day)
+        best_volume = record["best_set_reps"] * record["best_set_weight"]
+        if _beats(reps * weight, day, best_volume, record["best_set_day"]):
+            record.update(best_set_reps=reps, best_set_weight=weight, best_set_day=day)
+    return records, progress
+
+
+def _sets_select(*filters):
+    return (
+        select(
+            Workout.user_id,
+            WorkoutExercise.exercise_id,
+            Workout.ended_at,
+            Workout.started_at,
+            Workout.created_at,
+            Set.reps,
+            Set.weight,
+        )
+        .join(WorkoutExercise, WorkoutExercise.id == Set.workout_exercise_id)
+        .join(Workout, Workout.id == WorkoutExercise.workout_id)
+        .where(Workout.status == "completed")
+        .where(Workout.deleted_at.is_(None))
+        .where(*filters)
+    )
+
+
+def _write(
+    session: Session, records: dict[Key, dict], progress: dict[tuple[str, str, date], dict]
+) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "exercise_id": exercise_id, **record, "updated_at": now}
+        for (user_id, exercise_id), record in records.items()
+    ]
+    points = [
+        {"user_id": user_id, "exercise_id": exercise_id, "day": day, **point}
+        for (user_id, exercise_id, day), point in progress.items()
+    ]
+    # Par lots, sous la limite de paramètres de SQLite
+    for start in range(0, len(rows), _INSERT_BATCH):
+        session.exec(insert(PersonalRecord).values(rows[start:start + _INSERT_BATCH]))
+    for start in range(0, len(points), _INSERT_BATCH):
+        session.exec(insert(ExerciseProgress).values(points[start:start + _INSERT_BATCH]))
+
+
+def refresh_personal_records(session: Session, keys: Iterable[Key]) -> None:
+    """Recalcule records et historique des couples `(user_id, exercise_id)` donnés (sans commit)."""
+    keys = set(keys)
+    if not keys:
+        return
+    session.exec(delete(PersonalRecord).where(
+        or_(*(and_(PersonalRecord.user_id == u, PersonalRecord.exercise_id == e) for u, e in keys))
+    ))
+    session.exec(delete(ExerciseProgress).where(
+        or_(
+            *(
+                and_(ExerciseProgress.user_id == u, ExerciseProgress.exercise_id == e)
+                for u, e in keys
+            )
+        )
+    ))
+    rows = session.exec(_sets_select(
+        or_(*(and_(Workout.user_id == u, WorkoutExercise.exercise_id == e) for u, e in keys))
+    )).all()
+    _write(session, *_aggregate(rows))
+
+
+def workout_record_keys(session: Session, workout_ids: Iterable[str]) -> set[Key]:
+    """Couples `(user_id, exercise_id)` des exercices des séances données."""
+    workout_ids = set(workout_ids)
+    if not workout_ids:
+        return set()
+    return set(
+        session.exec(
+            select(Workout.user_id, WorkoutExercise.exercise_id)
+            .join(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+            .where(Workout.id.in_(workout_ids))
+        ).all()
+    )
+
+
+def rebuild_personal_records(session: Session, user_id: str | None = None) -> None:
+    """Reconstruit records et historique (tous les utilisateurs ou un seul) (sans commit)."""
+    clear_records = delete(PersonalRecord)
+    clear_progress = delete(ExerciseProgress)
+    filters = []
+    if user_id is not None:
+        clear_records = clear_records.where(PersonalRecord.user_id == user_id)
+        clear_progress = clear_progress.where(ExerciseProgress.user_id == user_id)
+        filters.append(Workout.user_id == user_id)
+    session.exec(clear_records)
+    session.exec(clear_progress)
+    _write(session, *_aggregate(session.exec(_sets_select(*filters)).all()))
@@ -0,0 +1,267 @@
+"""Classements tenus en mémoire (structure d'ordre statistique).
+
+Pour les classements "depuis toujours" alimentés par des évènements simples
+(likes reçus, followers, séances partagées), chaque process garde une skiplist
+indexable triée par score : mise à jour d'un score, rang d'un utilisateur,
+top N et voisins en O(log n), sans requête de classement par appel.
+
+L'index est chargé depuis la base au démarrage puis alimenté après commit par
+les routes (like, follow, partage). Il est rechargé périodiquement pour
+rattraper les écritures faites par d'autres process ou hors API. Seuls les
+profils affichés (pseudo, avatar) sont lus en base, par clé primaire.
+"""
+from __future__ import annotations
+
+import math
+import random
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import LeaderboardSnapshot
+from ..models import User
+from .leaderboard import ranked_scores
+from .leaderboard import reference_generation
+
+# Classements servis depuis la mémoire
+MEMORY_BOARDS = (("likes", "all"), ("followers", "all"), ("sessions", "all"))
+
+_MAX_LEVELS = 24  # ~16 millions d'éléments
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels: int) -> None:
+        self.key = key
+        self.next: list[_Node | None] = [None] * levels
+        self.width: list[int] = [1] * levels
+
+
+class IndexableSkiplist:
+    """Liste triée de clés uniques avec accès par position en O(log n).
+
+    `width[level]` est la distance (en éléments) entre un nœud et son suivant
+    au niveau `level` ; elle permet de compter les éléments sautés.
+    """
+
+    def __init__(self) -> None:
+        self.head = _Node(None, _MAX_LEVELS)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _chain(self, key) -> tuple[list[_Node], list[int]]:
+        chain: list[_Node] = [self.head] * _MAX_LEVELS
+        steps = [0] * _MAX_LEVELS
+        node = self.head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        return chain, steps
+
+    def insert(self, key) -> None:
+        chain, steps_at_level = self._chain(key)
+        levels = min(_MAX_LEVELS, 1 - int(math.log(1.0 - random.random(), 2.0)))
+        node = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, _MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key) -> None:
+        chain, _ = self._chain(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), _MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def bisect_left(self, key) -> int:
+        """Nombre de clés strictement inférieures à `key`."""
+        _, steps = self._chain(key)
+        return sum(steps)
+
+    def slice(self, start: int, stop: int) -> list:
+        """Clés des positions [start, stop) (0-indexées)."""
+        start = max(start, 0)
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+        node = self.head
+        remaining = start + 1
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class RankedRow(NamedTuple):
+    user_id: str
+    username: str
+    avatar_url: str | None
+    score: int
+    rank: int
+    position: int
+    change: int
+
+
+class RankedBoard:
+    """Scores d'un classement, triés par `(-score, user_id)`."""
+
+    def __init__(self, scores: dict[str, int], reference_ranks: dict[str, int]) -> None:
+        self._lock = threading.Lock()
+        self._scores: dict[str, int] = {}
+        self._order = IndexableSkiplist()
+        self.reference_ranks = reference_ranks
+        for user_id, score in scores.items():
+            self._set(user_id, score)
+
+    def _set(self, user_id: str, score: int) -> None:
+        previous = self._scores.pop(user_id, None)
+        if previous is not None:
+            self._order.remove((-previous, user_id))
+        # Comme en SQL : pas de rang sans score
+        if score > 0:
+            self._scores[user_id] = score
+            self._order.insert((-score, user_id))
+
+    def adjust(self, user_id: str, delta: int) -> None:
+        with self._lock:
+            self._set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def _rank_for(self, score: int) -> int:
+        # RANK() : 1 + nombre d'utilisateurs avec un score strictement supérieur
+        return self._order.bisect_left((-score, "")) + 1
+
+    def _rows(self, start: int, stop: int) -> list[tuple[str, int, int, int]]:
+        # Fenêtre "autour de moi" près du haut : elle commence au premier
+        start = max(start, 0)
+        rows = []
+        previous_score = None
+        rank = 0
+        for offset, (negative_score, user_id) in enumerate(self._order.slice(start, stop)):
+            score = -negative_score
+            if score != previous_score:
+                rank = self._rank_for(score)
+                previous_score = score
+            rows.append((user_id, score, rank, start + offset + 1))
+        return rows
+
+    def read(
+        self, current_user_id: str | None, limit: int, around: int
+    ) -> tuple[list, list, int | None]:
+        """(top, autour de moi, mon rang) en `(user_id, score, rank, position)`."""
+        with self._lock:
+            top = self._rows(0, limit)
+            score = self._scores.get(current_user_id) if current_user_id else None
+            if score is None:
+                return top, [], None
+            position = self._order.bisect_left((-score, current_user_id)) + 1
+            around_me = self._rows(position - 1 - around, position + around)
+            return top, around_me, self._rank_for(score)
+
+
+class RankedBoards:
+    """Registre des classements en mémoire (un par `(type, period)` de MEMORY_BOARDS)."""
+
+    def __init__(self) -> None:
+        self._boards: dict[tuple[str, str], RankedBoard] = {}
+
+    def serves(self, type: str, period: str) -> bool:
+        return (type, period) in self._boards
+
+    def warm(self, session: Session) -> None:
+        """(Re)charge les scores depuis la base et le rang de référence d'il y a une semaine."""
+        now = datetime.utcnow()
+        boards = {}
+        for type, period in MEMORY_BOARDS:
+            ranked = ranked_scores(type, period, now)
+            scores = dict(session.exec(select(ranked.c.user_id, ranked.c.score)).all())
+            reference = reference_generation(session, type, period, now)
+            # Pas de snapshot d'une semaine : aucune référence, change = 0
+            reference_ranks = dict(
+                session.exec(
+                    select(LeaderboardSnapshot.user_id, LeaderboardSnapshot.rank)
+                    .where(LeaderboardSnapshot.type == type)
+                    .where(LeaderboardSnapshot.period == period)
+                    .where(LeaderboardSnapshot.computed_at == reference)
+                ).all()
+            ) if reference is not None else {}
+            boards[(type, period)] = RankedBoard(scores, reference_ranks)
+        # Remplacement atomique : les lectures en cours gardent l'ancien index
+        self._boards = boards
+
+    def adjust(self, type: str, user_id: str, delta: int) -> None:
+        """Applique un évènement commité (like, follow, partage) au classement `type`."""
+        for (board_type, _), board in self._boards.items():
+            if board_type == type:
+                board.adjust(user_id, delta)
+
+    def read(
+        self,
+        session: Session,
+        type: str,
+        period: str,
+        current_user_id: str | None,
+        limit: int,
+        around: int,
+    ) -> tuple[list[RankedRow], list[RankedRow], int | None]:
+        board = self._boards[(type, period)]
+        top, around_me, my_rank = board.read(current_user_id, limit, around)
+
+        user_ids = {row[0] for row in top} | {row[0] for row in around_me}
+        profiles = {
+            user_id: (username, avatar_url)
+            for user_id, username, avatar_url in session.exec(
+                select(User.id, User.username, User.avatar_url).where(User.id.in_(user_ids))
+            ).all()
+        } if user_ids else {}
+
+        def to_rows(rows) -> list[RankedRow]:
+            result = []
+            for user_id, score, rank, position in rows:
+                if user_id not in profiles:
+                    continue
+                username, avatar_url = profiles[user_id]
+                reference = board.reference_ranks.get(user_id)
+                change = reference - rank if reference is not None else 0
+                result.append(
+                    RankedRow(user_id, username, avatar_url, score, rank, position, change)
+                )
+            return result
+
+        return to_rows(top), to_rows(around_me), my_rank
+
+
+ranked_boards = RankedBoards()
+
+
+def run_ranked_index_refresh() -> None:
+    """Point d'entrée de la tâche périodique (et du démarrage)."""
+    with Session(get_engine()) as session:
+        ranked_boards.warm(session)
@@ -0,0 +1,56 @@
+"""Relations uniques (likes, likes de commentaires, follows) en instructions uniques.
+
+Les tables concernées portent un index unique sur la paire de clés : une
+insertion concurrente est ignorée (`ON CONFLICT DO NOTHING`) au lieu de créer
+un doublon, et chaque opération indique si elle a réellement modifié la base.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import delete
+from sqlmodel import Session
+from sqlmodel import SQLModel
+
+from ..models import generate_uuid
+
+
+def _insert_ignore(session: Session, model: type[SQLModel]):
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+
+def insert_relation(session: Session, model: type[SQLModel], **keys: str) -> bool:
+    """Crée la relation si elle n'existe pas. Retourne True si une ligne a été insérée."""
+    statement = (
+        _insert_ignore(session, model)
+        .values(id=generate_uuid(), created_at=datetime.utcnow(), **keys)
+        .returning(model.id)
+    )
+    return session.exec(statement).first() is not None
+
+
+def delete_relation(session: Session, model: type[SQLModel], **keys: str) -> bool:
+    """Supprime la relation. Retourne True si une ligne a été supprimée."""
+    statement = (
+        delete(model)
+        .where(*(getattr(model, column) == value for column, value in keys.items()))
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    return session.exec(statement).first() is not None
+
+
+def toggle_relation(session: Session, model: type[SQLModel], **keys: str) -> tuple[bool, bool]:
+    """Supprime la relation si elle existe, la crée sinon (sans commit).
+
+    Retourne `(active, changed)` : l'état final de la relation et si cette
+    requête l'a modifié (False quand une requête concurrente l'a déjà créée).
+    """
+    if delete_relation(session, model, **keys):
+        return False, True
+    created = insert_relation(session, model, **keys)
+    return True, created
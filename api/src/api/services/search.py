@@ -0,0 +1,92 @@
+"""Recherche plein texte (Explore) sur les index FTS5 `user_fts` et `share_fts`.
+
+Les index sont créés et tenus à jour par triggers (voir `db._ensure_search_index`).
+Chaque mot saisi est cherché comme préfixe ("squ" trouve "squat"), sans
+accents, et tous les mots doivent apparaître. Les résultats sont classés par
+BM25, le pseudo (ou le titre de séance) pesant plus que la bio (ou l'auteur).
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from sqlalchemy import column
+from sqlalchemy import func
+from sqlalchemy import literal_column
+from sqlalchemy import table
+from sqlalchemy import text
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..models import Share
+from ..models import User
+from ..models import UserCounters
+
+_user_fts = table("user_fts", column("rowid"))
+_share_fts = table("share_fts", column("rowid"))
+
+# Poids BM25 par colonne indexée
+USER_WEIGHTS = (10.0, 1.0)  # username, bio
+SHARE_WEIGHTS = (5.0, 2.0)  # workout_title, owner_username
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(q: str) -> str | None:
+    """Traduit la saisie en requête FTS5 : préfixes entre guillemets, tous requis.
+
+    Les opérateurs FTS5 (AND, NEAR, *, ^...) saisis sont neutralisés.
+    """
+    tokens = _TOKEN.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_users(session: Session, q: str, limit: int, offset: int = 0) -> list[User]:
+    match = fts_query(q)
+    if match is None:
+        return []
+    rank = func.bm25(literal_column("user_fts"), *USER_WEIGHTS)
+    return list(
+        session.exec(
+            select(User)
+            .join(_user_fts, _user_fts.c.rowid == literal_column('"user".rowid'))
+            .where(text("user_fts MATCH :match").bindparams(match=match))
+            .order_by(rank, User.id)
+            .offset(offset)
+            .limit(limit)
+        ).all()
+    )
+
+
+def search_shares(session: Session, q: str, limit: int, offset: int = 0) -> list[Share]:
+    match = fts_query(q)
+    if match is None:
+        return []
+    rank = func.bm25(literal_column("share_fts"), *SHARE_WEIGHTS)
+    return list(
+        session.exec(
+            select(Share)
+            .join(_share_fts, _share_fts.c.rowid == literal_column("share.rowid"))
+            .where(text("share_fts MATCH :match").bindparams(match=match))
+            .order_by(rank, Share.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        ).all()
+    )
+
+
+def user_counts(session: Session, user_ids: Iterable[str]) -> dict[str, tuple[int, int]]:
+    """(followers, posts) par utilisateur, lus dans `UserCounters` en une requête."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    counters = {
+        user_id: (followers, posts)
+        for user_id, followers, posts in session.exec(
+            select(UserCounters.user_id, UserCounters.followers_count, UserCounters.posts_count)
+            .where(UserCounters.user_id.in_(user_ids))
+        ).all()
+    }
+    return {user_id: counters.get(user_id, (0, 0)) for user_id in user_ids}
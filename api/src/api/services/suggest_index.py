@@ -0,0 +1,187 @@
+"""Index de préfixes en mémoire pour l'autocomplétion (`/search/suggest`).
+
+Les pseudos et les exercices (nom et slug) sont normalisés (`utils.slug.normalize`,
+minuscules, sans accents) dans un tableau trié par type : une saisie est une
+recherche dichotomique (bisect) puis la lecture des quelques clés qui suivent,
+sans requête SQL. Un tableau par type : un préfixe courant chez les exercices
+n'épuise pas la lecture avant d'atteindre les pseudos. Chaque mot d'un nom est
+aussi une clé ("couché" trouve "Développé couché").
+
+L'index est chargé au démarrage puis mis à jour à chaque commit qui écrit un
+`User` ou un `Exercise` (évènements de session SQLAlchemy : routes, seeds et
+imports passent tous par l'ORM). Il est propre au process et rechargé
+périodiquement pour rattraper les écritures des autres process.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from bisect import bisect_left
+from bisect import insort
+from typing import NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Exercise
+from ..models import User
+from ..utils.slug import normalize
+
+_WORD_START = re.compile(r"(?<![a-z0-9])[a-z0-9]")
+
+# Clés lues au plus par saisie et par type (préfixe très court sur un gros catalogue)
+SUGGEST_SCAN_LIMIT = 500
+
+
+class Suggestion(NamedTuple):
+    kind: str  # 'user' ou 'exercise'
+    id: str
+    label: str  # pseudo ou nom de l'exercice
+    slug: str | None = None
+    muscle_group: str | None = None
+
+
+def normalize_term(value: str) -> str:
+    return " ".join(normalize(value).lower().split())
+
+
+def _terms(suggestion: Suggestion) -> list[tuple[str, int]]:
+    """Clés d'une entrée et leur priorité (0 : début du nom, 1 : mot suivant ou slug)."""
+    label = normalize_term(suggestion.label)
+    terms = {(label, 0)}
+    for match in _WORD_START.finditer(label):
+        if match.start():
+            terms.add((label[match.start():], 1))
+    if suggestion.slug:
+        terms.add((suggestion.slug, 1))
+    return sorted(terms)
+
+
+class SuggestIndex:
+    """Un tableau trié de `(clé, priorité, id)` par kind et entrées par `(kind, id)`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._keys: dict[str, list[tuple[str, int, str]]] = {}
+        self._entries: dict[tuple[str, str], Suggestion] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, kind: str, id: str) -> None:
+        previous = self._entries.pop((kind, id), None)
+        if previous is None:
+            return
+        keys = self._keys[kind]
+        for term, priority in _terms(previous):
+            key = (term, priority, id)
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _put(self, suggestion: Suggestion) -> None:
+        self._remove(suggestion.kind, suggestion.id)
+        self._entries[(suggestion.kind, suggestion.id)] = suggestion
+        keys = self._keys.setdefault(suggestion.kind, [])
+        for term, priority in _terms(suggestion):
+            insort(keys, (term, priority, suggestion.id))
+
+    def apply(self, writes: list[tuple[str, str, Suggestion | None]]) -> None:
+        """Applique des écritures `(kind, id, entrée)` dans l'ordre ; entrée None : suppression."""
+        with self._lock:
+            for kind, id, suggestion in writes:
+                if suggestion is None:
+                    self._remove(kind, id)
+                else:
+                    self._put(suggestion)
+
+    def load(self, suggestions: list[Suggestion]) -> None:
+        """Remplace tout l'index (tri unique plutôt que des insertions une à une)."""
+        entries = {(s.kind, s.id): s for s in suggestions}
+        keys: dict[str, list[tuple[str, int, str]]] = {}
+        for s in entries.values():
+            kind_keys = keys.setdefault(s.kind, [])
+            kind_keys.extend((term, priority, s.id) for term, priority in _terms(s))
+        for kind_keys in keys.values():
+            kind_keys.sort()
+        with self._lock:
+            self._entries, self._keys = entries, keys
+
+    def suggest(self, q: str, kinds: set[str], limit: int) -> list[Suggestion]:
+        """Entrées dont une clé commence par `q` : débuts de nom d'abord, puis alphabétique."""
+        prefix = normalize_term(q)
+        if not prefix:
+            return []
+        matches: dict[tuple[str, str], tuple[int, str]] = {}
+        with self._lock:
+            for kind in kinds:
+                keys = self._keys.get(kind, [])
+                start = bisect_left(keys, (prefix,))
+                for term, priority, id in keys[start:start + SUGGEST_SCAN_LIMIT]:
+                    if not term.startswith(prefix):
+                        break
+                    best = matches.get((kind, id))
+                    if best is None or (priority, term) < best:
+                        matches[(kind, id)] = (priority, term)
+            ranked = sorted(matches, key=lambda key: matches[key])
+            return [self._entries[key] for key in ranked[:limit]]
+
+
+def _user_suggestion(user: User) -> Suggestion:
+    return Suggestion("user", user.id, user.username)
+
+
+def _exercise_suggestion(exercise: Exercise) -> Suggestion:
+    return Suggestion("exercise", exercise.id, exercise.name, exercise.slug, exercise.muscle_group)
+
+
+_SUGGESTIONS = {User: _user_suggestion, Exercise: _exercise_suggestion}
+
+suggest_index = SuggestIndex()
+
+
+def warm_suggest_index(session: Session) -> None:
+    suggest_index.load(
+        [_user_suggestion(user) for user in session.exec(select(User)).all()]
+        + [_exercise_suggestion(exercise) for exercise in session.exec(select(Exercise)).all()]
+    )
+
+
+def run_suggest_index_refresh() -> None:
+    """Point d'entrée de la tâche périodique (et du démarrage)."""
+    with Session(get_engine()) as session:
+        warm_suggest_index(session)
+
+
+# Mise à jour incrémentale : les écritures sont relevées à chaque flush et
+# appliquées à l'index seulement si la transaction est commitée.
+_PENDING = "suggest_index_pending"
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _collect_writes(session: OrmSession, flush_context) -> None:
+    pending = session.info.setdefault(_PENDING, [])
+    for obj in (*session.new, *session.dirty):
+        to_suggestion = _SUGGESTIONS.get(type(obj))
+        if to_suggestion is not None:
+            suggestion = to_suggestion(obj)
+            pending.append((suggestion.kind, suggestion.id, suggestion))
+    for obj in session.deleted:
+        to_suggestion = _SUGGESTIONS.get(type(obj))
+        if to_suggestion is not None:
+            pending.append((to_suggestion(obj).kind, obj.id, None))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_writes(session: OrmSession) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        suggest_index.apply(pending)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_writes(session: OrmSession) -> None:
+    session.info.pop(_PENDING, None)
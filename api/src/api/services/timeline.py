@@ -0,0 +1,129 @@
+"""Timeline "abonnements" matérialisée (fan-out à l'écriture).
+
+Chaque partage est copié dans la timeline de son auteur et de ses followers au
+moment de la publication. Un follow recopie les derniers partages du compte
+suivi, un unfollow les retire. Chaque fan-out ou backfill borne aussitôt les
+timelines touchées à TIMELINE_MAX_LENGTH entrées. La lecture d'une page devient
+un simple parcours d'index `(user_id, created_at)`.
+"""
+from __future__ import annotations
+
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import literal
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Follower
+from ..models import Share
+from ..models import TimelineEntry
+
+# Nombre maximum d'entrées conservées par timeline
+TIMELINE_MAX_LENGTH = 500
+
+_COLUMNS = ["user_id", "share_id", "owner_id", "created_at"]
+
+
+def timeline_statement(user_id: str):
+    """Partages de la timeline d'un utilisateur (à compléter par le curseur et l'ordre)."""
+    return (
+        select(Share)
+        .join(TimelineEntry, TimelineEntry.share_id == Share.share_id)
+        .where(TimelineEntry.user_id == user_id)
+    )
+
+
+def fan_out_share(session: Session, share: Share) -> None:
+    """Pousse un nouveau partage dans la timeline de l'auteur et de ses followers (sans commit)."""
+    session.add(
+        TimelineEntry(
+            user_id=share.owner_id,
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            created_at=share.created_at,
+        )
+    )
+    followers = select(
+        Follower.follower_id,
+        literal(share.share_id),
+        literal(share.owner_id),
+        literal(share.created_at),
+    ).where(Follower.followed_id == share.owner_id)
+    session.exec(insert(TimelineEntry).from_select(_COLUMNS, followers))
+    # Une entrée de plus par timeline touchée : la plus ancienne au-delà de la borne sort
+    trim_timelines(session, [share.owner_id])
+    trim_timelines(
+        session, select(Follower.follower_id).where(Follower.followed_id == share.owner_id)
+    )
+
+
+def backfill_follow(session: Session, follower_id: str, followed_id: str) -> None:
+    """Recopie les derniers partages de `followed_id` chez `follower_id` (sans commit)."""
+    already_there = select(TimelineEntry.share_id).where(TimelineEntry.user_id == follower_id)
+    latest = (
+        select(literal(follower_id), Share.share_id, Share.owner_id, Share.created_at)
+        .where(Share.owner_id == followed_id)
+        .where(Share.share_id.not_in(already_there))
+        .order_by(Share.created_at.desc())
+        .limit(TIMELINE_MAX_LENGTH)
+    )
+    session.exec(insert(TimelineEntry).from_select(_COLUMNS, latest))
+    trim_timelines(session, [follower_id])
+
+
+def prune_unfollow(session: Session, follower_id: str, followed_id: str) -> None:
+    """Retire les partages de `followed_id` de la timeline de `follower_id` (sans commit)."""
+    session.exec(
+        delete(TimelineEntry)
+        .where(TimelineEntry.user_id == follower_id)
+        .where(TimelineEntry.owner_id == followed_id)
+    )
+
+
+def trim_timelines(session: Session, user_ids: list[str] | Select | None = None) -> None:
+    """Supprime les entrées au-delà de TIMELINE_MAX_LENGTH.
+
+    `user_ids` (liste ou sous-requête) restreint aux timelines concernées ;
+    toutes si None.
+    """
+    position = (
+        func.row_number()
+        .over(partition_by=TimelineEntry.user_id, order_by=TimelineEntry.created_at.desc())
+        .label("position")
+    )
+    ranked = select(TimelineEntry.user_id, TimelineEntry.share_id, position)
+    if user_ids is not None:
+        ranked = ranked.where(TimelineEntry.user_id.in_(user_ids))
+    ranked_subquery = ranked.subquery()
+    overflow = select(ranked_subquery.c.user_id, ranked_subquery.c.share_id).where(
+        ranked_subquery.c.position > TIMELINE_MAX_LENGTH
+    )
+    session.exec(
+        delete(TimelineEntry).where(
+            tuple_(TimelineEntry.user_id, TimelineEntry.share_id).in_(overflow)
+        )
+    )
+
+
+def rebuild_all_timelines(session: Session) -> None:
+    """Reconstruit toutes les timelines depuis `Share` et `Follower` (sans commit)."""
+    session.exec(delete(TimelineEntry))
+    own_shares = select(Share.owner_id, Share.share_id, Share.owner_id, Share.created_at)
+    followed_shares = select(
+        Follower.follower_id, Share.share_id, Share.owner_id, Share.created_at
+    ).join(Share, Share.owner_id == Follower.followed_id)
+    session.exec(
+        insert(TimelineEntry).from_select(_COLUMNS, own_shares.union(followed_shares))
+    )
+    trim_timelines(session)
+
+
+def run_timeline_trim() -> None:
+    """Point d'entrée de la tâche périodique : borne la longueur des timelines."""
+    with Session(get_engine()) as session:
+        trim_timelines(session)
+        session.commit()
@@ -0,0 +1,213 @@
+"""Séries temporelles d'entraînement d'un utilisateur (`/users/{user_id}/timeseries`).
+
+Les sets des séances terminées sont lus en une requête et convertis en
+colonnes NumPy (jour, reps, charge, séance). Le regroupement par jour, semaine
+(lundi) ou mois, les moyennes glissantes et les variations d'une période à
+l'autre sont calculés sur ces colonnes, sans boucle Python par set.
+
+Le volume est le tonnage (reps × charge), comme dans `UserDailyVolume`. Les
+périodes sans séance valent 0 : la série est continue jusqu'à la période
+courante.
+
+Les résultats sont mémorisés par utilisateur ; la sync invalide l'utilisateur
+dont elle a modifié les séances. Le cache est propre au process : une durée
+de vie (`TIMESERIES_CACHE_TTL`) borne le retard sur les écritures des autres.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..models import Set
+from ..models import Workout
+from ..models import WorkoutExercise
+from .background import interval_from_env
+
+METRICS = ("volume", "reps", "sets", "sessions")
+TIMESERIES_MAX_USERS = 1024
+
+_workout_day = func.date(func.coalesce(Workout.ended_at, Workout.started_at, Workout.created_at))
+
+
+class SetColumns(NamedTuple):
+    days: np.ndarray  # datetime64[D]
+    reps: np.ndarray
+    weights: np.ndarray
+    workouts: np.ndarray  # indice de la séance (0..n-1)
+
+
+def load_set_columns(session: Session, user_id: str) -> SetColumns:
+    """Sets des séances terminées de `user_id`, en colonnes (une requête)."""
+    rows = session.exec(
+        select(
+            _workout_day,
+            func.coalesce(Set.reps, 0),
+            func.coalesce(Set.weight, 0),
+            Workout.id,
+        )
+        .join(WorkoutExercise, WorkoutExercise.id == Set.workout_exercise_id)
+        .join(Workout, Workout.id == WorkoutExercise.workout_id)
+        .where(Workout.user_id == user_id)
+        .where(Workout.status == "completed")
+        .where(Workout.deleted_at.is_(None))
+    ).all()
+    if not rows:
+        return SetColumns(
+            np.array([], dtype="datetime64[D]"),
+            np.zeros(0),
+            np.zeros(0),
+            np.zeros(0, dtype=np.int64),
+        )
+    days, reps, weights, workout_ids = zip(*rows, strict=True)
+    _, workouts = np.unique(np.array(workout_ids), return_inverse=True)
+    return SetColumns(
+        np.array(days, dtype="datetime64[D]"),
+        np.array(reps, dtype=float),
+        np.array(weights, dtype=float),
+        workouts.astype(np.int64),
+    )
+
+
+def bucket_starts(days: np.ndarray, bucket: str) -> np.ndarray:
+    """Début de la période (jour, lundi ou mois) de chaque jour."""
+    if bucket == "week":
+        # Le 1970-01-01 (jour 0) était un jeudi
+        return days - (days.astype(np.int64) + 3) % 7
+    if bucket == "month":
+        return days.astype("datetime64[M]")
+    return days
+
+
+def _offsets(starts: np.ndarray, first, bucket: str) -> np.ndarray:
+    offsets = (starts - first).astype(np.int64)
+    return offsets // 7 if bucket == "week" else offsets
+
+
+def bucket_totals(columns: SetColumns, bucket: str, today: date) -> dict[str, np.ndarray]:
+    """Totaux par période, de la première période avec un set à la période courante."""
+    current = bucket_starts(np.array([today], dtype="datetime64[D]"), bucket)[0]
+    starts = bucket_starts(columns.days, bucket)
+    first = starts.min() if len(starts) else current
+    last = max(starts.max(), current) if len(starts) else current
+    periods = np.arange(first, last + (7 if bucket == "week" else 1), 7 if bucket == "week" else 1)
+
+    size = len(periods)
+    index = _offsets(starts, first, bucket)
+    # Une séance compte une fois par période, quel que soit son nombre de sets
+    workouts = int(columns.workouts.max()) + 1 if len(columns.workouts) else 1
+    sessions = np.unique(index * workouts + columns.workouts) // workouts
+    return {
+        "periods": periods,
+        "volume": np.bincount(index, weights=columns.reps * columns.weights, minlength=size),
+        "reps": np.bincount(index, weights=columns.reps, minlength=size),
+        "sets": np.bincount(index, minlength=size).astype(float),
+        "sessions": np.bincount(sessions, minlength=size).astype(float),
+    }
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Moyenne des `window` dernières périodes (moins au début de la série)."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def percent_change(values: np.ndarray) -> np.ndarray:
+    """Variation (%) par rapport à la période précédente ; NaN si elle valait 0."""
+    change = np.full(len(values), np.nan)
+    previous = values[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change[1:] = np.where(previous > 0, (values[1:] - previous) / previous * 100, np.nan)
+    return change
+
+
+def _rounded(values: np.ndarray) -> list[float | None]:
+    return [None if np.isnan(value) else value for value in np.round(values, 1).tolist()]
+
+
+def compute_timeseries(
+    columns: SetColumns, bucket: str, window: int, limit: int, today: date
+) -> dict:
+    """Séries des `limit` dernières périodes, prêtes pour la réponse JSON."""
+    totals = bucket_totals(columns, bucket, today)
+    # Moyennes et variations calculées sur tout l'historique, puis tronquées
+    recent = slice(-limit, None)
+    series = {
+        metric: {
+            "values": _rounded(totals[metric][recent]),
+            "rolling_avg": _rounded(rolling_mean(totals[metric], window)[recent]),
+            "change_percent": _rounded(percent_change(totals[metric])[recent]),
+        }
+        for metric in METRICS
+    }
+    periods = totals["periods"][recent].astype("datetime64[D]").tolist()
+    return {"periods": periods, **series}
+
+
+class TimeseriesCache:
+    """Résultats mémorisés par utilisateur (puis par paramètres), avec durée de vie."""
+
+    def __init__(self, ttl: float, max_users: int = TIMESERIES_MAX_USERS) -> None:
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, user_id: str, key: tuple) -> dict | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._users.move_to_end(user_id)
+            return entry[1].get(key)
+
+    def put(self, user_id: str, key: tuple, value: dict) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                entry = (time.monotonic() + self.ttl, {})
+                self._users[user_id] = entry
+            entry[1][key] = value
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_ids: Iterable[str]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+
+# 0 désactive la mémorisation
+timeseries_cache = TimeseriesCache(interval_from_env("TIMESERIES_CACHE_TTL", 300))
+
+
+def user_timeseries(
+    session: Session, user_id: str, bucket: str, window: int, limit: int, today: date | None = None
+) -> dict:
+    # Jours des séances en UTC (voir `volume_rollup.workout_day`)
+    today = today or datetime.utcnow().date()
+    key = (bucket, window, limit, today)
+    cached = timeseries_cache.get(user_id, key)
+    if cached is None:
+        columns = load_set_columns(session, user_id)
+        cached = compute_timeseries(columns, bucket, window, limit, today)
+        timeseries_cache.put(user_id, key, cached)
+    return cached
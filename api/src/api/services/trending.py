@@ -0,0 +1,151 @@
+"""Score de tendance des partages (décroissance exponentielle).
+
+Chaque évènement d'un partage (sa publication, un like, un commentaire) compte
+pour un poids qui diminue de moitié toutes les `TRENDING_HALF_LIFE` : un post
+viral d'hier reste devant un post calme de ce matin, puis s'efface.
+
+Le score est stocké en « décroissance avant » (forward decay) sur une échelle
+logarithmique :
+
+    trending_score = ln(Σ poids × 2^((t_évènement − TRENDING_EPOCH) / demi-vie))
+
+Le facteur de décroissance commun à tous les partages à un instant donné
+disparaît du classement : un score n'a besoin d'être recalculé que lorsque le
+partage reçoit de nouveaux évènements. `/explore/trending` est alors une
+lecture top-K sur l'index `(trending_score, share_id)`.
+
+La tâche périodique ne recalcule que les partages ayant de nouveaux évènements
+depuis son dernier passage ; un recalcul complet a lieu au premier passage de
+chaque process puis une fois par jour (likes retirés, écritures manquées).
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import union_all
+from sqlalchemy import update
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..db import get_engine
+from ..models import Comment
+from ..models import Like
+from ..models import Share
+from .background import interval_from_env
+
+TRENDING_HALF_LIFE = timedelta(hours=interval_from_env("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_EPOCH = datetime(2024, 1, 1)
+
+POST_WEIGHT = 1.0
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+
+FULL_REFRESH_AGE = timedelta(days=1)
+
+_DECAY_RATE = math.log(2) / TRENDING_HALF_LIFE.total_seconds()
+
+
+def initial_trending_score(created_at: datetime) -> float:
+    """Score d'un partage qui vient d'être publié (seul évènement : sa publication)."""
+    age = created_at.replace(tzinfo=None) - TRENDING_EPOCH
+    return math.log(POST_WEIGHT) + age.total_seconds() * _DECAY_RATE
+
+
+def _events(share_filter=None):
+    """Évènements pondérés par partage : (share_id, created_at, weight)."""
+    sources = (
+        (Share.share_id, Share.created_at, POST_WEIGHT),
+        (Like.share_id, Like.created_at, LIKE_WEIGHT),
+        (Comment.share_id, Comment.created_at, COMMENT_WEIGHT),
+    )
+    selects = []
+    for share_id, created_at, weight in sources:
+        query = select(
+            share_id.label("share_id"),
+            created_at.label("created_at"),
+            literal(weight).label("weight"),
+        )
+        if share_filter is not None:
+            query = query.where(share_id.in_(share_filter))
+        selects.append(query)
+    return union_all(*selects).subquery()
+
+
+def _scores(share_filter=None):
+    """Score de chaque partage (share_id, score), calculé depuis ses évènements.
+
+    Les exponentielles sont prises relativement au dernier évènement du
+    partage : aucun terme ne dépasse son poids, ni ne déborde.
+    """
+    events = _events(share_filter)
+    latest = func.max(events.c.created_at).over(partition_by=events.c.share_id)
+    relative = select(
+        events.c.share_id,
+        events.c.weight,
+        (func.julianday(events.c.created_at) - func.julianday(latest)).label("age_days"),
+        ((func.julianday(latest) - func.julianday(TRENDING_EPOCH)) * 86400).label("latest_seconds"),
+    ).subquery()
+    decayed = func.sum(relative.c.weight * func.exp(relative.c.age_days * 86400 * _DECAY_RATE))
+    return select(
+        relative.c.share_id,
+        (func.ln(decayed) + func.max(relative.c.latest_seconds) * _DECAY_RATE).label("score"),
+    ).group_by(relative.c.share_id)
+
+
+def _touched_since(since: datetime):
+    """Partages ayant reçu un évènement (publication, like, commentaire) depuis `since`."""
+    return union_all(
+        select(Share.share_id).where(Share.created_at >= since),
+        select(Like.share_id).where(Like.created_at >= since),
+        select(Comment.share_id).where(Comment.created_at >= since),
+    )
+
+
+def refresh_trending_scores(session: Session, since: datetime | None = None) -> int:
+    """Recalcule le score des partages touchés depuis `since` (tous si None), sans commit.
+
+    Retourne le nombre de partages mis à jour.
+    """
+    share_filter = _touched_since(since) if since is not None else None
+    rows = session.exec(_scores(share_filter)).all()
+    if rows:
+        session.execute(
+            update(Share),
+            [{"share_id": share_id, "trending_score": score} for share_id, score in rows],
+        )
+    return len(rows)
+
+
+class TrendingRefresher:
+    """Recalcul incrémental : seuls les partages touchés depuis le dernier passage."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._watermark: datetime | None = None
+        self._last_full: datetime | None = None
+
+    def run(self, session: Session, now: datetime | None = None) -> int:
+        now = now or datetime.utcnow()
+        if self._last_full is None or now - self._last_full >= FULL_REFRESH_AGE:
+            updated = refresh_trending_scores(session)
+            self._last_full = now
+        else:
+            # Recouvrement d'un intervalle : évènements commités juste après le passage précédent
+            since = self._watermark - timedelta(seconds=self.interval)
+            updated = refresh_trending_scores(session, since)
+        session.commit()
+        self._watermark = now
+        return updated
+
+
+trending_refresher = TrendingRefresher(interval_from_env("TRENDING_REFRESH_INTERVAL", 60))
+
+
+def run_trending_refresh() -> None:
+    """Point d'entrée de la tâche périodique."""
+    with Session(get_engine()) as session:
+        trending_refresher.run(session)
@@ -0,0 +1,170 @@
+"""Agrégat quotidien du volume d'entraînement (`UserDailyVolume`).
+
+Une ligne par utilisateur et par jour : volume (reps × poids), nombre de sets,
+nombre de séances et meilleure charge, calculés sur les séances terminées et
+non supprimées. Le jour d'une séance est celui de sa fin (à défaut son début,
+puis sa création).
+
+Les jours touchés par une mutation de sync sont recalculés depuis les tables
+sources (`refresh_volume_days`), ce qui reste idempotent ; `rebuild_volume_rollup`
+reconstruit toute la table (script `scripts/backfill_volume_rollup.py`).
+
+Les jours sont regroupés par semaine (lundi) dans `UserWeeklyStats`, avec les
+totaux cumulés : les semaines d'un utilisateur sont recalculées à partir de la
+plus ancienne touchée, en même temps que les jours.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date
+from datetime import timedelta
+
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import distinct
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import or_
+from sqlmodel import Session
+from sqlmodel import select
+
+from ..models import Set
+from ..models import UserDailyVolume
+from ..models import UserWeeklyStats
+from ..models import Workout
+from ..models import WorkoutExercise
+
+_COLUMNS = ["user_id", "day", "volume", "set_count", "session_count", "best_lift"]
+
+_workout_day = func.date(func.coalesce(Workout.ended_at, Workout.started_at, Workout.created_at))
+
+
+def workout_day(workout: Workout) -> date:
+    """Jour de rattachement d'une séance dans l'agrégat."""
+    return (workout.ended_at or workout.started_at or workout.created_at).date()
+
+
+def _rollup_select(*filters):
+    return (
+        select(
+            Workout.user_id,
+            _workout_day,
+            func.coalesce(func.sum(func.coalesce(Set.reps, 0) * func.coalesce(Set.weight, 0)), 0),
+            func.count(Set.id),
+            func.count(distinct(Workout.id)),
+            func.coalesce(func.max(Set.weight), 0),
+        )
+        .outerjoin(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .outerjoin(Set, Set.workout_exercise_id == WorkoutExercise.id)
+        .where(Workout.status == "completed")
+        .where(Workout.deleted_at.is_(None))
+        .where(*filters)
+        .group_by(Workout.user_id, _workout_day)
+    )
+
+
+def refresh_volume_days(session: Session, keys: Iterable[tuple[str, date]]) -> None:
+    """Recalcule les jours `(user_id, day)` donnés depuis les séances (sans commit)."""
+    keys = set(keys)
+    if not keys:
+        return
+    session.exec(
+        delete(UserDailyVolume).where(
+            or_(*(and_(UserDailyVolume.user_id == u, UserDailyVolume.day == d) for u, d in keys))
+        )
+    )
+    # func.date() renvoie 'YYYY-MM-DD' : comparaison sur la forme ISO du jour
+    session.exec(
+        insert(UserDailyVolume).from_select(
+            _COLUMNS,
+            _rollup_select(
+                or_(*(and_(Workout.user_id == u, _workout_day == d.isoformat()) for u, d in keys))
+            ),
+        )
+    )
+    refresh_weekly_stats(session, keys)
+
+
+def rebuild_volume_rollup(session: Session, user_id: str | None = None) -> None:
+    """Reconstruit l'agrégat (tous les utilisateurs ou un seul) (sans commit)."""
+    clear = delete(UserDailyVolume)
+    filters = []
+    if user_id is not None:
+        clear = clear.where(UserDailyVolume.user_id == user_id)
+        filters.append(Workout.user_id == user_id)
+    session.exec(clear)
+    session.exec(insert(UserDailyVolume).from_select(_COLUMNS, _rollup_select(*filters)))
+    rebuild_weekly_stats(session, user_id)
+
+
+def week_start(day: date) -> date:
+    """Lundi de la semaine de `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def _rebuild_weeks(session: Session, user_id: str, since: date | None = None) -> None:
+    """Recalcule les semaines de `user_id` à partir de `since` (toutes si None)."""
+    days = select(UserDailyVolume).where(UserDailyVolume.user_id == user_id)
+    clear = delete(UserWeeklyStats).where(UserWeeklyStats.user_id == user_id)
+    previous = None
+    if since is not None:
+        days = days.where(UserDailyVolume.day >= since)
+        clear = clear.where(UserWeeklyStats.week_start >= since)
+        previous = session.exec(
+            select(UserWeeklyStats)
+            .where(UserWeeklyStats.user_id == user_id)
+            .where(UserWeeklyStats.week_start < since)
+            .order_by(UserWeeklyStats.week_start.desc())
+            .limit(1)
+        ).first()
+
+    weeks: dict[date, dict] = {}
+    for day in session.exec(days.order_by(UserDailyVolume.day)).all():
+        week = weeks.setdefault(week_start(day.day), {
+            "session_count": 0, "volume": 0.0, "set_count": 0, "best_lift": 0.0, "training_days": 0,
+        })
+        week["session_count"] += day.session_count
+        week["volume"] += day.volume
+        week["set_count"] += day.set_count
+        week["best_lift"] = max(week["best_lift"], day.best_lift)
+        week["training_days"] += 1
+
+    total_sessions = previous.total_sessions if previous else 0
+    total_volume = previous.total_volume if previous else 0.0
+    best_lift = previous.best_lift_to_date if previous else 0.0
+    rows = []
+    for start, week in weeks.items():
+        total_sessions += week["session_count"]
+        total_volume += week["volume"]
+        best_lift = max(best_lift, week["best_lift"])
+        rows.append({
+            "user_id": user_id,
+            "week_start": start,
+            **week,
+            "total_sessions": total_sessions,
+            "total_volume": total_volume,
+            "best_lift_to_date": best_lift,
+        })
+    session.exec(clear)
+    if rows:
+        session.exec(insert(UserWeeklyStats).values(rows))
+
+
+def refresh_weekly_stats(session: Session, keys: Iterable[tuple[str, date]]) -> None:
+    """Recalcule les semaines des jours `(user_id, day)` et les suivantes (sans commit)."""
+    since: dict[str, date] = {}
+    for user_id, day in keys:
+        start = week_start(day)
+        since[user_id] = min(start, since.get(user_id, start))
+    for user_id, start in since.items():
+        _rebuild_weeks(session, user_id, start)
+
+
+def rebuild_weekly_stats(session: Session, user_id: str | None = None) -> None:
+    """Reconstruit l'agrégat hebdomadaire depuis l'agrégat quotidien (sans commit)."""
+    if user_id is not None:
+        _rebuild_weeks(session, user_id)
+        return
+    session.exec(delete(UserWeeklyStats))
+    for user_id in session.exec(select(distinct(UserDailyVolume.user_id))).all():
+        _rebuild_weeks(session, user_id)
@@ -8,3 +8,26 @@ def test_default_database_url(monkeypatch):
     reset_engine()
     engine = get_engine()
     assert engine.url.database.endswith("gorillax.db")
+
+
+def test_stale_search_index_is_rebuilt_at_startup():
+    from sqlalchemy import text
+
+    from api.db import init_db
+
+    engine = get_engine()
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO user (id, username, email, password_hash, created_at, consent_to_public_share) "
+            "VALUES ('u1', 'squatqueen', 'u1@test.local', 'x', CURRENT_TIMESTAMP, 0)"
+        ))
+        # Index désynchronisé, comme après un VACUUM qui renumérote les rowid
+        connection.execute(text("DROP TRIGGER user_fts_au"))
+        connection.execute(text("UPDATE user SET username = 'benchpress' WHERE id = 'u1'"))
+
+    init_db()
+    with engine.connect() as connection:
+        matches = connection.execute(text(
+            "SELECT rowid FROM user_fts WHERE user_fts MATCH 'benchpress'"
+        )).all()
+    assert len(matches) == 1
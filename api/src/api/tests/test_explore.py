@@ -0,0 +1,219 @@
+import math
+from datetime import datetime
+from datetime import timedelta
+
+from sqlmodel import Session
+from sqlmodel import select
+
+from api.db import get_engine
+from api.models import Comment
+from api.models import Follower
+from api.models import Like
+from api.models import Share
+from api.models import User
+from api.services.counters import reconcile_user_counters
+from api.services.trending import TrendingRefresher
+
+
+def add_share(
+    session: Session,
+    share_id: str,
+    created_at: datetime,
+    likes: int = 0,
+    like_age: timedelta = timedelta(),
+) -> None:
+    session.add(
+        Share(
+            share_id=share_id,
+            owner_id='owner',
+            owner_username='owner',
+            workout_title='Séance',
+            created_at=created_at,
+        )
+    )
+    for i in range(likes):
+        session.add(
+            Like(share_id=share_id, user_id=f'{share_id}_fan_{i}', created_at=created_at + like_age)
+        )
+
+
+def test_trending_ranks_recent_engagement_over_raw_likes(client):
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        session.add(User(id='owner', username='owner', email='owner@test.local', password_hash='x'))
+        # Viral il y a 10 jours, très actif il y a 2 h, calme ce matin
+        add_share(session, 'old_viral', now - timedelta(days=10), likes=40)
+        add_share(session, 'fresh_hit', now - timedelta(hours=2), likes=6)
+        add_share(session, 'quiet', now - timedelta(hours=1))
+        # 150 partages plus récents : la tendance n'est plus limitée aux 100 derniers
+        for i in range(150):
+            add_share(session, f'filler_{i}', now - timedelta(minutes=30))
+        session.commit()
+
+        refresher = TrendingRefresher(interval=60)
+        assert refresher.run(session, now=now) == 153
+
+    trending = client.get('/explore/trending', params={'limit': 2}).json()
+    assert trending[0]['share_id'] == 'fresh_hit'
+    ids = [
+        post['share_id'] for post in client.get('/explore/trending', params={'limit': 50}).json()
+    ]
+    assert 'old_viral' not in ids
+
+    # Passage incrémental : seuls les partages touchés depuis le dernier passage
+    with Session(get_engine()) as session:
+        for i in range(3):
+            session.add(
+                Comment(
+                    share_id='old_viral',
+                    user_id=f'c{i}',
+                    username=f'c{i}',
+                    content='Bravo',
+                    created_at=now + timedelta(minutes=1),
+                )
+            )
+        session.commit()
+        assert refresher.run(session, now=now + timedelta(minutes=2)) == 1
+        scores = dict(session.exec(select(Share.share_id, Share.trending_score)).all())
+        assert scores['old_viral'] > scores['quiet']
+
+
+def test_trending_refresh_matches_initial_score(client):
+    from api.services.trending import initial_trending_score
+    from api.services.trending import refresh_trending_scores
+
+    created_at = datetime(2026, 3, 1, 12, 0)
+    with Session(get_engine()) as session:
+        add_share(session, 'alone', created_at)
+        add_share(session, 'liked', created_at, likes=1)
+        session.commit()
+        # ln/exp enregistrés sur la connexion : le calcul SQL ne dépend pas du build SQLite
+        assert refresh_trending_scores(session) == 2
+        scores = dict(session.exec(select(Share.share_id, Share.trending_score)).all())
+
+    assert abs(scores['alone'] - initial_trending_score(created_at)) < 1e-6
+    # Publication et like au même instant : deux évènements de poids 1
+    assert abs(scores['liked'] - scores['alone'] - math.log(2)) < 1e-6
+
+
+def test_search_uses_full_text_index_with_pagination(client):
+    with Session(get_engine()) as session:
+        session.add(
+            User(
+                id='u1',
+                username='squatqueen',
+                email='u1@test.local',
+                password_hash='x',
+                bio='Powerlifting',
+            )
+        )
+        session.add(
+            User(
+                id='u2',
+                username='marc',
+                email='u2@test.local',
+                password_hash='x',
+                bio='Squat et développé',
+            )
+        )
+        session.add(
+            User(
+                id='u3',
+                username='lea',
+                email='u3@test.local',
+                password_hash='x',
+                bio='Course à pied',
+            )
+        )
+        session.add(
+            Share(
+                share_id='p1',
+                owner_id='u3',
+                owner_username='lea',
+                workout_title='Séance squat lourd',
+            )
+        )
+        session.add(
+            Share(share_id='p2', owner_id='u3', owner_username='lea', workout_title='Cardio')
+        )
+        session.add(Follower(follower_id='u2', followed_id='u1'))
+        session.commit()
+        reconcile_user_counters(session)
+        session.commit()
+
+    body = client.get('/explore/search', params={'q': 'squat'}).json()
+    # Le pseudo pèse plus que la bio ; compteurs hydratés par lot
+    assert [(u['id'], u['followers_count']) for u in body['users']] == [('u1', 1), ('u2', 0)]
+    assert [p['share_id'] for p in body['posts']] == ['p1']
+    assert body['next_offset'] is None
+
+    # Préfixe, accents ignorés, opérateurs FTS neutralisés
+    assert [
+        u['id'] for u in client.get('/explore/search', params={'q': 'devel'}).json()['users']
+    ] == ['u2']
+    assert client.get('/explore/search', params={'q': 'squat" OR "cardio'}).json()['posts'] == []
+
+    first = client.get('/explore/search', params={'q': 'squat', 'limit': 1}).json()
+    assert [u['id'] for u in first['users']] == ['u1'] and first['next_offset'] == 1
+    second = client.get('/explore/search', params={'q': 'squat', 'limit': 1, 'offset': 1}).json()
+    assert [u['id'] for u in second['users']] == ['u2'] and second['next_offset'] is None
+
+    # Triggers : renommage et suppression reflétés dans l'index
+    with Session(get_engine()) as session:
+        share = session.get(Share, 'p2')
+        share.workout_title = 'Squat avant'
+        session.add(share)
+        session.delete(session.get(Share, 'p1'))
+        session.commit()
+    assert [
+        p['share_id'] for p in client.get('/explore/search', params={'q': 'squat'}).json()['posts']
+    ] == ['p2']
+
+
+def test_suggested_users_rank_friends_of_friends(client):
+    from api.services.follow_suggestions import refresh_follow_suggestions
+
+    with Session(get_engine()) as session:
+        for name in ('me', 'a', 'b', 'c', 'd', 'star'):
+            session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+        # me suit a et b ; a et b suivent c ; b suit d ; star est très suivi
+        for follower, followed in [
+            ('me', 'a'),
+            ('me', 'b'),
+            ('a', 'c'),
+            ('b', 'c'),
+            ('b', 'd'),
+            ('a', 'star'),
+            ('c', 'star'),
+            ('d', 'star'),
+        ]:
+            session.add(Follower(follower_id=follower, followed_id=followed))
+        session.commit()
+        reconcile_user_counters(session)
+        session.commit()
+
+    body = client.get('/explore/suggested-users', params={'current_user_id': 'me'}).json()
+    # 2 relations communes, puis 1 (départagés par followers), puis comptes populaires
+    assert [(u['id'], u['mutual_count']) for u in body] == [('c', 2), ('star', 1), ('d', 1)]
+    assert body[0]['followers_count'] == 2
+
+    # Follow : filtré immédiatement, liste recalculée par la tâche de fond
+    client.post('/profile/c/follow', params={'follower_id': 'me'})
+    assert [
+        u['id']
+        for u in client.get('/explore/suggested-users', params={'current_user_id': 'me'}).json()
+    ] == ['star', 'd']
+    with Session(get_engine()) as session:
+        assert refresh_follow_suggestions(session) == 1
+        assert refresh_follow_suggestions(session) == 0
+    assert [
+        (u['id'], u['mutual_count'])
+        for u in client.get('/explore/suggested-users', params={'current_user_id': 'me'}).json()
+    ] == [
+        ('star', 2),
+        ('d', 1),
+    ]
+
+    # Sans utilisateur : les plus suivis (c et star à 3 followers)
+    anonymous = client.get('/explore/suggested-users').json()
+    assert [(u['id'], u['followers_count']) for u in anonymous[:2]] == [('c', 3), ('star', 3)]
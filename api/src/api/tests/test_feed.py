@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from sqlmodel import Session
 
 from api.db import get_engine
-from api.models import Share, User, Follower
+from api.models import Comment, Follower, Share, User, Workout
 
 
 def setup_users_and_shares(session: Session):
@@ -72,3 +72,132 @@ def test_feed_requires_user(client):
     response = client.get('/feed?user_id=unknown')
     assert response.status_code == 404
     assert response.json()['detail'] == 'user_not_found'
+
+
+def test_feed_hydrates_counts_and_comment_preview(client):
+    with Session(get_engine()) as session:
+        viewer = User(id='viewer', username='viewer', email='viewer@test.local', password_hash='x')
+        session.add(viewer)
+        for i in range(2):
+            session.add(Share(
+                share_id=f'sh_h{i}',
+                owner_id='viewer',
+                owner_username='viewer',
+                workout_title=f'Séance {i}',
+                like_count=3 if i == 0 else 0,
+                comment_count=3 if i == 0 else 0,
+                created_at=datetime.now() - timedelta(minutes=i),
+            ))
+        for i in range(3):
+            session.add(Comment(
+                share_id='sh_h0',
+                user_id=f'liker-{i}',
+                username=f'liker-{i}',
+                content=f'commentaire {i}',
+                created_at=datetime.now() - timedelta(minutes=10 - i),
+            ))
+        session.commit()
+
+    response = client.get('/feed?user_id=viewer&limit=10')
+    assert response.status_code == 200
+    items = {item['share_id']: item for item in response.json()['items']}
+    assert items['sh_h0']['like_count'] == 3
+    assert items['sh_h0']['comment_count'] == 3
+    assert [c['content'] for c in items['sh_h0']['comments']] == ['commentaire 1', 'commentaire 2']
+    assert items['sh_h1']['like_count'] == 0
+    assert items['sh_h1']['comments'] == []
+
+
+def test_home_feed_fans_out_and_prunes(client):
+    with Session(get_engine()) as session:
+        for name in ('athlete', 'fan'):
+            session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+        first = Workout(user_id='athlete', title='Jambes', status='completed')
+        second = Workout(user_id='athlete', title='Dos', status='completed')
+        session.add(first)
+        session.add(second)
+        session.commit()
+        first_id, second_id = first.id, second.id
+
+    # Partage publié avant le follow : récupéré par le backfill
+    backfilled = client.post(f'/share/workouts/{first_id}', json={'user_id': 'athlete'}).json()
+    client.post('/feed/follow/athlete', json={'follower_id': 'fan'})
+    # Partage publié après le follow : poussé par le fan-out
+    fanned_out = client.post(f'/share/workouts/{second_id}', json={'user_id': 'athlete'}).json()
+
+    home = client.get('/feed/home', params={'user_id': 'fan'}).json()
+    assert [item['share_id'] for item in home['items']] == [
+        fanned_out['share_id'],
+        backfilled['share_id'],
+    ]
+
+    client.request('DELETE', '/feed/follow/athlete', json={'follower_id': 'fan'})
+    assert client.get('/feed/home', params={'user_id': 'fan'}).json()['items'] == []
+    own = client.get('/feed/home', params={'user_id': 'athlete'}).json()
+    assert len(own['items']) == 2
+
+
+def test_fan_out_keeps_timelines_bounded(client, monkeypatch):
+    from sqlmodel import func, select
+
+    from api.models import TimelineEntry
+    from api.services import timeline
+
+    monkeypatch.setattr(timeline, 'TIMELINE_MAX_LENGTH', 3)
+    with Session(get_engine()) as session:
+        for name in ('athlete', 'fan'):
+            session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+        session.add(Follower(follower_id='fan', followed_id='athlete'))
+        workouts = [Workout(user_id='athlete', title=f'Séance {i}', status='completed') for i in range(5)]
+        session.add_all(workouts)
+        session.commit()
+        workout_ids = [workout.id for workout in workouts]
+
+    shared = [
+        client.post(f'/share/workouts/{workout_id}', json={'user_id': 'athlete'}).json()['share_id']
+        for workout_id in workout_ids
+    ]
+
+    # Borne tenue dès la publication, sans attendre la tâche périodique
+    with Session(get_engine()) as session:
+        counts = dict(session.exec(
+            select(TimelineEntry.user_id, func.count()).group_by(TimelineEntry.user_id)
+        ).all())
+    assert counts == {'athlete': 3, 'fan': 3}
+    home = client.get('/feed/home', params={'user_id': 'fan'}).json()
+    assert [item['share_id'] for item in home['items']] == shared[:1:-1]
+
+
+def test_feed_cursor_is_stable_with_identical_timestamps(client):
+    same_instant = datetime(2025, 1, 1, 12, 0, 0)
+    with Session(get_engine()) as session:
+        session.add(User(id='reader', username='reader', email='reader@test.local', password_hash='x'))
+        for i in range(5):
+            session.add(Share(
+                share_id=f'sh_tie{i}',
+                owner_id='reader',
+                owner_username='reader',
+                workout_title=f'Séance {i}',
+                created_at=same_instant,
+            ))
+        session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {'user_id': 'reader', 'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        payload = client.get('/feed', params=params).json()
+        seen.extend(item['share_id'] for item in payload['items'])
+        cursor = payload['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [f'sh_tie{i}' for i in reversed(range(5))]
+
+
+def test_feed_rejects_invalid_cursor(client):
+    response = client.get('/feed', params={'user_id': 'reader', 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'invalid_cursor'
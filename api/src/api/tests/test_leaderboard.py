@@ -0,0 +1,251 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Follower
+from api.models import Share
+from api.models import User
+from api.services.ranked_index import IndexableSkiplist
+from api.services.ranked_index import RankedBoard
+from api.services.ranked_index import ranked_boards
+
+
+def setup_users(session: Session, shares_per_user: dict[str, int]) -> None:
+    for name, count in shares_per_user.items():
+        session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+        for i in range(count):
+            session.add(Share(
+                share_id=f'{name}_{i}', owner_id=name, owner_username=name,
+                workout_title='Séance', set_count=2, like_count=1,
+            ))
+    session.commit()
+
+
+def test_sessions_leaderboard_ranks_every_user(client):
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 5, 'ben': 4, 'cat': 4, 'dan': 2, 'eve': 1, 'fay': 0})
+
+    response = client.get('/leaderboard/sessions', params={
+        'limit': 2, 'current_user_id': 'eve', 'around': 1,
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert [(e['user_id'], e['rank'], e['score']) for e in body['entries']] == [
+        ('ana', 1, 5), ('ben', 2, 4),
+    ]
+    # Classé au-delà du top : rang quand même calculé
+    assert body['my_rank'] == 5
+    assert [(e['user_id'], e['rank']) for e in body['around_me']] == [('dan', 4), ('eve', 5)]
+
+    # Ex aequo : même rang
+    tied = client.get('/leaderboard/sessions', params={'current_user_id': 'cat'}).json()
+    assert tied['my_rank'] == 2
+    assert [e['rank'] for e in tied['entries']] == [1, 2, 2, 4, 5]
+
+    # Sans score, pas de rang
+    assert (
+        client.get('/leaderboard/sessions', params={'current_user_id': 'fay'}).json()['my_rank']
+        is None
+    )
+
+
+def test_likes_and_followers_leaderboards(client):
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 1, 'ben': 3})
+        session.add(Follower(follower_id='ben', followed_id='ana'))
+        session.commit()
+        # Écrit hors API : l'index en mémoire est rechargé comme par la tâche périodique
+        ranked_boards.warm(session)
+
+    likes = client.get('/leaderboard/likes').json()
+    assert [(e['user_id'], e['score']) for e in likes['entries']] == [('ben', 3), ('ana', 1)]
+
+    followers = client.get('/leaderboard/followers', params={'current_user_id': 'ana'}).json()
+    assert [(e['user_id'], e['score']) for e in followers['entries']] == [('ana', 1)]
+    assert followers['my_rank'] == 1
+
+
+def test_volume_periods_cover_whole_days_up_to_today():
+    from datetime import date
+    from datetime import datetime
+
+    from sqlmodel import select
+
+    from api.models import UserDailyVolume
+    from api.services.leaderboard import ranked_scores
+
+    now = datetime(2026, 5, 20, 9, 30)
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 0, 'ben': 0})
+        for user_id, day, volume in (
+            ('ana', date(2026, 5, 13), 1000),  # now - 7 jours : hors de la semaine
+            ('ana', date(2026, 5, 14), 10),
+            ('ana', date(2026, 5, 20), 1),
+            ('ben', date(2026, 4, 20), 1000),  # now - 30 jours : hors du mois
+            ('ben', date(2026, 4, 21), 100),
+        ):
+            session.add(UserDailyVolume(user_id=user_id, day=day, volume=volume))
+        session.commit()
+
+        def scores(period):
+            ranked = ranked_scores('volume', period, now)
+            return dict(session.exec(select(ranked.c.user_id, ranked.c.score)).all())
+
+        assert scores('week') == {'ana': 11}
+        assert scores('month') == {'ana': 1011, 'ben': 100}
+
+
+def test_leaderboard_reads_snapshots_with_weekly_change(client):
+    from datetime import datetime
+    from datetime import timedelta
+
+    from sqlmodel import select
+
+    from api.models import LeaderboardSnapshot
+    from api.services.leaderboard import write_snapshots
+
+    # Midi : les snapshots à +5 et +10 minutes restent le même jour
+    now = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 1, 'ben': 2, 'cat': 3})
+        write_snapshots(session, now=now - timedelta(days=8))
+
+        # Dans la semaine : ana passe devant, cat recule
+        for i in range(4):
+            session.add(
+                Share(
+                    share_id=f'ana_new_{i}',
+                    owner_id='ana',
+                    owner_username='ana',
+                    workout_title='Séance',
+                )
+            )
+        session.commit()
+        write_snapshots(session, now=now - timedelta(days=1))
+        write_snapshots(session, now=now)
+
+    body = client.get(
+        '/leaderboard/sessions', params={'period': 'month', 'current_user_id': 'cat'}
+    ).json()
+    assert [(e['user_id'], e['rank'], e['change']) for e in body['entries']] == [
+        ('ana', 1, 2),
+        ('cat', 2, -1),
+        ('ben', 3, -1),
+    ]
+    assert body['my_rank'] == 2
+
+    # Lu depuis le snapshot : un partage postérieur n'apparaît qu'au snapshot suivant
+    with Session(get_engine()) as session:
+        session.add(
+            Share(share_id='ben_new', owner_id='ben', owner_username='ben', workout_title='Séance')
+        )
+        session.add(
+            Share(share_id='ben_new2', owner_id='ben', owner_username='ben', workout_title='Séance')
+        )
+        session.commit()
+        stale = client.get('/leaderboard/sessions', params={'period': 'month'}).json()
+        assert stale['entries'][2]['user_id'] == 'ben'
+
+        # Conservés : la référence d'une semaine, le premier de chaque jour et le dernier
+        write_snapshots(session, now=now + timedelta(minutes=5))
+        write_snapshots(session, now=now + timedelta(minutes=10))
+        generations = session.exec(
+            select(LeaderboardSnapshot.computed_at)
+            .where(LeaderboardSnapshot.type == 'sessions')
+            .where(LeaderboardSnapshot.period == 'month')
+            .distinct()
+        ).all()
+        assert sorted(generations) == [
+            now - timedelta(days=8),
+            now - timedelta(days=1),
+            now,
+            now + timedelta(minutes=10),
+        ]
+
+
+def test_leaderboard_change_is_zero_without_week_old_snapshot(client):
+    from datetime import datetime
+    from datetime import timedelta
+
+    from api.services.leaderboard import write_snapshots
+
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 1, 'ben': 2, 'cat': 3})
+        write_snapshots(session, now=now - timedelta(days=2))
+        for i in range(4):
+            session.add(
+                Share(
+                    share_id=f'ana_new_{i}',
+                    owner_id='ana',
+                    owner_username='ana',
+                    workout_title='Séance',
+                )
+            )
+        session.commit()
+        write_snapshots(session, now=now)
+        ranked_boards.warm(session)
+
+    # Le snapshot d'il y a 2 jours n'est pas une référence d'une semaine
+    for period in ('month', 'all'):
+        body = client.get('/leaderboard/sessions', params={'period': period}).json()
+        assert [(e['user_id'], e['rank'], e['change']) for e in body['entries']] == [
+            ('ana', 1, 0),
+            ('cat', 2, 0),
+            ('ben', 3, 0),
+        ]
+
+
+def test_in_memory_boards_follow_api_events(client):
+    with Session(get_engine()) as session:
+        setup_users(session, {'ana': 1, 'ben': 2, 'cat': 0})
+        ranked_boards.warm(session)
+
+    # Like, follow : visibles dans le classement sans nouveau chargement
+    assert client.post('/likes/ana_0', json={'user_id': 'cat'}).json()['liked'] is True
+    assert client.post('/likes/ana_0', json={'user_id': 'ben'}).json()['liked'] is True
+    likes = client.get('/leaderboard/likes', params={'current_user_id': 'ben', 'around': 0}).json()
+    assert [(e['user_id'], e['rank'], e['score']) for e in likes['entries']] == [
+        ('ana', 1, 3),
+        ('ben', 2, 2),
+    ]
+    assert likes['my_rank'] == 2
+    assert [e['user_id'] for e in likes['around_me']] == ['ben']
+
+    assert client.post('/likes/ana_0', json={'user_id': 'ben'}).json()['liked'] is False
+    client.post('/profile/ben/follow', params={'follower_id': 'cat'})
+    client.post('/profile/ben/follow', params={'follower_id': 'ana'})
+    client.post('/profile/ana/follow', params={'follower_id': 'cat'})
+    client.delete('/profile/ana/follow', params={'follower_id': 'cat'})
+    followers = client.get('/leaderboard/followers').json()
+    assert [(e['user_id'], e['score']) for e in followers['entries']] == [('ben', 2)]
+    likes = client.get('/leaderboard/likes').json()
+    assert [(e['user_id'], e['rank'], e['score']) for e in likes['entries']] == [
+        ('ana', 1, 2),
+        ('ben', 1, 2),
+    ]
+
+
+def test_around_me_near_the_top():
+    board = RankedBoard({'ana': 5, 'ben': 4, 'cat': 3, 'dan': 2}, {})
+
+    _, around_me, my_rank = board.read('ana', limit=1, around=2)
+    assert my_rank == 1
+    # (user_id, score, rank, position) : la fenêtre commence au premier
+    assert around_me == [('ana', 5, 1, 1), ('ben', 4, 2, 2), ('cat', 3, 3, 3)]
+
+
+def test_indexable_skiplist_positions():
+    import random
+
+    skiplist = IndexableSkiplist()
+    keys = random.sample(range(1000), 300)
+    for key in keys:
+        skiplist.insert(key)
+    for key in keys[:100]:
+        skiplist.remove(key)
+    expected = sorted(keys[100:])
+    assert len(skiplist) == 200
+    assert skiplist.slice(0, 200) == expected
+    assert skiplist.slice(50, 55) == expected[50:55]
+    for key in (expected[0], expected[120], 1000, -1):
+        assert skiplist.bisect_left(key) == sum(1 for k in expected if k < key)
@@ -0,0 +1,290 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from sqlmodel import select
+
+from api.db import get_engine
+from api.models import Like
+from api.models import Share
+from api.models import User
+from api.services.counters import reconcile_counters
+
+
+def setup_share(session: Session) -> None:
+    session.add(User(id='owner', username='owner', email='owner@test.local', password_hash='x'))
+    session.add(User(id='fan', username='fan', email='fan@test.local', password_hash='x'))
+    session.add(
+        Share(share_id='sh_like', owner_id='owner', owner_username='owner', workout_title='Push')
+    )
+    session.commit()
+
+
+def test_toggle_like_updates_counter(client):
+    with Session(get_engine()) as session:
+        setup_share(session)
+
+    liked = client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert liked.status_code == 200
+    assert liked.json() == {'liked': True, 'like_count': 1}
+
+    status = client.get('/likes/sh_like/status', params={'user_id': 'fan'})
+    assert status.json() == {'liked': True, 'like_count': 1}
+
+    unliked = client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert unliked.json() == {'liked': False, 'like_count': 0}
+
+
+def test_comments_update_counter(client):
+    with Session(get_engine()) as session:
+        setup_share(session)
+
+    created = client.post('/likes/sh_like/comments', json={'user_id': 'fan', 'content': 'Bravo'})
+    assert created.status_code == 200
+    comment_id = created.json()['id']
+
+    listing = client.get('/likes/sh_like/comments')
+    assert listing.json()['total'] == 1
+
+    liked = client.post(f'/likes/comment/{comment_id}/like', json={'user_id': 'owner'})
+    assert liked.json() == {'liked': True, 'like_count': 1}
+
+    deleted = client.delete(f'/likes/sh_like/comments/{comment_id}', params={'user_id': 'fan'})
+    assert deleted.status_code == 204
+    with Session(get_engine()) as session:
+        assert session.get(Share, 'sh_like').comment_count == 0
+
+
+def test_reconcile_counters_repairs_drift(client):
+    with Session(get_engine()) as session:
+        setup_share(session)
+        session.add(Like(share_id='sh_like', user_id='fan'))
+        session.add(Like(share_id='sh_like', user_id='owner'))
+        session.commit()
+
+        assert reconcile_counters(session) == 1
+        assert session.get(Share, 'sh_like').like_count == 2
+        assert reconcile_counters(session) == 0
+
+
+def test_batch_like_status(client):
+    with Session(get_engine()) as session:
+        setup_share(session)
+        session.add(
+            Share(
+                share_id='sh_other', owner_id='owner', owner_username='owner', workout_title='Pull'
+            )
+        )
+        session.commit()
+
+    client.post('/likes/sh_like', json={'user_id': 'fan'})
+    comment_id = client.post(
+        '/likes/sh_other/comments', json={'user_id': 'owner', 'content': 'Merci'}
+    ).json()['id']
+    client.post(f'/likes/comment/{comment_id}/like', json={'user_id': 'fan'})
+
+    response = client.post(
+        '/likes/batch-status',
+        json={
+            'user_id': 'fan',
+            'share_ids': ['sh_like', 'sh_other', 'sh_unknown'],
+            'comment_ids': [comment_id],
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body['shares'] == {
+        'sh_like': {'liked': True, 'like_count': 1, 'comment_count': 0},
+        'sh_other': {'liked': False, 'like_count': 0, 'comment_count': 1},
+    }
+    assert body['comments'] == {comment_id: {'liked': True, 'like_count': 1}}
+
+
+def test_batch_like_status_is_bounded(client):
+    response = client.post(
+        '/likes/batch-status',
+        json={
+            'user_id': 'fan',
+            'share_ids': [f'sh_{i}' for i in range(101)],
+        },
+    )
+    assert response.status_code == 422
+
+
+def test_like_pair_is_unique(client):
+    with Session(get_engine()) as session:
+        setup_share(session)
+        session.add(Like(share_id='sh_like', user_id='fan'))
+        session.commit()
+        session.add(Like(share_id='sh_like', user_id='fan'))
+        with pytest.raises(IntegrityError):
+            session.commit()
+
+    # Le toggle voit le like existant et le retire au lieu d'en créer un second
+    response = client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert response.json()['liked'] is False
+
+
+def test_like_buffer_collapses_and_flushes(client, monkeypatch):
+    from api.models import Notification
+    from api.services.like_buffer import like_buffer
+    from api.services.notification_outbox import drain_outbox
+
+    monkeypatch.setattr(like_buffer, 'flush_interval', 60)
+    with Session(get_engine()) as session:
+        setup_share(session)
+
+    # Like puis unlike : rien à écrire
+    client.post('/likes/sh_like', json={'user_id': 'fan'})
+    client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert like_buffer.flush() == 0
+
+    liked = client.post('/likes/sh_like', json={'user_id': 'owner'})
+    assert liked.json() == {'liked': True, 'like_count': 1}
+    liked = client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert liked.json() == {'liked': True, 'like_count': 2}
+
+    # Lu depuis le tampon avant le flush
+    status = client.get('/likes/sh_like/status', params={'user_id': 'fan'})
+    assert status.json() == {'liked': True, 'like_count': 2}
+    with Session(get_engine()) as session:
+        assert session.get(Share, 'sh_like').like_count == 0
+
+    assert like_buffer.flush() == 2
+    assert like_buffer.pending_delta('sh_like') == 0
+    with Session(get_engine()) as session:
+        assert session.get(Share, 'sh_like').like_count == 2
+        drain_outbox(session)
+        notifications = session.exec(select(Notification)).all()
+        assert [n.actor_id for n in notifications] == ['fan']
+
+    unliked = client.post('/likes/sh_like', json={'user_id': 'fan'})
+    assert unliked.json() == {'liked': False, 'like_count': 1}
+    like_buffer.flush()
+    status = client.get('/likes/sh_like/status', params={'user_id': 'fan'})
+    assert status.json() == {'liked': False, 'like_count': 1}
+
+
+@pytest.fixture()
+def client_without_outbox_worker(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+
+    monkeypatch.setenv('NOTIFICATION_OUTBOX_INTERVAL', '0')
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_notifications_go_through_outbox(client_without_outbox_worker):
+    client = client_without_outbox_worker
+    from api.models import Notification
+    from api.models import NotificationOutbox
+    from api.services.notification_outbox import OUTBOX_MAX_ATTEMPTS
+    from api.services.notification_outbox import process_outbox
+
+    with Session(get_engine()) as session:
+        setup_share(session)
+
+    client.post('/likes/sh_like', json={'user_id': 'fan'})
+    client.post('/likes/sh_like/comments', json={'user_id': 'fan', 'content': 'Bravo'})
+    client.post('/profile/owner/follow', params={'follower_id': 'fan'})
+
+    with Session(get_engine()) as session:
+        assert len(session.exec(select(NotificationOutbox)).all()) == 3
+        assert session.exec(select(Notification)).all() == []
+
+        assert process_outbox(session) == 3
+        notifications = session.exec(select(Notification)).all()
+        assert sorted(n.type for n in notifications) == ['comment', 'follow', 'like']
+        assert all(n.user_id == 'owner' for n in notifications)
+        assert session.exec(select(NotificationOutbox)).all() == []
+
+        # Une ligne qui a trop échoué n'est plus retentée
+        session.add(
+            NotificationOutbox(
+                user_id='owner',
+                type='like',
+                actor_id='fan',
+                actor_username='fan',
+                message='x',
+                attempts=OUTBOX_MAX_ATTEMPTS,
+            )
+        )
+        session.commit()
+        assert process_outbox(session) == 0
+
+
+def test_notifications_are_grouped_per_share(client_without_outbox_worker):
+    from api.models import Notification
+    from api.services.notification_outbox import drain_outbox
+
+    client = client_without_outbox_worker
+    with Session(get_engine()) as session:
+        setup_share(session)
+        for name in ('marie', 'paul', 'lea'):
+            session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+        session.commit()
+
+    for name in ('fan', 'marie'):
+        client.post('/likes/sh_like', json={'user_id': name})
+    with Session(get_engine()) as session:
+        drain_outbox(session)
+
+    for name in ('paul', 'lea'):
+        client.post('/likes/sh_like', json={'user_id': name})
+    # Unlike puis re-like : pas d'acteur compté deux fois
+    client.post('/likes/sh_like', json={'user_id': 'lea'})
+    client.post('/likes/sh_like', json={'user_id': 'lea'})
+    client.post('/likes/sh_like/comments', json={'user_id': 'marie', 'content': 'Bravo'})
+    with Session(get_engine()) as session:
+        drain_outbox(session)
+        assert len(session.exec(select(Notification)).all()) == 2
+
+    body = client.get('/notifications/owner').json()
+    assert [n['type'] for n in body['notifications']] == ['comment', 'like']
+    comment, like = body['notifications']
+    assert comment['actor_count'] == 1
+    assert comment['message'] == 'marie a commenté ta séance: "Bravo"'
+    assert like['actor_count'] == 4
+    assert [a['username'] for a in like['latest_actors']] == ['lea', 'paul', 'marie']
+    assert like['message'] == 'lea et 3 autres ont aimé ta séance'
+
+
+def test_grouped_notification_counts_distinct_actors(client_without_outbox_worker):
+    from datetime import datetime
+    from datetime import timedelta
+
+    from api.models import Notification
+    from api.models import NotificationOutbox
+    from api.services.notification_outbox import drain_outbox
+
+    now = datetime.utcnow()
+
+    def like(session, actor, at):
+        session.add(
+            NotificationOutbox(
+                user_id='owner',
+                type='like',
+                actor_id=actor,
+                actor_username=actor,
+                reference_id='sh_like',
+                message=f'{actor} a aimé ta séance',
+                created_at=at,
+            )
+        )
+        session.commit()
+        drain_outbox(session)
+
+    with Session(get_engine()) as session:
+        for minutes, actor in enumerate(('a', 'b', 'c', 'd', 'e')):
+            like(session, actor, now - timedelta(hours=20) + timedelta(minutes=minutes))
+        # `a` n'est plus parmi les 3 derniers acteurs : son retour ne compte pas
+        like(session, 'a', now - timedelta(hours=10))
+        group = session.exec(select(Notification)).one()
+        assert group.actor_count == 5
+        assert [a['id'] for a in group.latest_actors] == ['a', 'e', 'd']
+
+        # La fenêtre part du premier évènement, pas du dernier regroupé
+        like(session, 'f', now + timedelta(hours=5))
+        notifications = session.exec(select(Notification).order_by(Notification.first_at)).all()
+        assert [n.actor_count for n in notifications] == [5, 1]
@@ -0,0 +1,100 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Notification
+
+
+def add_notifications(session: Session, user_id: str, count: int) -> None:
+    for i in range(count):
+        session.add(Notification(
+            user_id=user_id,
+            type='mention',
+            actor_id=f'actor_{i}',
+            actor_username=f'actor_{i}',
+            message='Mention',
+        ))
+    session.commit()
+
+
+def test_unread_count_is_not_limited_to_the_page(client):
+    with Session(get_engine()) as session:
+        add_notifications(session, 'me', 120)
+        add_notifications(session, 'someone_else', 3)
+
+    page = client.get('/notifications/me', params={'limit': 10})
+    assert len(page.json()['notifications']) == 10
+    assert page.json()['unread_count'] == 120
+
+    response = client.get('/notifications/me/unread-count')
+    assert response.status_code == 200
+    assert response.json() == {'unread_count': 120}
+
+
+def test_mark_all_read(client):
+    with Session(get_engine()) as session:
+        add_notifications(session, 'me', 5)
+        add_notifications(session, 'someone_else', 2)
+
+    response = client.post('/notifications/me/read-all')
+    assert response.json() == {'marked_read': 5}
+    assert client.get('/notifications/me/unread-count').json() == {'unread_count': 0}
+    assert client.get('/notifications/someone_else/unread-count').json() == {'unread_count': 2}
+    assert client.post('/notifications/me/read-all').json() == {'marked_read': 0}
+
+
+def test_since_returns_only_newer_notifications(client):
+    with Session(get_engine()) as session:
+        add_notifications(session, 'me', 3)
+
+    first = client.get('/notifications/me').json()
+    assert len(first['notifications']) == 3
+    latest = first['latest_cursor']
+
+    with Session(get_engine()) as session:
+        add_notifications(session, 'me', 2)
+
+    newer = client.get('/notifications/me', params={'since': latest}).json()
+    assert [n['actor_id'] for n in newer['notifications']] == ['actor_1', 'actor_0']
+    assert newer['latest_cursor'] != latest
+
+    empty = client.get('/notifications/me', params={'since': newer['latest_cursor']}).json()
+    assert empty['notifications'] == []
+    assert empty['latest_cursor'] == newer['latest_cursor']
+
+    conflict = client.get('/notifications/me', params={'since': latest, 'cursor': latest})
+    assert conflict.status_code == 400
+
+
+def test_outbox_publishes_to_stream_subscribers():
+    import asyncio
+
+    from api.services.notification_bus import notification_bus
+    from api.services.notification_outbox import drain_outbox
+    from api.services.notification_outbox import enqueue_notification
+
+    def deliver() -> None:
+        with Session(get_engine()) as session:
+            enqueue_notification(
+                session, user_id='me', type='follow', actor_id='fan',
+                actor_username='fan', message='fan a commencé à te suivre',
+            )
+            session.commit()
+            drain_outbox(session)
+
+    async def scenario() -> dict:
+        queue = notification_bus.subscribe('me')
+        try:
+            await asyncio.to_thread(deliver)
+            return await asyncio.wait_for(queue.get(), 1)
+        finally:
+            notification_bus.unsubscribe('me', queue)
+
+    event = asyncio.run(scenario())
+    assert event['notification']['message'] == 'fan a commencé à te suivre'
+    assert event['cursor']
+    assert notification_bus.subscriber_count('me') == 0
+
+
+def test_stream_rejects_invalid_since(client):
+    response = client.get('/notifications/me/stream', params={'since': '%%%'})
+    assert response.status_code == 400
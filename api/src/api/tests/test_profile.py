@@ -0,0 +1,226 @@
+import base64
+import hashlib
+import io
+
+from PIL import Image
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.db import init_db
+from api.models import Follower
+from api.models import User
+from api.models import UserCounters
+from api.models import Workout
+from api.services.counters import reconcile_user_counters
+from api.services.follow_graph import FollowGraph
+from api.services.follow_graph import warm_follow_graph
+
+
+def add_users(session: Session, *names: str) -> None:
+    for name in names:
+        session.add(User(id=name, username=name, email=f'{name}@test.local', password_hash='x'))
+    session.commit()
+
+
+def test_relationships_batch_follows_api_writes(client):
+    with Session(get_engine()) as session:
+        add_users(session, 'me', 'ana', 'ben', 'cat')
+        session.add(Follower(follower_id='ana', followed_id='me'))
+        session.add(Follower(follower_id='ben', followed_id='ana'))
+        session.commit()
+        reconcile_user_counters(session)
+        session.commit()
+        warm_follow_graph(session)
+
+    client.post('/profile/ana/follow', params={'follower_id': 'me'})
+    client.post('/feed/follow/cat', json={'follower_id': 'me'})
+    client.request('DELETE', '/feed/follow/cat', json={'follower_id': 'me'})
+
+    body = client.get('/profile/relationships', params={
+        'current_user_id': 'me', 'user_ids': 'ana,ben,cat,unknown',
+    }).json()['relationships']
+    assert body['ana'] == {'following': True, 'followed_by': True, 'followers_count': 2}
+    assert body['ben'] == {'following': False, 'followed_by': False, 'followers_count': 0}
+    assert body['cat']['following'] is False
+    assert body['unknown'] == {'following': False, 'followed_by': False, 'followers_count': 0}
+
+    profile = client.get('/profile/ana', params={'current_user_id': 'me'}).json()
+    assert (profile['followers_count'], profile['following_count'], profile['is_following']) == (
+        2,
+        1,
+        True,
+    )
+
+    followers = client.get('/profile/ana/followers', params={'current_user_id': 'me'}).json()[
+        'followers'
+    ]
+    assert {f['id']: f['is_following'] for f in followers} == {'me': False, 'ben': False}
+    following = client.get('/profile/me/following', params={'current_user_id': 'me'}).json()[
+        'following'
+    ]
+    assert [(f['id'], f['is_following']) for f in following] == [('ana', True)]
+
+
+def test_follow_graph_batch_queries():
+    graph = FollowGraph()
+    graph.load([('a', 'b'), ('b', 'a'), ('a', 'c'), ('d', 'a'), ('a', 'b')])
+    assert graph.which_followed('a', ['b', 'c', 'd', 'zz']) == {'b', 'c'}
+    assert graph.which_follow('a', ['b', 'c', 'd']) == {'b', 'd'}
+    assert graph.mutual_follows('a') == ['b']
+    assert graph.follower_counts(['a', 'b', 'zz']) == {'a': 2, 'b': 1, 'zz': 0}
+
+    graph.add('c', 'a')
+    graph.add('c', 'a')
+    graph.remove('a', 'b')
+    graph.remove('zz', 'a')
+    assert sorted(graph.mutual_follows('a')) == ['c']
+    assert graph.following_counts(['a', 'c']) == {'a': 1, 'c': 1}
+
+
+def test_user_counters_follow_api_writes_and_reconcile(client):
+    with Session(get_engine()) as session:
+        add_users(session, 'owner', 'fan')
+        workout = Workout(user_id='owner', title='Jambes', status='completed')
+        session.add(workout)
+        session.commit()
+        workout_id = workout.id
+        reconcile_user_counters(session)
+        session.commit()
+
+    client.post('/profile/owner/follow', params={'follower_id': 'fan'})
+    share_id = client.post(f'/share/workouts/{workout_id}', json={'user_id': 'owner'}).json()[
+        'share_id'
+    ]
+    client.post(f'/likes/{share_id}', json={'user_id': 'fan'})
+
+    profile = client.get('/profile/owner').json()
+    assert (profile['posts_count'], profile['followers_count'], profile['total_likes']) == (1, 1, 1)
+    assert client.get('/profile/fan').json()['following_count'] == 1
+
+    client.post(f'/likes/{share_id}', json={'user_id': 'fan'})
+    client.request('DELETE', '/profile/owner/follow', params={'follower_id': 'fan'})
+    profile = client.get('/profile/owner').json()
+    assert (profile['followers_count'], profile['total_likes']) == (0, 0)
+
+    with Session(get_engine()) as session:
+        counters = session.get(UserCounters, 'owner')
+        counters.posts_count, counters.total_likes = 7, 3
+        session.add(counters)
+        session.commit()
+        assert reconcile_user_counters(session, 'owner') == 2
+        session.commit()
+        session.refresh(counters)
+        assert (counters.posts_count, counters.total_likes) == (1, 0)
+
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def png_of_size(side: int) -> bytes:
+    # 1 bit par pixel, uni : quelques Ko pour des centaines de millions de pixels
+    buffer = io.BytesIO()
+    Image.new('1', (side, side)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_avatar_upload_stores_blob_by_hash(client, tmp_path, monkeypatch):
+    monkeypatch.setenv('AVATAR_STORAGE_DIR', str(tmp_path / 'avatars'))
+    with Session(get_engine()) as session:
+        add_users(session, 'ana', 'ben')
+
+    data_uri = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+    url = client.post('/profile/ana/avatar', json={'image_base64': data_uri}).json()['avatar_url']
+    assert url == f'/avatars/{hashlib.sha256(PNG).hexdigest()}'
+    assert client.get('/profile/ana').json()['avatar_url'] == url
+    # Même image, même URL (un seul fichier)
+    assert client.put('/profile/ben', json={'avatar_url': data_uri}).json()['avatar_url'] == url
+    assert len(list((tmp_path / 'avatars').rglob('original.png'))) == 1
+
+    response = client.get(url)
+    assert response.content == PNG
+    assert response.headers['content-type'] == 'image/png'
+    assert 'immutable' in response.headers['cache-control']
+    thumbnail = client.get(f'{url}/sm')
+    assert thumbnail.status_code == 200
+    assert thumbnail.headers['content-type'] == 'image/jpeg'
+    with Image.open(io.BytesIO(thumbnail.content)) as image:
+        assert image.size == (64, 64)
+    assert client.get(f'{url}/xl').status_code == 404
+    assert client.get('/avatars/not-a-digest').status_code == 404
+
+    bad = client.post(
+        '/profile/ana/avatar', json={'image_base64': base64.b64encode(b'hello').decode()}
+    )
+    assert (bad.status_code, bad.json()['detail']) == (400, 'invalid_image')
+    # Signature PNG mais contenu illisible
+    truncated = base64.b64encode(PNG[:20]).decode()
+    bad = client.post('/profile/ana/avatar', json={'image_base64': truncated})
+    assert (bad.status_code, bad.json()['detail']) == (400, 'invalid_image')
+
+    # Dimensions au-delà du plafond, puis au-delà du seuil anti-bombe de Pillow
+    for side, detail in ((5000, 'image_too_large'), (15000, 'invalid_image')):
+        oversized = base64.b64encode(png_of_size(side)).decode()
+        bad = client.post('/profile/ana/avatar', json={'image_base64': oversized})
+        assert (bad.status_code, bad.json()['detail']) == (400, detail)
+
+
+def test_concurrent_uploads_of_the_same_avatar(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from api.services.avatar_store import store_avatar
+
+    monkeypatch.setenv('AVATAR_STORAGE_DIR', str(tmp_path / 'avatars'))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        urls = set(pool.map(lambda _: store_avatar(PNG), range(32)))
+    assert urls == {f'/avatars/{hashlib.sha256(PNG).hexdigest()}'}
+    # Aucun fichier temporaire laissé derrière
+    assert sorted(p.name for p in (tmp_path / 'avatars').rglob('*') if p.is_file()) == [
+        'md.jpg',
+        'original.png',
+        'sm.jpg',
+    ]
+
+
+def test_init_db_extracts_data_uri_avatars(tmp_path, monkeypatch):
+    monkeypatch.setenv('AVATAR_STORAGE_DIR', str(tmp_path / 'avatars'))
+    data_uri = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+    with Session(get_engine()) as session:
+        session.add(
+            User(
+                id='old',
+                username='old',
+                email='old@test.local',
+                password_hash='x',
+                avatar_url=data_uri,
+            )
+        )
+        session.add(
+            User(
+                id='ext',
+                username='ext',
+                email='ext@test.local',
+                password_hash='x',
+                avatar_url='https://i.pravatar.cc/150',
+            )
+        )
+        # Image refusée : laissée en place, le démarrage continue
+        huge_uri = 'data:image/png;base64,' + base64.b64encode(png_of_size(15000)).decode()
+        session.add(
+            User(
+                id='huge',
+                username='huge',
+                email='huge@test.local',
+                password_hash='x',
+                avatar_url=huge_uri,
+            )
+        )
+        session.commit()
+
+    init_db()
+
+    with Session(get_engine()) as session:
+        assert session.get(User, 'old').avatar_url == f'/avatars/{hashlib.sha256(PNG).hexdigest()}'
+        assert session.get(User, 'ext').avatar_url == 'https://i.pravatar.cc/150'
+        assert session.get(User, 'huge').avatar_url == huge_uri
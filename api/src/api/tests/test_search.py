@@ -0,0 +1,84 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Exercise
+from api.models import User
+from api.services.suggest_index import SuggestIndex
+from api.services.suggest_index import Suggestion
+
+
+def test_suggest_follows_user_and_exercise_writes(client):
+    with Session(get_engine()) as session:
+        session.add(User(id='u1', username='Élodie', email='u1@test.local', password_hash='x'))
+        session.add(User(id='u2', username='elliot', email='u2@test.local', password_hash='x'))
+        session.add(
+            Exercise(
+                id='e1',
+                name='Développé couché',
+                slug='developpe-couche-pectoraux',
+                muscle_group='pectoraux',
+            )
+        )
+        session.commit()
+
+    body = client.get('/search/suggest', params={'q': 'el'}).json()
+    assert [u['username'] for u in body['users']] == ['elliot', 'Élodie']
+
+    # Mot suivant du nom et slug, sans accents
+    for q in ('couch', 'DÉVEL', 'developpe-c'):
+        exercises = client.get('/search/suggest', params={'q': q, 'types': 'exercises'}).json()
+        assert [e['id'] for e in exercises['exercises']] == ['e1'], q
+    assert (
+        client.get('/search/suggest', params={'q': 'couch', 'types': 'exercises'}).json()['users']
+        == []
+    )
+
+    # Renommage et suppression pris en compte au commit, pas avant
+    with Session(get_engine()) as session:
+        user = session.get(User, 'u2')
+        user.username = 'marc'
+        session.add(user)
+        session.delete(session.get(Exercise, 'e1'))
+        session.flush()
+        assert client.get('/search/suggest', params={'q': 'ell'}).json()['users'] != []
+        session.commit()
+    body = client.get('/search/suggest', params={'q': 'ma'}).json()
+    assert [u['id'] for u in body['users']] == ['u2']
+    assert client.get('/search/suggest', params={'q': 'ell'}).json()['users'] == []
+    assert client.get('/search/suggest', params={'q': 'couch'}).json()['exercises'] == []
+
+    with Session(get_engine()) as session:
+        session.add(User(id='u3', username='ghost', email='u3@test.local', password_hash='x'))
+        session.flush()
+        session.rollback()
+    assert client.get('/search/suggest', params={'q': 'gho'}).json()['users'] == []
+
+
+def test_suggest_ranks_name_starts_before_inner_words():
+    index = SuggestIndex()
+    index.load(
+        [
+            Suggestion('exercise', 'a', 'Squat bulgare'),
+            Suggestion('exercise', 'b', 'Front squat'),
+            Suggestion('exercise', 'c', 'Squat'),
+        ]
+    )
+    assert [s.id for s in index.suggest('squat', {'exercise'}, 10)] == ['c', 'a', 'b']
+    assert [s.id for s in index.suggest('squat', {'exercise'}, 2)] == ['c', 'a']
+    index.apply(
+        [('exercise', 'c', None), ('exercise', 'd', Suggestion('exercise', 'd', 'Squat sauté'))]
+    )
+    assert [s.id for s in index.suggest('squat', {'exercise'}, 10)] == ['a', 'd', 'b']
+
+
+def test_suggest_exercises_do_not_starve_users():
+    from api.services.suggest_index import SUGGEST_SCAN_LIMIT
+
+    index = SuggestIndex()
+    # Plus d'exercices que la lecture maximale, triés avant le pseudo
+    index.load(
+        [Suggestion('exercise', f'e{i}', f'Pa {i:04d}') for i in range(SUGGEST_SCAN_LIMIT + 10)]
+        + [Suggestion('user', 'u1', 'paul')]
+    )
+    assert [s.id for s in index.suggest('pa', {'user'}, 5)] == ['u1']
+    assert len(index.suggest('pa', {'exercise'}, 5)) == 5
@@ -93,3 +93,92 @@ def test_pull_returns_workout_events(client):
     assert response.status_code == 200
     body = response.json()
     assert any(event["action"] == "workout-upsert" for event in body["events"])
+
+
+def test_complete_workout_updates_daily_volume(client):
+    from api.models import Set, User, UserDailyVolume, WorkoutExercise
+
+    with Session(get_engine()) as session:
+        session.add(User(id="lifter", username="lifter", email="lifter@test.local", password_hash="x"))
+        workout = Workout(id="w-volume", user_id="lifter", title="Legs", status="draft")
+        session.add(workout)
+        session.add(WorkoutExercise(id="we-volume", workout_id="w-volume", exercise_id="squat"))
+        session.add(Set(workout_exercise_id="we-volume", reps=5, weight=100.0))
+        session.add(Set(workout_exercise_id="we-volume", reps=8, weight=80.0))
+        session.commit()
+
+    now = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+    response = client.post("/sync/push", json={"mutations": [{
+        "queue_id": 1,
+        "action": "complete-workout",
+        "payload": {"workoutId": "w-volume", "updated_at": now},
+        "created_at": now,
+    }]})
+    assert response.status_code == 200
+
+    with Session(get_engine()) as session:
+        rows = session.exec(select(UserDailyVolume)).all()
+        assert [(r.user_id, r.volume, r.set_count, r.session_count, r.best_lift) for r in rows] == [
+            ("lifter", 1140.0, 2, 1, 100.0),
+        ]
+
+    stats = client.get("/users/lifter/stats").json()
+    assert stats["total_volume"] == 1140.0
+    assert stats["total_sessions"] == 1
+    assert stats["best_lift"] == 100.0
+
+    board = client.get("/leaderboard/volume", params={"period": "all"}).json()
+    assert [(e["user_id"], e["score"]) for e in board["entries"]] == [("lifter", 1140)]
+
+    client.post("/sync/push", json={"mutations": [{
+        "queue_id": 2,
+        "action": "delete-workout",
+        "payload": {"workoutId": "w-volume", "deleted_at": now, "updated_at": now},
+        "created_at": now,
+    }]})
+    with Session(get_engine()) as session:
+        assert session.exec(select(UserDailyVolume)).all() == []
+
+
+def test_weekly_stats_roll_up_days_and_running_totals(client):
+    from datetime import timedelta
+
+    from api.models import Set, User, UserWeeklyStats, WorkoutExercise
+    from api.services.volume_rollup import refresh_volume_days, week_start, workout_day
+
+    this_monday = week_start(datetime.utcnow().date())
+    ended = [
+        datetime.combine(this_monday - timedelta(days=14), datetime.min.time()) + timedelta(hours=10),
+        datetime.combine(this_monday - timedelta(days=6), datetime.min.time()) + timedelta(hours=10),
+        datetime.combine(this_monday, datetime.min.time()) + timedelta(hours=8),
+        datetime.combine(this_monday, datetime.min.time()) + timedelta(hours=18),
+    ]
+    with Session(get_engine()) as session:
+        session.add(User(id="lifter", username="lifter", email="lifter@test.local", password_hash="x"))
+        for i, ended_at in enumerate(ended):
+            session.add(Workout(id=f"w{i}", user_id="lifter", title="Séance", status="completed", ended_at=ended_at))
+            session.add(WorkoutExercise(id=f"we{i}", workout_id=f"w{i}", exercise_id="squat"))
+            session.add(Set(workout_exercise_id=f"we{i}", reps=10, weight=50.0 + 10 * i))
+        session.commit()
+        refresh_volume_days(session, [("lifter", workout_day(w)) for w in session.exec(select(Workout)).all()])
+        session.commit()
+
+        weeks = session.exec(select(UserWeeklyStats).order_by(UserWeeklyStats.week_start)).all()
+        assert [(w.session_count, w.training_days, w.total_sessions, w.best_lift_to_date) for w in weeks] == [
+            (1, 1, 1, 50.0), (1, 1, 2, 60.0), (2, 1, 4, 80.0),
+        ]
+
+    stats = client.get("/users/lifter/stats").json()
+    assert (stats["total_sessions"], stats["total_volume"], stats["best_lift"]) == (4, 2600.0, 80.0)
+    assert (stats["sessions_this_week"], stats["volume_this_week"], stats["current_streak"]) == (2, 1500.0, 1)
+    assert (stats["sessions_last_week"], stats["volume_last_week"]) == (1, 600.0)
+
+    # Une séance supprimée dans une ancienne semaine décale les totaux des suivantes
+    client.post("/sync/push", json={"mutations": [{
+        "queue_id": 1,
+        "action": "delete-workout",
+        "payload": {"workoutId": "w0"},
+        "created_at": int(datetime.now(tz=timezone.utc).timestamp() * 1000),
+    }]})
+    summary = client.get("/users/lifter/stats/summary").json()
+    assert (summary["total_sessions"], summary["sessions_this_week"]) == (3, 2)
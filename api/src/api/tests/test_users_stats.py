@@ -0,0 +1,186 @@
+from datetime import UTC
+from datetime import date
+from datetime import datetime
+
+import numpy as np
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Set
+from api.models import User
+from api.models import Workout
+from api.models import WorkoutExercise
+from api.services.timeseries import SetColumns
+from api.services.timeseries import bucket_totals
+from api.services.timeseries import compute_timeseries
+from api.services.timeseries import percent_change
+from api.services.timeseries import rolling_mean
+
+
+def test_bucket_totals_group_sets_by_week():
+    columns = SetColumns(
+        days=np.array(
+            ['2025-03-03', '2025-03-03', '2025-03-09', '2025-03-17'], dtype='datetime64[D]'
+        ),
+        reps=np.array([10.0, 5.0, 8.0, 10.0]),
+        weights=np.array([100.0, 100.0, 50.0, 60.0]),
+        workouts=np.array([0, 0, 1, 2]),
+    )
+    totals = bucket_totals(columns, 'week', date(2025, 3, 26))
+    # Semaines du lundi, sans trou jusqu'à la semaine courante
+    assert [str(p) for p in totals['periods']] == [
+        '2025-03-03',
+        '2025-03-10',
+        '2025-03-17',
+        '2025-03-24',
+    ]
+    assert totals['volume'].tolist() == [1900.0, 0.0, 600.0, 0.0]
+    assert totals['sets'].tolist() == [3.0, 0.0, 1.0, 0.0]
+    assert totals['sessions'].tolist() == [2.0, 0.0, 1.0, 0.0]
+
+    months = bucket_totals(columns, 'month', date(2025, 3, 26))
+    assert [str(p) for p in months['periods']] == ['2025-03']
+    assert months['reps'].tolist() == [33.0]
+
+    assert rolling_mean(np.array([2.0, 4.0, 6.0, 8.0]), 2).tolist() == [2.0, 3.0, 5.0, 7.0]
+    assert np.isnan(percent_change(np.array([0.0, 5.0, 10.0]))[:2]).all()
+    assert percent_change(np.array([0.0, 5.0, 10.0]))[2] == 100.0
+
+    series = compute_timeseries(columns, 'week', 2, 2, date(2025, 3, 26))
+    assert series['periods'] == [date(2025, 3, 17), date(2025, 3, 24)]
+    assert series['volume'] == {
+        'values': [600.0, 0.0],
+        'rolling_avg': [300.0, 300.0],
+        'change_percent': [None, -100.0],
+    }
+
+
+def test_timeseries_endpoint_is_invalidated_by_sync(client):
+    with Session(get_engine()) as session:
+        session.add(
+            User(id='lifter', username='lifter', email='lifter@test.local', password_hash='x')
+        )
+        for workout_id, status in (('w-done', 'completed'), ('w-new', 'draft')):
+            session.add(
+                Workout(
+                    id=workout_id,
+                    user_id='lifter',
+                    title='Séance',
+                    status=status,
+                    ended_at=datetime.utcnow(),
+                )
+            )
+            session.add(
+                WorkoutExercise(id=f'we-{workout_id}', workout_id=workout_id, exercise_id='squat')
+            )
+            session.add(Set(workout_exercise_id=f'we-{workout_id}', reps=5, weight=100.0))
+        session.commit()
+
+    body = client.get('/users/lifter/timeseries', params={'bucket': 'day', 'limit': 1}).json()
+    assert body['volume']['values'] == [500.0]
+    assert body['sessions']['values'] == [1.0]
+
+    now = int(datetime.now(tz=UTC).timestamp() * 1000)
+    client.post(
+        '/sync/push',
+        json={
+            'mutations': [
+                {
+                    'queue_id': 1,
+                    'action': 'complete-workout',
+                    'payload': {'workoutId': 'w-new'},
+                    'created_at': now,
+                }
+            ]
+        },
+    )
+    body = client.get('/users/lifter/timeseries', params={'bucket': 'day', 'limit': 1}).json()
+    assert (body['volume']['values'], body['sessions']['values']) == ([1000.0], [2.0])
+
+    assert client.get('/users/lifter/timeseries', params={'bucket': 'year'}).status_code == 422
+    assert client.get('/users/ghost/timeseries').status_code == 404
+
+
+def test_exercise_progress_tracks_records_from_sync_and_share(client):
+    from api.models import PersonalRecord
+    from api.services.personal_records import estimated_1rm
+
+    assert estimated_1rm(100.0, 1) == 100.0
+    assert estimated_1rm(100.0, 6) == 120.0
+    assert estimated_1rm(0.0, 10) == 0.0
+
+    with Session(get_engine()) as session:
+        session.add(
+            User(id='lifter', username='lifter', email='lifter@test.local', password_hash='x')
+        )
+        sessions = (
+            ('w1', datetime(2025, 3, 3, 10), 'completed', [(5, 100.0), (1, 110.0)]),
+            ('w2', datetime(2025, 3, 10, 10), 'completed', [(6, 100.0), (10, 60.0)]),
+            ('w3', datetime(2025, 3, 17, 10), 'draft', [(3, 130.0)]),
+        )
+        for workout_id, ended_at, status, sets in sessions:
+            session.add(
+                Workout(
+                    id=workout_id, user_id='lifter', title='Bench', status=status, ended_at=ended_at
+                )
+            )
+            session.add(
+                WorkoutExercise(id=f'we-{workout_id}', workout_id=workout_id, exercise_id='bench')
+            )
+            for reps, weight in sets:
+                session.add(Set(workout_exercise_id=f'we-{workout_id}', reps=reps, weight=weight))
+        session.commit()
+        # Séances insérées directement : pas encore de record
+        assert session.get(PersonalRecord, ('lifter', 'bench')) is None
+
+    # Le partage recalcule les records des exercices de la séance
+    client.post('/share/workouts/w1', json={'user_id': 'lifter'})
+    body = client.get('/users/lifter/exercises/bench/progress').json()
+    assert body['record']['best_e1rm'] == 120.0
+    assert [p['day'] for p in body['history']] == ['2025-03-03', '2025-03-10']
+
+    now = int(datetime.now(tz=UTC).timestamp() * 1000)
+    client.post(
+        '/sync/push',
+        json={
+            'mutations': [
+                {
+                    'queue_id': 1,
+                    'action': 'complete-workout',
+                    'payload': {'workoutId': 'w3'},
+                    'created_at': now,
+                },
+            ]
+        },
+    )
+    body = client.get('/users/lifter/exercises/bench/progress').json()
+    assert body['record'] == {
+        'best_weight': 130.0,
+        'best_weight_day': '2025-03-17',
+        'best_e1rm': 143.0,
+        'best_e1rm_day': '2025-03-17',
+        'best_set_reps': 6,
+        'best_set_weight': 100.0,
+        'best_set_day': '2025-03-10',
+    }
+    assert [(p['day'], p['best_e1rm'], p['set_count']) for p in body['history']] == [
+        ('2025-03-03', 116.7, 2),
+        ('2025-03-10', 120.0, 2),
+        ('2025-03-17', 143.0, 1),
+    ]
+    assert (
+        len(
+            client.get('/users/lifter/exercises/bench/progress', params={'limit': 1}).json()[
+                'history'
+            ]
+        )
+        == 1
+    )
+
+    assert client.get('/users/lifter/exercises/squat/progress').json() == {
+        'user_id': 'lifter',
+        'exercise_id': 'squat',
+        'record': None,
+        'history': [],
+    }
+    assert client.get('/users/ghost/exercises/bench/progress').status_code == 404
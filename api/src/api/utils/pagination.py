@@ -0,0 +1,67 @@
+"""Pagination par curseur opaque (keyset sur `(created_at, id)`).
+
+Le curseur encode la clé du dernier élément renvoyé. La page suivante est lue
+avec `(created_at, id) < curseur`, ce qui reste stable quand plusieurs lignes
+partagent le même `created_at` et coûte le même prix quelle que soit la
+profondeur (parcours de l'index composite correspondant).
+"""
+from __future__ import annotations
+
+import base64
+from collections.abc import Callable
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi import status
+from sqlalchemy import tuple_
+from sqlmodel import Session
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), item_id
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_cursor"
+        ) from exc
+
+
+def keyset_page(
+    session: Session,
+    statement,
+    created_column,
+    id_column,
+    limit: int,
+    cursor: str | None = None,
+    key: Callable[[Any], tuple[datetime, str]] | None = None,
+) -> tuple[Sequence[Any], str | None]:
+    """Exécute `statement` trié par `(created_at, id)` décroissant, à partir de `cursor`.
+
+    `key` extrait `(created_at, id)` d'une ligne résultat ; par défaut les
+    attributs de même nom que les colonnes sont lus sur la ligne.
+    Retourne les lignes de la page et le curseur de la page suivante (ou None).
+    """
+    if cursor:
+        statement = statement.where(tuple_(created_column, id_column) < decode_cursor(cursor))
+    statement = statement.order_by(created_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = session.exec(statement).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key is None:
+        last = rows[-1]
+        last_key = (getattr(last, created_column.key), getattr(last, id_column.key))
+    else:
+        last_key = key(rows[-1])
+    return rows, encode_cursor(*last_key)
@@ -25,6 +25,7 @@ import { useUserProfile } from '@/hooks/useUserProfile';
 import { AppCard } from '@/components/AppCard';
 import { updateRemoteProfile } from '@/services/userProfileApi';
 import { uploadAvatar } from '@/services/profileApi';
+import { resolveMediaUrl } from '@/utils/api';
 
 const CURRENT_USER_ID = 'guest-user';
 
@@ -119,7 +120,7 @@ export default function ProfileScreen() {
     }
   };
 
-  const avatarUri = profile?.avatar_url;
+  const avatarUri = resolveMediaUrl(profile?.avatar_url, 'md');
 
   return (
     <View style={[styles.container, { backgroundColor: theme.colors.background }]}>
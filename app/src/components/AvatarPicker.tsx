@@ -15,6 +15,7 @@ import * as Haptics from 'expo-haptics';
 
 import { useAppTheme } from '@/theme/ThemeProvider';
 import { uploadAvatar, deleteAvatar } from '@/services/profileApi';
+import { resolveMediaUrl } from '@/utils/api';
 
 interface AvatarPickerProps {
   userId: string;
@@ -147,7 +148,7 @@ export function AvatarPicker({
     >
       {avatarUrl ? (
         <Image
-          source={{ uri: avatarUrl }}
+          source={{ uri: resolveMediaUrl(avatarUrl, 'md')! }}
           style={[
             styles.avatar,
             { width: size, height: size, borderRadius: size / 2 },
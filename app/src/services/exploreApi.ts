@@ -19,6 +19,7 @@ export interface SuggestedUser {
   objective: string | null;
   followers_count: number;
   posts_count: number;
+  mutual_count?: number;
 }
 
 export interface ExploreData {
@@ -26,9 +27,15 @@ export interface ExploreData {
   suggested_users: SuggestedUser[];
 }
 
+export interface SuggestResult {
+  users: { id: string; username: string }[];
+  exercises: { id: string; name: string; slug: string | null; muscle_group: string | null }[];
+}
+
 export interface SearchResult {
   users: SuggestedUser[];
   posts: TrendingPost[];
+  next_offset?: number | null;
 }
 
 /**
@@ -95,12 +102,12 @@ export async function getSuggestedUsers(currentUserId?: string, limit = 10): Pro
 /**
  * Rechercher utilisateurs et posts
  */
-export async function search(query: string, limit = 20): Promise<SearchResult> {
+export async function search(query: string, limit = 20, offset = 0): Promise<SearchResult> {
   const baseUrl = getApiBaseUrl();
   const headers = await getAuthHeaders();
 
   const response = await fetch(
-    `${baseUrl}/explore/search?q=${encodeURIComponent(query)}&limit=${limit}`,
+    `${baseUrl}/explore/search?q=${encodeURIComponent(query)}&limit=${limit}&offset=${offset}`,
     { method: 'GET', headers }
   );
 
@@ -111,6 +118,29 @@ export async function search(query: string, limit = 20): Promise<SearchResult> {
   return response.json();
 }
 
+/**
+ * Suggestions à la frappe (pseudos et exercices)
+ */
+export async function suggest(
+  query: string,
+  types: 'users' | 'exercises' | 'users,exercises' = 'users,exercises',
+  limit = 8
+): Promise<SuggestResult> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const response = await fetch(
+    `${baseUrl}/search/suggest?q=${encodeURIComponent(query)}&types=${types}&limit=${limit}`,
+    { method: 'GET', headers }
+  );
+
+  if (!response.ok) {
+    throw new Error(`Failed to suggest: ${response.status}`);
+  }
+
+  return response.json();
+}
+
 
 
 
@@ -14,6 +14,8 @@ export interface LeaderboardResponse {
   period: string;
   entries: LeaderboardEntry[];
   my_rank: number | null;
+  // Rangs autour de l'utilisateur courant
+  around_me: LeaderboardEntry[];
 }
 
 export type LeaderboardType = 'volume' | 'sessions' | 'likes' | 'followers';
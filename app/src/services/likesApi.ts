@@ -60,6 +60,44 @@ export async function getLikeStatus(shareId: string, userId: string): Promise<Li
   return response.json();
 }
 
+export interface ShareLikeStatus {
+  liked: boolean;
+  like_count: number;
+  comment_count: number;
+}
+
+export interface BatchLikeStatusResponse {
+  shares: Record<string, ShareLikeStatus>;
+  comments: Record<string, LikeResponse>;
+}
+
+/**
+ * Statut de like et compteurs pour une page de partages (et commentaires) en une requête
+ */
+export async function getLikeStatuses(
+  userId: string,
+  shareIds: string[],
+  commentIds: string[] = []
+): Promise<BatchLikeStatusResponse> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const response = await fetch(`${baseUrl}/likes/batch-status`, {
+    method: 'POST',
+    headers: {
+      ...headers,
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ user_id: userId, share_ids: shareIds, comment_ids: commentIds }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Failed to get like statuses: ${response.status}`);
+  }
+
+  return response.json();
+}
+
 /**
  * Récupère le nombre de likes d'un partage
  */
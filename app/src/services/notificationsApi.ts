@@ -9,21 +9,32 @@ export interface Notification {
   message: string;
   read: boolean;
   created_at: string;
+  // Notifications regroupées ("Marie et 41 autres ont aimé ta séance")
+  actor_count: number;
+  latest_actors: { id: string; username: string }[];
 }
 
 export interface NotificationListResponse {
   notifications: Notification[];
   unread_count: number;
+  next_cursor: string | null;
+  // À repasser en `since` pour ne récupérer que les nouvelles notifications
+  latest_cursor: string | null;
 }
 
 /**
  * Récupérer les notifications d'un utilisateur
  */
-export async function getNotifications(userId: string, limit = 50): Promise<NotificationListResponse> {
+export async function getNotifications(
+  userId: string,
+  limit = 50,
+  since?: string | null,
+): Promise<NotificationListResponse> {
   const baseUrl = getApiBaseUrl();
   const headers = await getAuthHeaders();
+  const sinceParam = since ? `&since=${encodeURIComponent(since)}` : '';
 
-  const response = await fetch(`${baseUrl}/notifications/${userId}?limit=${limit}`, {
+  const response = await fetch(`${baseUrl}/notifications/${userId}?limit=${limit}${sinceParam}`, {
     method: 'GET',
     headers,
   });
@@ -35,6 +46,34 @@ export async function getNotifications(userId: string, limit = 50): Promise<Noti
   return response.json();
 }
 
+/**
+ * URL du flux SSE des nouvelles notifications (EventSource).
+ * À la reconnexion, passer le dernier `id` reçu (ou `latest_cursor`) en `since`.
+ */
+export function getNotificationStreamUrl(userId: string, since?: string | null): string {
+  const sinceParam = since ? `?since=${encodeURIComponent(since)}` : '';
+  return `${getApiBaseUrl()}/notifications/${userId}/stream${sinceParam}`;
+}
+
+/**
+ * Nombre de notifications non lues (badge)
+ */
+export async function getUnreadCount(userId: string): Promise<{ unread_count: number }> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const response = await fetch(`${baseUrl}/notifications/${userId}/unread-count`, {
+    method: 'GET',
+    headers,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Failed to get unread count: ${response.status}`);
+  }
+
+  return response.json();
+}
+
 /**
  * Marquer toutes les notifications comme lues
  */
@@ -38,6 +38,13 @@ export interface FollowUser {
   id: string;
   username: string;
   avatar_url: string | null;
+  is_following?: boolean;
+}
+
+export interface Relationship {
+  following: boolean;
+  followed_by: boolean;
+  followers_count: number;
 }
 
 /**
@@ -175,6 +182,30 @@ export async function getFollowing(userId: string): Promise<{ following: FollowU
   return response.json();
 }
 
+/**
+ * Relations de l'utilisateur courant avec une liste de comptes (un seul appel)
+ */
+export async function getRelationships(
+  currentUserId: string,
+  userIds: string[]
+): Promise<Record<string, Relationship>> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const params = new URLSearchParams({ current_user_id: currentUserId, user_ids: userIds.join(',') });
+  const response = await fetch(`${baseUrl}/profile/relationships?${params}`, {
+    method: 'GET',
+    headers,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Failed to get relationships: ${response.status}`);
+  }
+
+  const data = await response.json();
+  return data.relationships;
+}
+
 /**
  * Upload un avatar (image en base64)
  */
@@ -72,3 +72,100 @@ export async function getStatsSummary(userId: string): Promise<StatsSummary> {
 
 
 
+
+export type TimeseriesBucket = 'day' | 'week' | 'month';
+
+export interface MetricSeries {
+  values: number[];
+  rolling_avg: number[];
+  change_percent: (number | null)[];
+}
+
+export interface UserTimeseries {
+  user_id: string;
+  bucket: TimeseriesBucket;
+  window: number;
+  periods: string[]; // début de chaque période (YYYY-MM-DD)
+  volume: MetricSeries; // reps × charge
+  reps: MetricSeries;
+  sets: MetricSeries;
+  sessions: MetricSeries;
+}
+
+/**
+ * Récupère les séries de volume / sets / séances par jour, semaine ou mois
+ */
+export async function getUserTimeseries(
+  userId: string,
+  bucket: TimeseriesBucket = 'week',
+  limit: number = 12,
+  window: number = 4
+): Promise<UserTimeseries> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const response = await fetch(
+    `${baseUrl}/users/${userId}/timeseries?bucket=${bucket}&limit=${limit}&window=${window}`,
+    {
+      method: 'GET',
+      headers,
+    }
+  );
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch user timeseries: ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export interface PersonalRecord {
+  best_weight: number;
+  best_weight_day: string | null;
+  best_e1rm: number; // 1RM estimé (Epley)
+  best_e1rm_day: string | null;
+  best_set_reps: number; // set au plus gros volume
+  best_set_weight: number;
+  best_set_day: string | null;
+}
+
+export interface ExerciseProgressPoint {
+  day: string;
+  best_e1rm: number;
+  best_weight: number;
+  volume: number;
+  set_count: number;
+}
+
+export interface ExerciseProgress {
+  user_id: string;
+  exercise_id: string;
+  record: PersonalRecord | null;
+  history: ExerciseProgressPoint[]; // du plus ancien au plus récent
+}
+
+/**
+ * Récupère le record et l'historique du 1RM estimé sur un exercice
+ */
+export async function getExerciseProgress(
+  userId: string,
+  exerciseId: string,
+  limit: number = 100
+): Promise<ExerciseProgress> {
+  const baseUrl = getApiBaseUrl();
+  const headers = await getAuthHeaders();
+
+  const response = await fetch(
+    `${baseUrl}/users/${userId}/exercises/${encodeURIComponent(exerciseId)}/progress?limit=${limit}`,
+    {
+      method: 'GET',
+      headers,
+    }
+  );
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch exercise progress: ${response.status}`);
+  }
+
+  return response.json();
+}
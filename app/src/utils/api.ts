@@ -43,6 +43,15 @@ export const buildApiUrl = (path: string) => {
   return `${base.replace(/\/$/, '')}/${path.replace(/^\//, '')}`;
 };
 
+// Les avatars sont servis par l'API (/avatars/<sha256>) : URL relative à compléter.
+// `size` demande une miniature ('sm' 64 px, 'md' 256 px).
+export const resolveMediaUrl = (url: string | null | undefined, size?: 'sm' | 'md') => {
+  if (!url || !url.startsWith('/')) {
+    return url ?? null;
+  }
+  return buildApiUrl(size ? `${url}/${size}` : url);
+};
+
 export const getAuthHeaders = async (): Promise<Record<string, string>> => {
   const headers: Record<string, string> = {
     'Content-Type': 'application/json',